@@ -1,15 +1,20 @@
 # active_learning.py
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from fastapi import Depends
-from .schemas import PredictRequest, PredictResponse, FeedbackItem, UploadResponse, RetrainRequest, RetrainStatus
-from .model_manager import predict_text, load_model, predict_text_transformer
+from .schemas import (PredictRequest, PredictResponse, FeedbackItem, UploadResponse, RetrainRequest, RetrainStatus,
+                      BulkPredictRequest, BulkPredictResponse)
+from .model_manager import (predict_text, load_model, predict_text_transformer, predict_texts,
+                            predict_texts_transformer_bulk, get_registry, list_versions)
 from .utils import save_uploaded_file
-from .retrain_worker import submit_retrain_job, _JOBS
+from .retrain_worker import submit_retrain_job, get_retrain_job, get_scheduler, RETRAIN_MODE, RETRAIN_MODES
+from .batcher import get_predict_batcher
+from .write_behind import get_feedback_buffer
 import uuid
 from app.db import get_db
 from bson import ObjectId
 from fastapi import Query
 from datetime import datetime
+import io, json
 
   # expects a function returning pymongo db
 
@@ -21,10 +26,10 @@ def info():
 
 @router.post("/predict", response_model=PredictResponse)
 def predict(payload: PredictRequest):
-    label, probs, confidence, version = predict_text_transformer(payload.text)
-    # save prediction into feedbacks collection (append-only)
-    db = get_db()
-    db.feedbacks.insert_one({
+    # concurrent calls are coalesced into one padded forward pass
+    label, probs, confidence, version = get_predict_batcher().submit(payload.text)
+    # save prediction into feedbacks collection (append-only, written behind the response)
+    get_feedback_buffer().add({
         "text": payload.text,
         "predicted": label,
         "probabilities": probs,
@@ -33,13 +38,83 @@ def predict(payload: PredictRequest):
     })
     return PredictResponse(label=label, probabilities=probs, confidence=confidence, model_version=version)
 
+BULK_PREDICT_MAX_TEXTS = 100_000
+_BULK_MODELS = {
+    "transformer": predict_texts_transformer_bulk,   # chunked padded batches
+    "tlrl": predict_texts,                           # one sparse-matrix transform
+}
+
+def _bulk_predict(texts, model: str, save: bool) -> BulkPredictResponse:
+    if model not in _BULK_MODELS:
+        raise HTTPException(status_code=400, detail=f"Unsupported model '{model}'. Use one of {sorted(_BULK_MODELS)}")
+    if not texts:
+        raise HTTPException(status_code=400, detail="No texts provided")
+    if len(texts) > BULK_PREDICT_MAX_TEXTS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_PREDICT_MAX_TEXTS} texts per request")
+
+    results = _BULK_MODELS[model](texts)
+
+    if save:
+        # one round-trip for the whole batch (append-only, same shape as /predict)
+        get_db().feedbacks.insert_many([
+            {
+                "text": text,
+                "predicted": label,
+                "probabilities": probs,
+                "confidence": confidence,
+                "model_version": version,
+            }
+            for text, (label, probs, confidence, version) in zip(texts, results)
+        ], ordered=False)
+
+    return BulkPredictResponse(
+        model=model,
+        count=len(results),
+        predictions=[
+            PredictResponse(label=label, probabilities=probs, confidence=confidence, model_version=version)
+            for label, probs, confidence, version in results
+        ],
+    )
+
+@router.post("/predict/bulk", response_model=BulkPredictResponse)
+def predict_bulk(payload: BulkPredictRequest):
+    return _bulk_predict(payload.texts, payload.model, payload.save)
+
+@router.post("/predict/bulk/upload", response_model=BulkPredictResponse)
+def predict_bulk_upload(file: UploadFile = File(...), model: str = Form("transformer"), save: bool = Form(True)):
+    """JSONL upload: one JSON string or {"text": ...} object per line."""
+    texts = []
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig")
+    for lineno, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON on line {lineno}")
+        text = rec.get("text") if isinstance(rec, dict) else rec
+        if not isinstance(text, str):
+            raise HTTPException(status_code=400, detail=f"Line {lineno} has no 'text' string")
+        texts.append(text)
+    return _bulk_predict(texts, model, save)
+
+@router.get("/predict/metrics")
+def predict_metrics():
+    """Batch sizes and queue waits of the /predict micro-batcher."""
+    return get_predict_batcher().metrics()
+
+@router.get("/feedback/write_stats")
+def feedback_write_stats():
+    """Queued / written / pending counts of the feedbacks write-behind buffer."""
+    return get_feedback_buffer().stats()
+
 @router.post("/feedback")
 def feedback(item: FeedbackItem):
-    db = get_db()
     doc = item.dict()
     doc.update({"saved_at": __import__("datetime").datetime.utcnow()})
-    db.feedbacks.insert_one(doc)
-    return {"status": "ok", "saved_id": str(doc.get("_id", None))}
+    saved_id = get_feedback_buffer().add(doc)
+    return {"status": "ok", "saved_id": str(saved_id)}
 
 @router.post("/upload", response_model=UploadResponse)
 async def upload_csv(file: UploadFile = File(...)):
@@ -61,23 +136,41 @@ def retrain(req: RetrainRequest):
         # if using ObjectId you must convert; for simplicity we assume string
         if ds:
             dataset_path = ds["path"]
-    if not dataset_path:
+    mode = req.mode or RETRAIN_MODE
+    if mode not in RETRAIN_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown retrain mode '{mode}'. Use one of {list(RETRAIN_MODES)}")
+    # an incremental retrain can run on new feedback alone
+    if not dataset_path and mode != "incremental":
         raise HTTPException(status_code=400, detail="dataset_id required")
-    submit_retrain_job(job_id, dataset_path, include_feedbacks=req.include_feedbacks, base_version=req.base_model_version)
-    db.retrain_jobs.insert_one({"job_id": job_id, "status": "queued"})
+    # one retrain_jobs document per job; the scheduler updates it in place
+    try:
+        submit_retrain_job(job_id, dataset_path, include_feedbacks=req.include_feedbacks,
+                           base_version=req.base_model_version, mode=mode, search=req.search,
+                           promote_if_improved=req.promote_if_improved)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return RetrainStatus(job_id=job_id, status="queued", progress=0)
 
 @router.get("/status/{job_id}", response_model=RetrainStatus)
 def job_status(job_id: str):
-    info = _JOBS.get(job_id)
-    if not info:
-        db = get_db()
-        rec = db.retrain_jobs.find_one({"job_id": job_id})
-        if rec:
-            return RetrainStatus(job_id=job_id, status=rec.get("status", "unknown"))
+    rec = get_retrain_job(job_id)
+    if not rec:
         raise HTTPException(status_code=404, detail="job not found")
-    return RetrainStatus(job_id=job_id, status=info.get("status"), progress=info.get("progress", 0),
-                         message=info.get("message"), result_metrics=info.get("result"))
+    result = None
+    if rec.get("status") == "done":
+        result = {"metrics": rec.get("result_metrics"), "version": rec.get("model_version"),
+                  "promoted": rec.get("promoted", False), "promotion": rec.get("promotion")}
+    return RetrainStatus(job_id=job_id, status=rec.get("status", "unknown"), progress=rec.get("progress", 0),
+                         message=rec.get("message"), result_metrics=result)
+
+@router.get("/retrain/scheduler")
+def retrain_scheduler_status():
+    """Jobs this process is training right now, plus queue depth across all processes."""
+    db = get_db()
+    out = get_scheduler().status()
+    out["queued"] = db.retrain_jobs.count_documents({"status": "queued"})
+    out["running_total"] = db.retrain_jobs.count_documents({"status": "running"})
+    return out
     
 @router.get("/models")
 def get_models():
@@ -87,6 +180,21 @@ def get_models():
         m["_id"] = str(m["_id"])
     return models
 
+@router.get("/registry")
+def registry_status():
+    """Active TF-IDF version and the versions currently held in memory."""
+    return get_registry().status()
+
+@router.post("/models/{version}/activate")
+def activate_model(version: str):
+    if version not in list_versions():
+        raise HTTPException(status_code=404, detail=f"Model version '{version}' not found")
+    try:
+        load_model(version)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load {version}: {e}")
+    return get_registry().status()
+
 @router.get("/latest_metrics")
 def latest_metrics():
     db = get_db()
@@ -0,0 +1,136 @@
+# batcher.py
+import threading, queue, time
+from collections import Counter, deque
+from concurrent.futures import Future
+from typing import Callable, List, Any
+
+from .model_manager import predict_texts_transformer
+
+# try to load config from sqlite; fallback to defaults below
+try:
+    from app.sqlite_config import load_settings
+    _cfg = load_settings()
+except Exception:
+    _cfg = {}
+
+PREDICT_MAX_BATCH = _cfg.get("PREDICT_MAX_BATCH", 32)      # most texts per forward pass
+PREDICT_MAX_WAIT_MS = _cfg.get("PREDICT_MAX_WAIT_MS", 5)   # how long the first caller waits for company
+
+_LATENCY_WINDOW = 1000  # recent queue waits kept for percentiles
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item calls into batches.
+    Callers block in submit(); a worker thread takes the first queued item, waits up to
+    max_wait_ms (or until max_batch items) for more, runs `batch_fn(items)` once and
+    hands each caller its own result (or the batch's exception).
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch: int = 32,
+                 max_wait_ms: float = 5, name: str = "batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        # metrics
+        self._metrics_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._batch_sizes = Counter()
+        self._waits_ms = deque(maxlen=_LATENCY_WINDOW)
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._worker_loop, daemon=True, name=self.name)
+                    self._thread.start()
+
+    def submit(self, item, timeout: float = None):
+        """Queue one item and block until its result is ready."""
+        self._ensure_worker()
+        fut = Future()
+        self._queue.put((item, fut, time.perf_counter()))
+        return fut.result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                # still take whatever is already waiting, without sleeping
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker_loop(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            items = [b[0] for b in batch]
+            try:
+                results = self.batch_fn(items)
+                for (_, fut, _), res in zip(batch, results):
+                    fut.set_result(res)
+                failed = False
+            except Exception as e:
+                for _, fut, _ in batch:
+                    fut.set_exception(e)
+                failed = True
+
+            with self._metrics_lock:
+                self._batches += 1
+                self._items += len(batch)
+                self._errors += failed
+                self._batch_sizes[len(batch)] += 1
+                self._waits_ms.extend((started - enq) * 1000.0 for _, _, enq in batch)
+
+    def metrics(self) -> dict:
+        with self._metrics_lock:
+            waits = sorted(self._waits_ms)
+            sizes = dict(sorted(self._batch_sizes.items()))
+            batches, items, errors = self._batches, self._items, self._errors
+
+        def pct(p):
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 3) if waits else 0.0
+
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize(),
+            "batches": batches,
+            "items": items,
+            "errors": errors,
+            "avg_batch_size": round(items / batches, 2) if batches else 0.0,
+            "batch_size_histogram": sizes,
+            "queue_wait_ms": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99),
+                              "max": round(waits[-1], 3) if waits else 0.0},
+        }
+
+
+_PREDICT_BATCHER = None
+_PREDICT_BATCHER_LOCK = threading.Lock()
+
+
+def get_predict_batcher() -> MicroBatcher:
+    """Shared batcher in front of the transformer used by /active/predict."""
+    global _PREDICT_BATCHER
+    with _PREDICT_BATCHER_LOCK:
+        if _PREDICT_BATCHER is None:
+            _PREDICT_BATCHER = MicroBatcher(predict_texts_transformer, max_batch=PREDICT_MAX_BATCH,
+                                            max_wait_ms=PREDICT_MAX_WAIT_MS, name="predict-batcher")
+    return _PREDICT_BATCHER
@@ -0,0 +1,135 @@
+# compact_vectorizer.py
+import os, json
+import numpy as np
+
+COMPACT_DIRNAME = "vectorizer_compact"
+
+# TfidfVectorizer params that only shape the analyzer / weighting (all JSON-serializable)
+_PARAMS = ("input", "encoding", "decode_error", "strip_accents", "lowercase", "analyzer",
+           "stop_words", "token_pattern", "ngram_range", "binary", "norm", "use_idf",
+           "smooth_idf", "sublinear_tf")
+
+
+class CompactTfidfVectorizer:
+    """
+    Read-only stand-in for a fitted TfidfVectorizer.
+    The vocabulary is a sorted fixed-width UTF-8 string table (terms.npy) plus the
+    column of each term (columns.npy); idf_ is a plain float array (idf.npy).
+    All three load with np.load(mmap_mode="r") in milliseconds, hold no per-term
+    Python objects, and transform() matches TfidfVectorizer.transform output.
+    Batches are looked up with one np.searchsorted over all tokens of all documents.
+    """
+
+    def __init__(self, params: dict, terms: np.ndarray, columns: np.ndarray, idf, dtype: str = "float64"):
+        self.params = params
+        self.terms = terms
+        self.columns = columns
+        self.idf_ = idf
+        self.dtype = np.dtype(dtype)
+        self._width = terms.dtype.itemsize
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        self._analyze = TfidfVectorizer(**params).build_analyzer()
+
+    # ---------- conversion / persistence ----------
+    @classmethod
+    def from_sklearn(cls, vec) -> "CompactTfidfVectorizer":
+        if callable(vec.analyzer) or vec.tokenizer is not None or vec.preprocessor is not None:
+            raise ValueError("vectorizers with custom analyzer/tokenizer/preprocessor callables cannot be compacted")
+        params = {k: getattr(vec, k) for k in _PARAMS}
+        if isinstance(params["stop_words"], (set, frozenset, tuple)):
+            params["stop_words"] = sorted(params["stop_words"])
+        params["ngram_range"] = list(params["ngram_range"])
+
+        items = sorted((t.encode("utf-8"), i) for t, i in vec.vocabulary_.items())
+        width = max((len(t) for t, _ in items), default=1)
+        terms = np.array([t for t, _ in items], dtype=f"S{width}")
+        columns = np.array([i for _, i in items], dtype=np.int32)
+        idf = np.asarray(vec.idf_, dtype=np.float64) if vec.use_idf else None
+        return cls(params, terms, columns, idf, dtype=np.dtype(vec.dtype).name)
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "terms.npy"), self.terms)
+        np.save(os.path.join(path, "columns.npy"), self.columns)
+        if self.idf_ is not None:
+            np.save(os.path.join(path, "idf.npy"), self.idf_)
+        with open(os.path.join(path, "params.json"), "w") as f:
+            json.dump({"params": self.params, "dtype": self.dtype.name}, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: str = "r") -> "CompactTfidfVectorizer":
+        with open(os.path.join(path, "params.json"), "r") as f:
+            meta = json.load(f)
+        params = meta["params"]
+        params["ngram_range"] = tuple(params["ngram_range"])
+        idf_path = os.path.join(path, "idf.npy")
+        return cls(
+            params,
+            np.load(os.path.join(path, "terms.npy"), mmap_mode=mmap_mode),
+            np.load(os.path.join(path, "columns.npy"), mmap_mode=mmap_mode),
+            np.load(idf_path, mmap_mode=mmap_mode) if os.path.exists(idf_path) else None,
+            dtype=meta.get("dtype", "float64"),
+        )
+
+    # ---------- TfidfVectorizer API used by predict ----------
+    def __len__(self):
+        return len(self.terms)
+
+    def transform(self, raw_documents):
+        import scipy.sparse as sp
+        from sklearn.preprocessing import normalize
+
+        docs = list(raw_documents)
+        tokens, lengths = [], []
+        for doc in docs:
+            feats = self._analyze(doc)
+            tokens.extend(feats)
+            lengths.append(len(feats))
+
+        encoded = [t.encode("utf-8") for t in tokens]
+        # longer than any vocabulary term -> cannot match (and must not be truncated into a false hit)
+        fits = np.fromiter((len(t) <= self._width for t in encoded), dtype=bool, count=len(encoded))
+        tok_arr = np.array(encoded, dtype=f"S{self._width}") if encoded else np.empty(0, dtype=f"S{self._width}")
+
+        pos = np.searchsorted(self.terms, tok_arr)
+        pos = np.minimum(pos, len(self.terms) - 1)
+        hit = fits & (self.terms[pos] == tok_arr)
+
+        rows = np.repeat(np.arange(len(docs), dtype=np.int64), lengths)[hit]
+        cols = np.asarray(self.columns)[pos[hit]]
+        X = sp.csr_matrix(
+            (np.ones(len(cols), dtype=self.dtype), (rows, cols)),
+            shape=(len(docs), len(self.terms)),
+            dtype=self.dtype,
+        )
+        X.sum_duplicates()
+        X.sort_indices()
+
+        if self.params["binary"]:
+            X.data.fill(1)
+        if self.params["sublinear_tf"]:
+            np.log(X.data, X.data)
+            X.data += 1.0
+        if self.idf_ is not None:
+            X.data *= self.idf_[X.indices]
+        if self.params["norm"] is not None:
+            X = normalize(X, norm=self.params["norm"], copy=False)
+        return X
+
+
+def save_compact(vectorizer, version_path: str) -> bool:
+    """Write the compact format next to vectorizer.joblib; False if this vectorizer can't be compacted."""
+    try:
+        CompactTfidfVectorizer.from_sklearn(vectorizer).save(os.path.join(version_path, COMPACT_DIRNAME))
+        return True
+    except (ValueError, AttributeError) as e:
+        print("[COMPACT] vectorizer kept in joblib format only:", e)
+        return False
+
+
+def load_compact(version_path: str):
+    """Compact vectorizer of a version, or None if it was not written."""
+    path = os.path.join(version_path, COMPACT_DIRNAME)
+    if not os.path.exists(os.path.join(path, "params.json")):
+        return None
+    return CompactTfidfVectorizer.load(path)
@@ -0,0 +1,76 @@
+# feedback_export.py
+"""
+Streaming read of corrected feedback for retraining.
+
+    texts, labels, stats = feedback_rows({"corrected": {"$ne": None}})
+
+  - only `text` / `corrected` are projected; the cursor is read newest-first in batches of
+    FEEDBACK_EXPORT_BATCH documents, so memory does not grow with whole feedback documents
+  - repeated texts (case-insensitive) are dropped by a 64-bit blake2b hash of the text;
+    the newest correction of a text wins
+  - the columns are built from the deduplicated batches only
+
+The `seen` hashes cost roughly 70 bytes per unique text (a Python int in a set), on top of
+the text itself, which the trainer keeps anyway; they are dropped once the read is done.
+"""
+import hashlib
+
+import numpy as np
+
+from app.db import get_db
+
+# try to load config from sqlite; fallback to defaults below
+try:
+    from app.sqlite_config import load_settings
+    _cfg = load_settings()
+except Exception:
+    _cfg = {}
+
+FEEDBACK_EXPORT_BATCH = _cfg.get("FEEDBACK_EXPORT_BATCH", 5000)  # documents per cursor batch
+
+_PROJECTION = {"_id": 0, "text": 1, "corrected": 1}
+
+
+def _text_hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.lower().encode("utf-8", "replace"), digest_size=8).digest(), "little")
+
+
+def iter_feedback_batches(query: dict, batch_size: int = FEEDBACK_EXPORT_BATCH, stats: dict = None):
+    """Yields (texts, labels) lists of at most `batch_size` deduplicated corrected feedbacks."""
+    batch_size = max(1, int(batch_size))
+    stats = stats if stats is not None else {}
+    stats.update(read=0, rows=0, duplicates=0)
+    seen = set()
+    texts, labels = [], []
+    cursor = get_db().feedbacks.find(query, _PROJECTION, batch_size=batch_size).sort("saved_at", -1)
+    for doc in cursor:
+        stats["read"] += 1
+        text, label = doc.get("text"), doc.get("corrected")
+        if text is None or label is None:
+            continue
+        text = str(text)
+        h = _text_hash(text)
+        if h in seen:
+            stats["duplicates"] += 1
+            continue
+        seen.add(h)
+        texts.append(text)
+        labels.append(str(label))
+        if len(texts) >= batch_size:
+            stats["rows"] += len(texts)
+            yield texts, labels
+            texts, labels = [], []
+    if texts:
+        stats["rows"] += len(texts)
+        yield texts, labels
+
+
+# ----------------- Entry point -----------------
+def feedback_rows(query: dict, batch_size: int = FEEDBACK_EXPORT_BATCH):
+    """(texts, labels, stats) of the deduplicated corrected feedback matching `query`."""
+    stats, texts, labels = {}, [], []
+    for batch_texts, batch_labels in iter_feedback_batches(query, batch_size, stats):
+        texts.extend(batch_texts)
+        labels.extend(batch_labels)
+    print(f"[RETRAIN] feedback export: {stats['rows']} rows ({stats['duplicates']} duplicate texts dropped)")
+    return np.array(texts, dtype=object), np.array(labels, dtype=object), stats
@@ -0,0 +1,208 @@
+# hparam_search.py
+"""
+Hyperparameter search for the TF-IDF + LogisticRegression (tlrl) retrain.
+
+Candidates are every combination of SEARCH_SPACE (ngram_range x max_features x C), scored by
+weighted F1 on a validation slice of the training rows and run as successive halving:
+all candidates are fitted on a small sample, the best 1/HALVING_FACTOR move on to a sample
+HALVING_FACTOR times larger, and so on up to all fitting rows.
+
+Feature matrices are built once per ngram_range, not per candidate: one CountVectorizer pass
+keeps the most frequent max(max_features) terms, columns sorted by frequency, and the
+un-normalized tf*idf matrix is written to a temp dir as .npy files. Worker processes
+memory-map it and derive the matrix of any max_features=k by taking the first k columns
+and l2-normalizing (idf does not depend on the other terms), which is exactly what
+TfidfVectorizer(vocabulary=<those k terms>) produces.
+
+The whole search (feature building included) is bounded by a wall-clock budget; when it runs
+out, unfinished candidates are cancelled and the best of the most advanced rung wins.
+"""
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import numpy as np
+
+SEARCH_SPACE = {
+    "ngram_range": [(1, 1), (1, 2)],
+    "max_features": [3000, 10000, 30000],
+    "C": [0.3, 1.0, 3.0, 10.0],
+}
+DEFAULT_PARAMS = {"ngram_range": (1, 2), "max_features": 3000, "C": 1.0}  # used when the search is off / finds nothing
+MAX_ITER = 300
+HALVING_FACTOR = 3
+MIN_RUNG_ROWS = 300        # smallest fitting sample worth scoring a candidate on
+MIN_SEARCH_ROWS = 100      # below this the defaults are used without searching
+VALIDATION_FRACTION = 0.2  # of the training rows, scored by every rung
+
+
+def candidates():
+    keys = list(SEARCH_SPACE)
+    return [dict(zip(keys, values)) for values in itertools.product(*(SEARCH_SPACE[k] for k in keys))]
+
+
+def _ngram_key(ngram_range) -> str:
+    return f"ngram{ngram_range[0]}-{ngram_range[1]}"
+
+
+def _rung_sizes(n_fit: int, n_candidates: int):
+    """Fitting rows per rung, smallest first; the last rung always uses every fitting row."""
+    rungs = max(1, math.ceil(math.log(max(n_candidates, 1), HALVING_FACTOR)))
+    sizes = [int(n_fit / HALVING_FACTOR ** i) for i in reversed(range(rungs))]
+    return [s for s in sizes[:-1] if s >= MIN_RUNG_ROWS] + [n_fit]
+
+
+# ----------------- Shared feature matrices -----------------
+def _share_features(workdir: str, texts, y_codes, fit_rows, val_rows) -> dict:
+    """Write the per-ngram_range matrices + labels to `workdir`; returns {ngram key: terms by frequency}."""
+    from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+
+    np.save(os.path.join(workdir, "y.npy"), y_codes)
+    np.save(os.path.join(workdir, "fit_rows.npy"), fit_rows)
+    np.save(os.path.join(workdir, "val_rows.npy"), val_rows)
+
+    terms = {}
+    for ngram_range in SEARCH_SPACE["ngram_range"]:
+        key = _ngram_key(ngram_range)
+        counts = CountVectorizer(ngram_range=ngram_range, max_features=max(SEARCH_SPACE["max_features"])) \
+            .fit(texts)
+        X = counts.transform(texts)
+        # most frequent first, so max_features=k is the first k columns
+        order = np.argsort(-np.asarray(X.sum(axis=0)).ravel(), kind="stable")
+        X = X[:, order]
+        X = TfidfTransformer(norm=None).fit_transform(X).tocsr()
+        X.sort_indices()
+        for part in ("data", "indices", "indptr"):
+            np.save(os.path.join(workdir, f"{key}.{part}.npy"), getattr(X, part))
+        with open(os.path.join(workdir, f"{key}.json"), "w") as f:
+            json.dump({"shape": list(X.shape)}, f)
+        terms[key] = counts.get_feature_names_out()[order].tolist()
+    return terms
+
+
+_SHARED = {}  # (workdir, key) -> memory-mapped csr matrix, per worker process
+
+
+def _shared_matrix(workdir: str, key: str):
+    cached = _SHARED.get((workdir, key))
+    if cached is None:
+        from scipy.sparse import csr_matrix
+
+        with open(os.path.join(workdir, f"{key}.json")) as f:
+            shape = tuple(json.load(f)["shape"])
+        parts = [np.load(os.path.join(workdir, f"{key}.{p}.npy"), mmap_mode="r") for p in ("data", "indices", "indptr")]
+        cached = _SHARED[(workdir, key)] = csr_matrix(tuple(parts), shape=shape, copy=False)
+    return cached
+
+
+def _features(X, rows, max_features: int):
+    from sklearn.preprocessing import normalize
+    return normalize(X[rows][:, :max_features])
+
+
+def _evaluate_candidate(workdir: str, params: dict, n_fit: int) -> dict:
+    """Runs in a search worker: fit on the first n_fit fitting rows, weighted F1 on the validation rows."""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import f1_score
+
+    started = time.perf_counter()
+    X = _shared_matrix(workdir, _ngram_key(params["ngram_range"]))
+    y = np.load(os.path.join(workdir, "y.npy"))
+    fit_rows = np.load(os.path.join(workdir, "fit_rows.npy"))[:n_fit]
+    val_rows = np.load(os.path.join(workdir, "val_rows.npy"))
+    clf = LogisticRegression(C=params["C"], max_iter=MAX_ITER)
+    clf.fit(_features(X, fit_rows, params["max_features"]), y[fit_rows])
+    preds = clf.predict(_features(X, val_rows, params["max_features"]))
+    return {"f1": float(f1_score(y[val_rows], preds, average="weighted")),
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+# ----------------- Search driver -----------------
+def run_search(texts, y, budget_seconds: float, workers: int) -> dict:
+    """
+    Successive-halving search over SEARCH_SPACE on the training rows (texts, y).
+    Returns {"params", "vocabulary" (terms of the winner, for TfidfVectorizer(vocabulary=...)),
+             "table" (one row per evaluated candidate and rung), "rungs", "budget_seconds",
+             "elapsed_seconds", "timed_out"}; params is DEFAULT_PARAMS with vocabulary None
+    when nothing finished inside the budget.
+    """
+    from sklearn.model_selection import train_test_split
+
+    started = time.monotonic()
+    deadline = started + max(0.0, float(budget_seconds))
+    result = {"params": dict(DEFAULT_PARAMS), "vocabulary": None, "table": [], "rungs": [],
+              "budget_seconds": budget_seconds, "timed_out": False}
+    texts, y = np.asarray(texts, dtype=object), np.asarray(y)
+    if len(y) < MIN_SEARCH_ROWS:
+        print(f"[SEARCH] {len(y)} rows is too few to search, using {DEFAULT_PARAMS}")
+        result["elapsed_seconds"] = 0.0
+        return result
+
+    classes, y_codes = np.unique(y.astype(str), return_inverse=True)
+    rows = np.arange(len(y))
+    _, counts = np.unique(y_codes, return_counts=True)
+    fit_rows, val_rows = train_test_split(rows, test_size=VALIDATION_FRACTION, random_state=42,
+                                          stratify=y_codes if (counts >= 2).all() else None)
+    # shuffled, so every rung's sample (a prefix) is a random subset of the fitting rows
+    fit_rows = np.random.default_rng(42).permutation(fit_rows)
+
+    workdir = tempfile.mkdtemp(prefix="tlrl-search-")
+    pool = None
+    try:
+        terms = _share_features(workdir, texts, y_codes, fit_rows, val_rows)
+        if time.monotonic() >= deadline:
+            result["timed_out"] = True
+            print(f"[SEARCH] budget of {budget_seconds}s used up building features, using {DEFAULT_PARAMS}")
+            return result
+        survivors = candidates()
+        sizes = _rung_sizes(len(fit_rows), len(survivors))
+        pool = ProcessPoolExecutor(max_workers=max(1, int(workers)),
+                                   mp_context=multiprocessing.get_context("spawn"))
+        for rung, n_fit in enumerate(sizes):
+            futures = {pool.submit(_evaluate_candidate, workdir, params, n_fit): params for params in survivors}
+            done, pending = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+            scored = []
+            for fut in done:
+                params = futures[fut]
+                try:
+                    score = fut.result()
+                except Exception as e:
+                    print(f"[SEARCH] candidate {params} failed:", e)
+                    continue
+                scored.append((score["f1"], params))
+                result["table"].append({"rung": rung, "n_fit": int(n_fit), **_jsonable(params), **score})
+            result["rungs"].append({"n_fit": int(n_fit), "candidates": len(futures), "finished": len(scored)})
+            if scored:
+                # candidates order breaks ties, so the outcome does not depend on completion order
+                order = {id(p): i for i, p in enumerate(survivors)}
+                scored.sort(key=lambda s: (-s[0], order[id(s[1])]))
+                result["params"] = dict(scored[0][1])
+                result["vocabulary"] = terms[_ngram_key(scored[0][1]["ngram_range"])][:scored[0][1]["max_features"]]
+            if pending:
+                result["timed_out"] = True
+                print(f"[SEARCH] budget of {budget_seconds}s used up in rung {rung} "
+                      f"({len(scored)}/{len(futures)} candidates finished)")
+                break
+            survivors = [p for _, p in scored[:max(1, math.ceil(len(scored) / HALVING_FACTOR))]]
+    finally:
+        result["elapsed_seconds"] = round(time.monotonic() - started, 3)
+        if pool is not None:
+            if result["timed_out"]:
+                for proc in list(getattr(pool, "_processes", {}).values()):
+                    proc.terminate()
+            pool.shutdown(wait=not result["timed_out"], cancel_futures=True)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"[SEARCH] best {result['params']} after {result['elapsed_seconds']}s "
+          f"({len(result['table'])} fits over {len(result['rungs'])} rung(s))")
+    return result
+
+
+def _jsonable(params: dict) -> dict:
+    return {k: list(v) if isinstance(v, tuple) else v for k, v in params.items()}
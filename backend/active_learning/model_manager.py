@@ -1,40 +1,48 @@
 # model_manager.py
-import os, glob, json, joblib
+import os, glob, json, joblib, threading, uuid
 import numpy as np
-from typing import Tuple, Dict
+from typing import Tuple, Dict, List
 
 SUBMODELS_ROOT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "submodels", "tlrl")
 
-# ------------ initialize global model state ------------
-_MODEL = None
-_VECT = None
-_VERSION = "v1"
-# ------------------------------------------------------
+from .model_registry import ModelBundle, ModelRegistry
+from .compact_vectorizer import save_compact, load_compact
 
+# try to load config from sqlite; fallback to defaults below
+try:
+    from app.sqlite_config import load_settings
+    _cfg = load_settings()
+except Exception:
+    _cfg = {}
 
-def list_versions():
-    paths = sorted(glob.glob(os.path.join(SUBMODELS_ROOT, "v*")))
-    return [os.path.basename(p) for p in paths]
+MODEL_CACHE_SIZE = _cfg.get("MODEL_CACHE_SIZE", 3)  # TF-IDF versions kept loaded
+DEFAULT_VERSION = "v1"                              # served until another version is activated
 
-def load_model(version: str = None):
-    """
-    Load latest model if version=None. Sets global _MODEL, _VECT, _VERSION and returns (model, vectorizer, metadata)
-    """
-    global _MODEL, _VECT, _VERSION
 
-    if version is None:
-        versions = list_versions()
-        if not versions:
-            raise FileNotFoundError("No model versions found in submodels/tlrl")
-        version = versions[-1]  # latest
+def _version_key(v: str):
+    try:
+        return (0, int(v.lstrip("v")))
+    except ValueError:
+        return (1, v)
+
+def list_versions():
+    paths = glob.glob(os.path.join(SUBMODELS_ROOT, "v*"))
+    # numeric order, so v10 sorts after v9
+    return sorted((os.path.basename(p) for p in paths), key=_version_key)
 
+def _load_bundle(version: str) -> ModelBundle:
     vpath = os.path.join(SUBMODELS_ROOT, version)
     model_path = os.path.join(vpath, "model.joblib")
     vec_path = os.path.join(vpath, "vectorizer.joblib")
     meta_path = os.path.join(vpath, "metadata.json")
 
-    model = joblib.load(model_path)
-    vectorizer = joblib.load(vec_path)
+    # numpy arrays inside the (uncompressed) joblib files are memory-mapped read-only,
+    # so every uvicorn worker on the host shares the same pages via the OS page cache
+    model = joblib.load(model_path, mmap_mode="r")
+    # prefer the array-backed vocabulary (no per-term Python objects); older versions only have joblib
+    vectorizer = load_compact(vpath)
+    if vectorizer is None:
+        vectorizer = joblib.load(vec_path, mmap_mode="r")
 
     metadata = {}
     if os.path.exists(meta_path):
@@ -42,71 +50,125 @@ def load_model(version: str = None):
             metadata = json.load(f)
     metadata.setdefault("version", version)
 
-    # set globals so predict_text can use them
-    _MODEL = model
-    _VECT = vectorizer
-    _VERSION = metadata.get("version", version)
+    return ModelBundle(metadata.get("version", version), model, vectorizer, metadata)
+
+def load_version_for_training(version: str):
+    """
+    (model, sklearn vectorizer, metadata) of `version` as private, writable copies
+    (no mmap, joblib vectorizer rather than the compact one) for an incremental retrain to start from.
+    """
+    vpath = os.path.join(SUBMODELS_ROOT, version)
+    if not os.path.isdir(vpath):
+        raise FileNotFoundError(f"Model version {version} not found in submodels/tlrl")
+    model = joblib.load(os.path.join(vpath, "model.joblib"))
+    vectorizer = joblib.load(os.path.join(vpath, "vectorizer.joblib"))
+    metadata = {}
+    meta_path = os.path.join(vpath, "metadata.json")
+    if os.path.exists(meta_path):
+        with open(meta_path, "r") as f:
+            metadata = json.load(f)
+    return model, vectorizer, metadata
+
+# ------------ loaded versions + the active one ------------
+_REGISTRY = ModelRegistry(_load_bundle, max_loaded=MODEL_CACHE_SIZE, default_version=DEFAULT_VERSION)
+# ------------------------------------------------------
 
-    return _MODEL, _VECT, metadata
+def get_registry() -> ModelRegistry:
+    return _REGISTRY
 
-def predict_text(text: str) -> Tuple[str, dict, float, str]:
+def load_model(version: str = None):
     """
-    Returns: label, probs_dict, confidence (0..1 float), version
+    Load latest model if version=None, make it the active version and return (model, vectorizer, metadata)
     """
-    global _MODEL, _VECT, _VERSION
-    if _MODEL is None or _VECT is None:
-        load_model(_VERSION)
+    if version is None:
+        versions = list_versions()
+        if not versions:
+            raise FileNotFoundError("No model versions found in submodels/tlrl")
+        version = versions[-1]  # latest
 
-    x = _VECT.transform([text])
+    bundle = _REGISTRY.activate(version)
+    return bundle.model, bundle.vectorizer, bundle.metadata
+
+def predict_texts(texts: List[str]) -> List[Tuple[str, dict, float, str]]:
+    """
+    Vectorized TF-IDF prediction: one transform + predict_proba over the sparse matrix.
+    Returns a (label, probs_dict, confidence (0..1 float), version) tuple per text.
+    """
+    # read the active bundle once: model and vectorizer always belong to the same version
+    bundle = _REGISTRY.active()
+    if not texts:
+        return []
+
+    x = bundle.vectorizer.transform(list(texts))
+    out = []
     # If model supports predict_proba
-    if hasattr(_MODEL, "predict_proba"):
-        probs_arr = _MODEL.predict_proba(x)[0]           # e.g. [0.1,0.8,0.1]
-        classes = list(_MODEL.classes_)                  # e.g. ['neg','neu','pos']
-        probs = {str(c): float(p) for c, p in zip(classes, probs_arr)}
+    if hasattr(bundle.model, "predict_proba"):
+        probs_mat = bundle.model.predict_proba(x)           # rows e.g. [0.1,0.8,0.1]
+        classes = [str(c) for c in bundle.model.classes_]  # e.g. ['neg','neu','pos']
         # Ensure probs scaled 0..1 (sometimes saved as percentages)
         # If values look >1, convert to 0..1
-        if any(p > 1.0 for p in probs.values()):
-            probs = {k: float(v)/100.0 for k,v in probs.items()}
-        confidence = max(probs.values()) if probs else 0.0
-        label = max(probs, key=probs.get) if probs else _MODEL.predict(x)[0]
+        probs_mat = probs_mat / np.where(probs_mat.max(axis=1, keepdims=True) > 1.0, 100.0, 1.0)
+        best = probs_mat.argmax(axis=1)
+        for row, b in zip(probs_mat, best):
+            probs = {c: float(p) for c, p in zip(classes, row)}
+            # safety clamp
+            confidence = float(max(0.0, min(1.0, row[b])))
+            out.append((classes[b], probs, confidence, bundle.version))
     else:
         # fallback: predict only
-        label = _MODEL.predict(x)[0]
-        probs = {label: 1.0}
-        confidence = 1.0
+        for label in bundle.model.predict(x):
+            out.append((label, {label: 1.0}, 1.0, bundle.version))
+    return out
 
-    # safety clamp
-    confidence = float(max(0.0, min(1.0, confidence)))
-
-    return label, probs, confidence, _VERSION
+def predict_text(text: str) -> Tuple[str, dict, float, str]:
+    """
+    Returns: label, probs_dict, confidence (0..1 float), version
+    """
+    return predict_texts([text])[0]
     
-def save_new_version(model, vectorizer, metrics: dict, base_version: str = None) -> str:
+def save_new_version(model, vectorizer, metrics: dict, base_version: str = None, activate: bool = False,
+                     extra_meta: dict = None) -> str:
     """
-    Save model+vectorizer as new version (v{n+1}) and write metadata.json
+    Save model+vectorizer as new version (v{n+1}) and write metadata.json (plus `extra_meta`).
+    The served version does not change unless activate=True: then the new version is preloaded
+    in the background and becomes active once loaded.
     Returns new_version string (e.g., 'v2')
     """
     os.makedirs(SUBMODELS_ROOT, exist_ok=True)
-    existing = list_versions()
-    last_idx = 0
-    for v in existing:
+    # write into a hidden temp dir and rename, so list_versions() never sees a half-written version
+    vpath = os.path.join(SUBMODELS_ROOT, f".tmp-{uuid.uuid4().hex}")
+    os.makedirs(vpath)
+    # keep these uncompressed: compressed joblib files cannot be memory-mapped on load
+    joblib.dump(model, os.path.join(vpath, "model.joblib"), compress=0)
+    joblib.dump(vectorizer, os.path.join(vpath, "vectorizer.joblib"), compress=0)
+    save_compact(vectorizer, vpath)
+
+    # several retrain processes may finish at once: the rename claims v{n+1}, a lost race retries with the next n
+    while True:
+        last_idx = 0
+        for v in list_versions():
+            try:
+                last_idx = max(last_idx, int(v.lstrip("v")))
+            except:
+                pass
+        new_version = f"v{last_idx + 1}"
+        meta = {
+            "version": new_version,
+            "base_version": base_version,
+            "metrics": metrics,
+            **(extra_meta or {}),
+        }
+        with open(os.path.join(vpath, "metadata.json"), "w") as f:
+            json.dump(meta, f, indent=2)
         try:
-            idx = int(v.lstrip("v"))
-            last_idx = max(last_idx, idx)
-        except:
-            pass
-    new_idx = last_idx + 1
-    new_version = f"v{new_idx}"
-    vpath = os.path.join(SUBMODELS_ROOT, new_version)
-    os.makedirs(vpath, exist_ok=True)
-    joblib.dump(model, os.path.join(vpath, "model.joblib"))
-    joblib.dump(vectorizer, os.path.join(vpath, "vectorizer.joblib"))
-    meta = {
-        "version": new_version,
-        "base_version": base_version,
-        "metrics": metrics
-    }
-    with open(os.path.join(vpath, "metadata.json"), "w") as f:
-        json.dump(meta, f, indent=2)
+            os.rename(vpath, os.path.join(SUBMODELS_ROOT, new_version))
+            break
+        except OSError:
+            if not os.path.exists(os.path.join(SUBMODELS_ROOT, new_version)):
+                raise
+    if activate:
+        # load off the request path and swap in once ready
+        _REGISTRY.preload(new_version, activate=True)
     return new_version
 
 
@@ -114,8 +176,8 @@ def save_new_version(model, vectorizer, metrics: dict, base_version: str = None)
 # -------------------------
 # Transformer (DistilBERT) loader + predictor
 # -------------------------
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
+# transformers / torch / safetensors are imported on first use (load_transformer), not at app import
+from app.inference_backend import apply_backend, hf_auto_classes, model_device
 
 # path to transformer files (your folder: submodels/transformer)
 _TRANS_ROOT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "submodels", "transformer")
@@ -123,72 +185,139 @@ _TRANS_MODEL = None
 _TRANS_TOKENIZER = None
 _TRANS_ID2LABEL = None
 _TRANS_LABEL2ID = None
+_TRANS_BACKEND = "torch"
+_TRANS_LOCK = threading.Lock()
+TRANS_BULK_BATCH = 64  # texts per forward pass for bulk prediction
+INFERENCE_BACKEND_TRANSFORMER = _cfg.get("INFERENCE_BACKEND_TRANSFORMER", "torch")  # torch | int8 | onnx | onnx-int8
+
+def _load_transformer_mmap(root: str):
+    """
+    Build the model from config.json and point its parameters at the memory-mapped
+    model.safetensors (load_state_dict(assign=True) keeps the mapped tensors instead of
+    copying them), so worker processes share the weights through the page cache.
+    Returns None when the checkpoint does not map cleanly; the caller falls back to from_pretrained.
+    """
+    path = os.path.join(root, "model.safetensors")
+    if not os.path.exists(path):
+        return None
+    AutoConfig, _, AutoModelForSequenceClassification = hf_auto_classes()
+    from safetensors.torch import load_file as load_safetensors
+
+    try:
+        config = AutoConfig.from_pretrained(root, local_files_only=True)
+        model = AutoModelForSequenceClassification.from_config(config)
+        state = load_safetensors(path)
+        missing, unexpected = model.load_state_dict(state, assign=True, strict=False)
+        if missing or unexpected:
+            print("[TRANSFORMER] safetensors keys do not match the config, loading a private copy instead")
+            return None
+        model.tie_weights()
+        return model
+    except Exception as e:
+        print("[TRANSFORMER] mmap load failed, loading a private copy instead:", e)
+        return None
 
 def load_transformer():
     """
     Loads transformer artifacts from submodels/transformer into module globals.
+    Guarded by a lock: concurrent first callers wait for the one load in progress.
     """
-    global _TRANS_MODEL, _TRANS_TOKENIZER, _TRANS_ID2LABEL, _TRANS_LABEL2ID
+    global _TRANS_MODEL, _TRANS_TOKENIZER, _TRANS_ID2LABEL, _TRANS_LABEL2ID, _TRANS_BACKEND
     if _TRANS_MODEL is not None:
         return _TRANS_MODEL, _TRANS_TOKENIZER
 
-    # required files should be in the folder (config.json, pytorch_model.bin, tokenizer files, id2label/label2id)
-    _TRANS_TOKENIZER = AutoTokenizer.from_pretrained(_TRANS_ROOT)
-    _TRANS_MODEL = AutoModelForSequenceClassification.from_pretrained(_TRANS_ROOT, local_files_only=True)
+    with _TRANS_LOCK:
+        if _TRANS_MODEL is not None:
+            return _TRANS_MODEL, _TRANS_TOKENIZER
+        _, AutoTokenizer, AutoModelForSequenceClassification = hf_auto_classes()
 
-    # try to load id2label/label2id if present
-    try:
-        with open(os.path.join(_TRANS_ROOT, "id2label.json"), "r") as f:
-            _TRANS_ID2LABEL = json.load(f)
-    except:
-        _TRANS_ID2LABEL = None
-    try:
-        with open(os.path.join(_TRANS_ROOT, "label2id.json"), "r") as f:
-            _TRANS_LABEL2ID = json.load(f)
-    except:
-        _TRANS_LABEL2ID = None
+        # required files should be in the folder (config.json, model.safetensors or pytorch_model.bin, tokenizer files, id2label/label2id)
+        tokenizer = AutoTokenizer.from_pretrained(_TRANS_ROOT)
+        model = _load_transformer_mmap(_TRANS_ROOT)
+        if model is None:
+            model = AutoModelForSequenceClassification.from_pretrained(_TRANS_ROOT, local_files_only=True)
+        model.eval()
+        model, backend = apply_backend(model, tokenizer, INFERENCE_BACKEND_TRANSFORMER, "transformer")
+
+        # try to load id2label/label2id if present
+        try:
+            with open(os.path.join(_TRANS_ROOT, "id2label.json"), "r") as f:
+                _TRANS_ID2LABEL = json.load(f)
+        except:
+            _TRANS_ID2LABEL = None
+        try:
+            with open(os.path.join(_TRANS_ROOT, "label2id.json"), "r") as f:
+                _TRANS_LABEL2ID = json.load(f)
+        except:
+            _TRANS_LABEL2ID = None
+
+        # publish the model last: a non-None _TRANS_MODEL means everything else is set
+        _TRANS_TOKENIZER, _TRANS_BACKEND = tokenizer, backend
+        _TRANS_MODEL = model
 
     return _TRANS_MODEL, _TRANS_TOKENIZER
 
-def predict_text_transformer(text: str) -> Tuple[str, dict, float, str]:
+def _transformer_classes(n: int):
+    # build classes: if id2label exists use it, else use numeric ids
+    if _TRANS_ID2LABEL:
+        return [ _TRANS_ID2LABEL.get(str(i), str(i)) for i in range(n) ]
+    # use model.config.id2label if available
+    cfg_map = getattr(_TRANS_MODEL.config, "id2label", None)
+    if cfg_map:
+        return [ cfg_map.get(i, str(i)) for i in range(n) ]
+    return [str(i) for i in range(n)]
+
+def predict_texts_transformer(texts: List[str]) -> List[Tuple[str, dict, float, str]]:
     """
-    Predict with transformer model. Returns: label, probs_dict, confidence, version
-    version returned as 'transformer'
+    Batched transformer prediction: one padded forward pass for all `texts`.
+    Returns a (label, probs_dict, confidence, version) tuple per text, in order.
     """
     load_transformer()
-    global _TRANS_MODEL, _TRANS_TOKENIZER, _TRANS_ID2LABEL, _TRANS_LABEL2ID
     if _TRANS_MODEL is None or _TRANS_TOKENIZER is None:
         raise FileNotFoundError("Transformer model/tokenizer not found in submodels/transformer")
+    if not texts:
+        return []
+    import torch
 
-    # tokenize
-    enc = _TRANS_TOKENIZER([text], padding=True, truncation=True, max_length=128, return_tensors="pt")
+    # tokenize (padded to the longest text in the batch)
+    enc = _TRANS_TOKENIZER(list(texts), padding=True, truncation=True, max_length=128, return_tensors="pt")
     # move inputs to model device if necessary
-    device = next(_TRANS_MODEL.parameters()).device
+    device = model_device(_TRANS_MODEL)
     enc = {k: v.to(device) for k, v in enc.items()}
 
-    _TRANS_MODEL.eval()
     with torch.no_grad():
         outputs = _TRANS_MODEL(**enc)
-        logits = outputs.logits[0]
-        probs = torch.softmax(logits, dim=-1).cpu().numpy().tolist()
+        probs_batch = torch.softmax(outputs.logits, dim=-1).cpu().numpy().tolist()
 
-    # build classes: if id2label exists use it, else use numeric ids
-    if _TRANS_ID2LABEL:
-        classes = [ _TRANS_ID2LABEL.get(str(i), str(i)) for i in range(len(probs)) ]
-    else:
-        # use model.config.id2label if available
-        cfg_map = getattr(_TRANS_MODEL.config, "id2label", None)
-        if cfg_map:
-            classes = [ cfg_map.get(i, str(i)) for i in range(len(probs)) ]
-        else:
-            classes = [str(i) for i in range(len(probs))]
-
-    probs_dict = {c: float(p) for c, p in zip(classes, probs)}
-    if any(v > 1.0 for v in probs_dict.values()):
-        probs_dict = {k: v/100.0 for k, v in probs_dict.items()}
-
-    label = max(probs_dict, key=probs_dict.get)
-    confidence = float(max(probs_dict.values()))
-    confidence = float(max(0.0, min(1.0, confidence)))
-
-    return label, probs_dict, confidence, "transformer"
+    classes = _transformer_classes(len(probs_batch[0]))
+    out = []
+    for probs in probs_batch:
+        probs_dict = {c: float(p) for c, p in zip(classes, probs)}
+        if any(v > 1.0 for v in probs_dict.values()):
+            probs_dict = {k: v/100.0 for k, v in probs_dict.items()}
+
+        label = max(probs_dict, key=probs_dict.get)
+        confidence = float(max(probs_dict.values()))
+        confidence = float(max(0.0, min(1.0, confidence)))
+        out.append((label, probs_dict, confidence, "transformer"))
+    return out
+
+def predict_texts_transformer_bulk(texts: List[str], batch_size: int = TRANS_BULK_BATCH) -> List[Tuple[str, dict, float, str]]:
+    """
+    Chunked transformer prediction for large lists. Texts are grouped by length so each
+    batch pads little; results come back in input order.
+    """
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    out = [None] * len(texts)
+    for start in range(0, len(order), batch_size):
+        idx = order[start:start + batch_size]
+        for i, res in zip(idx, predict_texts_transformer([texts[i] for i in idx])):
+            out[i] = res
+    return out
+
+def predict_text_transformer(text: str) -> Tuple[str, dict, float, str]:
+    """
+    Predict with transformer model. Returns: label, probs_dict, confidence, version
+    version returned as 'transformer'
+    """
+    return predict_texts_transformer([text])[0]
@@ -0,0 +1,106 @@
+# model_registry.py
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+
+class ModelBundle(NamedTuple):
+    """One loaded TF-IDF version; model and vectorizer always travel together."""
+    version: str
+    model: Any
+    vectorizer: Any
+    metadata: Dict
+
+
+class ModelRegistry:
+    """
+    Keeps up to `max_loaded` versions in memory (LRU, the active one is never evicted).
+      - get(version): loaded bundle, loading it once even under concurrent callers
+      - activate(version): load first, then swap the active bundle in one assignment,
+        so readers see either the old (model, vectorizer) pair or the new one
+      - preload(version, activate): same, on a background thread
+    """
+
+    def __init__(self, loader: Callable[[str], ModelBundle], max_loaded: int = 3,
+                 default_version: Optional[str] = None):
+        self._loader = loader
+        self.max_loaded = max(1, int(max_loaded))
+        self.default_version = default_version
+        self._bundles = OrderedDict()   # requested version -> ModelBundle
+        self._inflight = {}             # version -> Event, one loader per version
+        self._lock = threading.Lock()
+        self._activate_lock = threading.Lock()
+        self._active = None
+
+    def get(self, version: str) -> ModelBundle:
+        while True:
+            with self._lock:
+                bundle = self._bundles.get(version)
+                if bundle is not None:
+                    self._bundles.move_to_end(version)
+                    return bundle
+                event = self._inflight.get(version)
+                owner = event is None
+                if owner:
+                    event = self._inflight[version] = threading.Event()
+            if not owner:
+                # another thread is loading it; re-check once it finishes (or failed)
+                event.wait()
+                continue
+            try:
+                bundle = self._loader(version)
+                with self._lock:
+                    self._bundles[version] = bundle
+                    self._evict()
+                return bundle
+            finally:
+                with self._lock:
+                    self._inflight.pop(version, None)
+                event.set()
+
+    def _evict(self):
+        active = self._active
+        for v in list(self._bundles):
+            if len(self._bundles) <= self.max_loaded:
+                break
+            if active is not None and self._bundles[v] is active:
+                continue
+            del self._bundles[v]
+
+    def activate(self, version: str) -> ModelBundle:
+        bundle = self.get(version)
+        with self._activate_lock:
+            self._active = bundle
+        return bundle
+
+    def active(self) -> ModelBundle:
+        bundle = self._active
+        if bundle is not None:
+            return bundle
+        # cold process: load the default once (warm-up normally does this before traffic)
+        with self._activate_lock:
+            if self._active is None:
+                self._active = self.get(self.default_version)
+            return self._active
+
+    def preload(self, version: str, activate: bool = False) -> threading.Thread:
+        def _run():
+            try:
+                self.activate(version) if activate else self.get(version)
+                print(f"[REGISTRY] {'Activated' if activate else 'Preloaded'} model {version}")
+            except Exception as e:
+                print(f"[REGISTRY] Failed to preload model {version}:", e)
+
+        t = threading.Thread(target=_run, daemon=True, name=f"preload-{version}")
+        t.start()
+        return t
+
+    def status(self) -> dict:
+        with self._lock:
+            loaded: List[str] = list(self._bundles)
+        active = self._active
+        return {
+            "active": active.version if active is not None else None,
+            "loaded": loaded,
+            "max_loaded": self.max_loaded,
+        }
@@ -1,241 +1,733 @@
 # retrain_worker.py
-import threading, queue, time
+"""
+Durable retrain scheduler backed by the `retrain_jobs` collection.
+
+One document per job, updated in place:
+    queued -> running -> done | failed
+  - submit_retrain_job() inserts the queued document; any API process may pick it up
+  - a scheduler thread per process claims jobs atomically (find_one_and_update) and trains
+    up to RETRAIN_WORKERS of them at once in a process pool
+  - while a job runs its owner renews `lease_until` (heartbeat); a job whose lease expires
+    (its process died) is claimed again, up to RETRAIN_MAX_ATTEMPTS times
+  - progress / results are written to the same document, filtered on the owner, so a
+    process that lost its lease cannot overwrite the new owner's state
+
+Two training modes (job field `mode`, default RETRAIN_MODE):
+  - full         refit vectorizer + classifier on the dataset and every corrected feedback
+  - incremental  start from base_version: frozen vocabulary, classifier warm-started from its
+                 coefficients, trained only on feedback newer than the base's feedback_watermark
+Every version records in metadata.json the feedback_watermark it has seen up to.
+
+Full jobs with `search` on (default RETRAIN_SEARCH) first run the hyperparameter search of
+hparam_search.py on the training rows, bounded by RETRAIN_SEARCH_BUDGET_SECONDS.
+"""
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
 from typing import Dict, Any
-from .model_manager import save_new_version, load_model
+
+from pymongo import ReturnDocument
+
+from .model_manager import save_new_version, load_model, load_version_for_training, get_registry
+from .hparam_search import DEFAULT_PARAMS, MAX_ITER, run_search
+from .feedback_export import feedback_rows
 from .utils import compute_basic_metrics
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import confusion_matrix, precision_recall_curve, roc_auc_score
-from sklearn.preprocessing import label_binarize
 import numpy as np
-from datetime import datetime
 
-from sklearn.feature_extraction.text import TfidfVectorizer
-import pandas as pd
 from app.db import get_db
    # assumes you have get_db() in backend/db.py
 
-_JOB_QUEUE = queue.Queue()
-_JOBS = {}  # job_id -> status dict
-
-def start_worker_thread():
-    t = threading.Thread(target=_worker_loop, daemon=True)
-    t.start()
-
-def submit_retrain_job(job_id: str, dataset_path: str, include_feedbacks: bool = True, base_version: str = None):
-    _JOBS[job_id] = {"status": "queued", "progress": 0}
-    _JOB_QUEUE.put((job_id, dataset_path, include_feedbacks, base_version))
+# try to load config from sqlite; fallback to defaults below
+try:
+    from app.sqlite_config import load_settings
+    _cfg = load_settings()
+except Exception:
+    _cfg = {}
+
+RETRAIN_WORKERS = _cfg.get("RETRAIN_WORKERS", 2)               # training processes per API process
+RETRAIN_LEASE_SECONDS = _cfg.get("RETRAIN_LEASE_SECONDS", 60)  # a running job is reclaimed this long after its last heartbeat
+RETRAIN_MAX_ATTEMPTS = 3                                       # claims per job before it is marked failed
+RETRAIN_MODE = _cfg.get("RETRAIN_MODE", "full")                # full | incremental, for jobs that do not choose
+RETRAIN_INCREMENTAL_ANCHOR = _cfg.get("RETRAIN_INCREMENTAL_ANCHOR", 0.01)  # pull towards the base weights
+FEEDBACK_WATERMARK_LAG_SECONDS = _cfg.get("FEEDBACK_WATERMARK_LAG_SECONDS", 30)  # feedback younger than this waits for the next retrain
+RETRAIN_MODES = ("full", "incremental")
+RETRAIN_SEARCH = bool(_cfg.get("RETRAIN_SEARCH", 0))          # hyperparameter search for jobs that do not choose
+RETRAIN_SEARCH_BUDGET_SECONDS = _cfg.get("RETRAIN_SEARCH_BUDGET_SECONDS", 300)   # wall clock per search
+RETRAIN_SEARCH_WORKERS = _cfg.get("RETRAIN_SEARCH_WORKERS", max(1, (os.cpu_count() or 2) - 1))  # search processes
+RETRAIN_MIN_ROWS = 5                                           # rows needed for a train / calibration / test split
+PROMOTE_METRIC = "f1"                                          # compared with the active version for promote_if_improved
+TEST_FRACTION = 0.2                                            # rows held out for the metrics in metrics_history
+CALIBRATION_FRACTION = 0.1                                     # rows held out for probability calibration
+_POLL_SECONDS = 2.0
+
+# identifies this process as the owner of the jobs it claims
+_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def _now():
+    return datetime.utcnow()
+
+
+def submit_retrain_job(job_id: str, dataset_path: str, include_feedbacks: bool = True, base_version: str = None,
+                       mode: str = None, search: bool = None, promote_if_improved: bool = False):
+    """
+    Queue a job (one retrain_jobs document) and wake the local scheduler.
+    An incremental job without base_version starts from the active version.
+    The new version is only preloaded; with promote_if_improved it is also activated when its
+    PROMOTE_METRIC beats the active version's.
+    """
+    mode = mode or RETRAIN_MODE
+    search = RETRAIN_SEARCH if search is None else bool(search)
+    if mode not in RETRAIN_MODES:
+        raise ValueError(f"Unknown retrain mode {mode!r}; use one of {RETRAIN_MODES}")
+    if mode == "incremental" and base_version is None:
+        base_version = get_registry().active().version
+    now = _now()
+    get_db().retrain_jobs.insert_one({
+        "job_id": job_id,
+        "status": "queued",
+        "progress": 0,
+        "message": None,
+        "dataset_path": dataset_path,
+        "include_feedbacks": include_feedbacks,
+        "base_version": base_version,
+        "mode": mode,
+        "search": search,
+        "promote_if_improved": bool(promote_if_improved),
+        "attempts": 0,
+        "owner": None,
+        "lease_until": None,
+        "created_at": now,
+        "updated_at": now,
+    })
+    get_scheduler().wake()
     return job_id
 
-def _worker_loop():
-    while True:
-        job_id, dataset_path, include_feedbacks, base_version = _JOB_QUEUE.get()
-        try:
-            _JOBS[job_id]["status"] = "running"
-            print(f"[RETRAIN] Job {job_id} started with dataset: {dataset_path}")
-            _JOBS[job_id]["progress"] = 5
-            
-            # load dataset
-            df = pd.read_csv(dataset_path)
-            df.columns = df.columns.str.strip().str.lower()
 
-                        # --- FIX: Normalize sentiment column ---
-            print("[RETRAIN] COLUMNS BEFORE RENAME:", df.columns.tolist())
+def get_retrain_job(job_id: str):
+    return get_db().retrain_jobs.find_one({"job_id": job_id}, {"_id": 0})
 
-            rename_map = {
-                "sentiment": "sentiment",
-                "corrected": "sentiment",
-                "label": "sentiment",
-                "labels": "sentiment",
-                "sentiments": "sentiment",
-                "sentiment_label": "sentiment",
-                "sentimentvalue": "sentiment",
-                "sentiment ": "sentiment",
-            }
 
-            # rename any matching column to "sentiment"
-            for col in list(df.columns):
-                if col in rename_map:
-                    df.rename(columns={col: "sentiment"}, inplace=True)
+# ----------------- Worker process -----------------
+def _set_progress(job_id: str, owner: str, progress: int):
+    get_db().retrain_jobs.update_one(
+        {"job_id": job_id, "owner": owner, "status": "running"},
+        {"$set": {"progress": progress, "updated_at": _now()}},
+    )
 
-            print("[RETRAIN] COLUMNS AFTER RENAME:", df.columns.tolist())
 
-            # if sentiment still missing → STOP with clear error
-            if "sentiment" not in df.columns:
-                raise ValueError(f"[RETRAIN ERROR] Missing 'sentiment' column. Found: {df.columns.tolist()}")
+def _run_job(job_id: str, owner: str, dataset_path: str, include_feedbacks: bool, base_version: str,
+             mode: str = "full", search: bool = False):
+    """Entry point in the training process; returns {"version", "metrics", "stage_seconds"}."""
+    print(f"[RETRAIN] Job {job_id} started ({mode}) with dataset: {dataset_path}")
+    _set_progress(job_id, owner, 5)
+    report = lambda pct: _set_progress(job_id, owner, pct)
+    if mode == "incremental":
+        new_version, metrics, timings = _train_incremental(dataset_path, base_version, report, search=search)
+    else:
+        new_version, metrics, timings = _train(dataset_path, include_feedbacks, base_version, report, search=search)
+    print(f"[RETRAIN] Job {job_id} finished. New version: {new_version}")
+    return {"version": new_version, "metrics": metrics, "stage_seconds": timings}
 
-            # optionally include feedbacks from DB
-            if include_feedbacks:
-                db = get_db()
-                feedbacks = list(db.feedbacks.find({"corrected": {"$ne": None}}))
-                if feedbacks:
-                    fb_df = pd.DataFrame(feedbacks)
-                    # ensure columns text, corrected
-                    if "text" in fb_df.columns and "corrected" in fb_df.columns:
-                        fb_df = fb_df[["text", "corrected"]].rename(columns={"corrected": "sentiment"})
-                        df = pd.concat([df, fb_df], ignore_index=True)
-            _JOBS[job_id]["progress"] = 25
-            # preprocess
-            df['text'] = df['text'].astype(str).str.lower()
-            print("[RETRAIN] CHECKPOINT 2: about to lowercase text")
 
-            X = df['text']
-            print("[RETRAIN] CHECKPOINT 3: before X = df['text']")
+# ----------------- Training data -----------------
+def _load_dataset(dataset_path: str):
+    import pandas as pd
 
+    # load dataset
+    df = pd.read_csv(dataset_path)
+    df.columns = df.columns.str.strip().str.lower()
 
-            y = df['sentiment']
-            print("[RETRAIN] CHECKPOINT 4: before y = df['sentiment']")
+    # --- FIX: Normalize sentiment column ---
+    print("[RETRAIN] COLUMNS BEFORE RENAME:", df.columns.tolist())
 
-            # vectorize & train new model
-            vectorizer = TfidfVectorizer(max_features=3000, ngram_range=(1,2))
+    rename_map = {
+        "sentiment": "sentiment",
+        "corrected": "sentiment",
+        "label": "sentiment",
+        "labels": "sentiment",
+        "sentiments": "sentiment",
+        "sentiment_label": "sentiment",
+        "sentimentvalue": "sentiment",
+        "sentiment ": "sentiment",
+    }
 
-            print("[RETRAIN] CHECKPOINT 5: before vectorizer")
+    # rename any matching column to "sentiment"
+    for col in list(df.columns):
+        if col in rename_map:
+            df.rename(columns={col: "sentiment"}, inplace=True)
 
+    print("[RETRAIN] COLUMNS AFTER RENAME:", df.columns.tolist())
 
+    # if sentiment still missing → STOP with clear error
+    if "sentiment" not in df.columns:
+        raise ValueError(f"[RETRAIN ERROR] Missing 'sentiment' column. Found: {df.columns.tolist()}")
+    return df
 
-            Xv = vectorizer.fit_transform(X)
 
-            print("[RETRAIN] CHECKPOINT 7: before calibration split")
+def _feedback_cutoff() -> datetime:
+    """
+    Newest saved_at a retrain may treat as fully written: feedback reaches Mongo through the
+    write-behind buffer, so a document can land after later ones. Anything newer is left for
+    the next incremental retrain instead of being skipped forever.
+    """
+    return _now() - timedelta(seconds=FEEDBACK_WATERMARK_LAG_SECONDS)
 
-            
 
-            # Base model
-            base_clf = LogisticRegression(max_iter=300, n_jobs=-1)
-            base_clf.fit(Xv, y)
+def _feedback_frame(query: dict):
+    """Corrected feedbacks matching `query` (streamed, deduplicated by text) as a (text, sentiment) frame, or None."""
+    import pandas as pd
 
-            # ---- CALIBRATION (robust) ----
-            from sklearn.calibration import CalibratedClassifierCV
-            from sklearn.model_selection import train_test_split
-            from sklearn.base import clone
-            import warnings
-            warnings.filterwarnings("ignore", category=UserWarning, module="sklearn.calibration")
+    texts, labels, _ = feedback_rows(query)
+    if not len(texts):
+        return None
+    return pd.DataFrame({"text": texts, "sentiment": labels})
 
-            print("[RETRAIN] CHECKPOINT 7.1: label counts for calibration split ->", df['sentiment'].value_counts().to_dict())
 
-            # choose stratify only if every class has >=2 samples
-            class_counts = df['sentiment'].value_counts()
-            stratify_arg = df['sentiment'] if (class_counts >= 2).all() else None
-            if stratify_arg is None:
-                print("[RETRAIN] WARNING: small class counts detected -> skipping stratify for calibration split")
+def _split(y):
+    """
+    The one split of row indices into (train, calibration, test) that every later stage reuses:
+    the classifier never sees calibration or test rows. Stratified when the classes allow it.
+    """
+    from sklearn.model_selection import train_test_split
 
-            try:
-                X_train_c, X_cal, y_train_c, y_cal = train_test_split(
-                    Xv, y, test_size=0.2, random_state=42, stratify=stratify_arg
-                )
-            except Exception as e:
-                # fallback: non-stratified split on raw X/y
-                print("[RETRAIN] train_test_split failed for calibration split:", str(e))
-                X_train_c, X_cal, y_train_c, y_cal = train_test_split(
-                    Xv, y, test_size=0.2, random_state=42
-                )
-
-            # if calibration data is too small or single-class, skip calibration
-            unique_cal = np.unique(y_cal)
-            if len(unique_cal) < 2 or len(y_cal) < 10:
-                print(f"[RETRAIN] INFO: calibration skipped (unique_cal={unique_cal}, n_cal={len(y_cal)}) — using base classifier without calibration")
-                clf = base_clf
-            else:
-                # pick method: isotonic needs more data; fallback to 'sigmoid' for small sets
-                method = "isotonic" if len(y_cal) >= 200 else "sigmoid"
-                print(f"[RETRAIN] INFO: running calibration with method={method}, n_cal={len(y_cal)}")
+    if len(y) < RETRAIN_MIN_ROWS:
+        raise ValueError(f"need at least {RETRAIN_MIN_ROWS} labelled rows to train, got {len(y)}")
+
+    def _cut(rows, size):
+        # choose stratify only if every class has >=2 samples
+        _, counts = np.unique(y[rows], return_counts=True)
+        try:
+            return train_test_split(rows, test_size=size, random_state=42,
+                                    stratify=y[rows] if (counts >= 2).all() else None)
+        except ValueError:
+            # too few rows per class for this many test rows
+            return train_test_split(rows, test_size=size, random_state=42)
+
+    rest, test = _cut(np.arange(len(y)), TEST_FRACTION)
+    train, cal = _cut(rest, CALIBRATION_FRACTION / (1.0 - TEST_FRACTION))
+    return train, cal, test
+
+
+@contextmanager
+def _stage(timings: dict, name: str):
+    """Adds the wall time of the block to timings[name] (seconds, reported in metrics_history)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round(timings.get(name, 0.0) + time.perf_counter() - started, 4)
+
+
+def _base_watermark(metadata: dict):
+    wm = metadata.get("feedback_watermark")
+    return datetime.fromisoformat(wm) if wm else None
+
+
+# ----------------- Full retrain -----------------
+def _train(dataset_path: str, include_feedbacks: bool, base_version: str, report, search: bool = False):
+    # training stack is imported in the worker process, keeping it out of app startup
+    import pandas as pd
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+
+    timings = {}
+    with _stage(timings, "load"):
+        df = _load_dataset(dataset_path)
+
+        # optionally include feedbacks from DB up to the cutoff: exactly what the new version has seen,
+        # so an incremental run from it (saved_at > watermark) never trains on them twice
+        watermark = _feedback_cutoff() if include_feedbacks else datetime(1970, 1, 1)
+        if include_feedbacks:
+            fb_df = _feedback_frame({"saved_at": {"$lte": watermark}, "corrected": {"$ne": None}})
+            if fb_df is not None:
+                df = pd.concat([df, fb_df], ignore_index=True)
+        # preprocess
+        X = df['text'].astype(str).str.lower().to_numpy()
+        y = df['sentiment'].to_numpy()
+    report(25)
+
+    with _stage(timings, "split"):
+        train, cal, test = _split(y)
+
+    # hyperparameters: searched on the training rows only (calibration / test rows stay unseen)
+    params, vocabulary, search_doc = dict(DEFAULT_PARAMS), None, None
+    if search:
+        with _stage(timings, "search"):
+            found = run_search(X[train], y[train], RETRAIN_SEARCH_BUDGET_SECONDS, RETRAIN_SEARCH_WORKERS)
+        params, vocabulary = found["params"], found["vocabulary"]
+        search_doc = {k: v for k, v in found.items() if k != "vocabulary"}
+        search_doc["params"] = {k: list(v) if isinstance(v, tuple) else v for k, v in params.items()}
+    report(40)
+
+    # vectorizer fitted on the training rows only; every row is transformed exactly once
+    with _stage(timings, "vectorize"):
+        if vocabulary is not None:
+            # exactly the features the search scored for the winner
+            vectorizer = TfidfVectorizer(ngram_range=params["ngram_range"], vocabulary=vocabulary)
+        else:
+            vectorizer = TfidfVectorizer(max_features=params["max_features"], ngram_range=params["ngram_range"])
+        X_train = vectorizer.fit_transform(X[train])
+        X_cal, X_test = vectorizer.transform(X[cal]), vectorizer.transform(X[test])
+
+    # Base model
+    with _stage(timings, "fit"):
+        base_clf = LogisticRegression(C=params["C"], max_iter=MAX_ITER, n_jobs=-1)
+        base_clf.fit(X_train, y[train])
+
+    with _stage(timings, "calibrate"):
+        clf = _calibrate(base_clf, X_cal, y[cal])
+    report(70)
+    return _evaluate_and_save(clf, vectorizer, X_test, y[test], base_version, report, timings,
+                              {"train_mode": "full", "feedback_watermark": watermark.isoformat(),
+                               "n_samples": int(len(y)),
+                               "hyperparameters": {"ngram_range": list(params["ngram_range"]),
+                                                   "max_features": params["max_features"], "C": params["C"]}},
+                              search=search_doc)
+
+
+# ----------------- Incremental retrain -----------------
+def _train_incremental(dataset_path: str, base_version: str, report, search: bool = False):
+    """
+    Update `base_version` with only what it has not seen: corrected feedback newer than its
+    feedback_watermark (plus the uploaded dataset, if any). The vocabulary / idf weights are
+    frozen and the classifier is warm-started from the base coefficients, so the cost scales
+    with the delta instead of the whole history.
+    Falls back to a full retrain when the base cannot be updated in place (no watermark,
+    not a linear model, or the delta has a label the base does not know).
+    The base's hyperparameters are kept; `search` only applies if it falls back to a full retrain.
+    """
+    import pandas as pd
+
+    timings = {}
+    with _stage(timings, "load"):
+        base_clf, vectorizer, base_meta = load_version_for_training(base_version)
+        linear = _linear_estimator(base_clf)
+        since = _base_watermark(base_meta)
+
+    def _fall_back(reason):
+        if not dataset_path:
+            raise ValueError(f"incremental retrain of {base_version} not possible ({reason}); "
+                             f"run a full retrain with a dataset")
+        print(f"[RETRAIN] {base_version}: {reason} -> full retrain")
+        return _train(dataset_path, True, base_version, report, search=search)
+
+    if since is None:
+        return _fall_back("no feedback watermark")
+    if linear is None:
+        return _fall_back(f"{type(base_clf).__name__} cannot be warm-started")
+
+    # only feedback the base has not seen: (base watermark, cutoff]
+    with _stage(timings, "load"):
+        cutoff = _feedback_cutoff()
+        parts = [_load_dataset(dataset_path)[["text", "sentiment"]]] if dataset_path else []
+        fb_df = _feedback_frame({"saved_at": {"$gt": since, "$lte": cutoff}, "corrected": {"$ne": None}})
+        if fb_df is not None:
+            parts.append(fb_df)
+        if not parts:
+            raise ValueError(f"no corrected feedback since {base_version}'s watermark ({since.isoformat()})")
+        df = pd.concat(parts, ignore_index=True)
+        X = df['text'].astype(str).str.lower().to_numpy()
+        y = df['sentiment'].to_numpy()
+    report(25)
+
+    unknown = sorted({str(c) for c in y} - {str(c) for c in linear.classes_})
+    if unknown:
+        return _fall_back(f"new label(s) {unknown}")
+    print(f"[RETRAIN] incremental update of {base_version} on {len(df)} rows "
+          f"(feedback since {since.isoformat()})")
+
+    with _stage(timings, "split"):
+        train, cal, test = _split(y)
+    # frozen vocabulary: transform only, never refit
+    with _stage(timings, "vectorize"):
+        X_train, X_cal, X_test = (vectorizer.transform(X[rows]) for rows in (train, cal, test))
+    with _stage(timings, "fit"):
+        updated = _warm_start_update(linear, X_train, y[train])
+    with _stage(timings, "calibrate"):
+        clf = _calibrate(updated, X_cal, y[cal])
+    report(70)
+    return _evaluate_and_save(clf, vectorizer, X_test, y[test], base_version, report, timings,
+                              {"train_mode": "incremental", "feedback_watermark": cutoff.isoformat(),
+                               "n_samples": int(len(y))})
+
+
+def _linear_estimator(clf):
+    """The LogisticRegression inside `clf` (plain, or the prefit estimator of a calibrated one)."""
+    from sklearn.linear_model import LogisticRegression
+
+    if isinstance(clf, LogisticRegression):
+        return clf
+    calibrated = getattr(clf, "calibrated_classifiers_", None)
+    if calibrated:
+        inner = getattr(calibrated[0], "estimator", None)
+        inner = getattr(inner, "estimator", inner)  # unwrap FrozenEstimator
+        if isinstance(inner, LogisticRegression):
+            return inner
+    return None
+
+
+def _warm_start_update(base, Xv, y):
+    """
+    Copy of LogisticRegression `base` refit on the delta (Xv, y), starting from its coefficients:
+        min  mean cross-entropy(delta) + RETRAIN_INCREMENTAL_ANCHOR / 2 * ||theta - theta_base||^2
+    The anchor keeps what the base learned from the data it was trained on, which is not
+    revisited; a larger value keeps the update closer to the base.
+    """
+    import copy
+    from scipy.optimize import minimize
+
+    classes = np.asarray(base.classes_)
+    coef0 = np.asarray(base.coef_, dtype=np.float64)
+    k, n_features = coef0.shape
+    theta0 = np.concatenate([coef0.ravel(), np.asarray(base.intercept_, dtype=np.float64)])
+    Y = (np.asarray(y).astype(str)[:, None] == classes.astype(str)[None, :]).astype(np.float64)
+    n = Xv.shape[0]
+    binary = k == 1  # sklearn keeps one row for two classes: p(classes_[1]) = sigmoid(z)
+
+    def objective(theta):
+        coef, intercept = theta[:-k].reshape(k, n_features), theta[-k:]
+        z = np.asarray(Xv @ coef.T) + intercept
+        logits = np.hstack([np.zeros((n, 1)), z]) if binary else z
+        logits = logits - logits.max(axis=1, keepdims=True)
+        log_p = logits - np.log(np.exp(logits).sum(axis=1, keepdims=True))
+        grad_z = (np.exp(log_p) - Y) / n
+        if binary:
+            grad_z = grad_z[:, 1:]
+        d = theta - theta0
+        loss = -(Y * log_p).sum() / n + 0.5 * RETRAIN_INCREMENTAL_ANCHOR * d @ d
+        grad = np.concatenate([np.asarray(Xv.T @ grad_z).T.ravel(), grad_z.sum(axis=0)])
+        return loss, grad + RETRAIN_INCREMENTAL_ANCHOR * d
+
+    res = minimize(objective, theta0, jac=True, method="L-BFGS-B", options={"maxiter": base.max_iter})
+    updated = copy.deepcopy(base)
+    updated.coef_ = res.x[:-k].reshape(k, n_features)
+    updated.intercept_ = res.x[-k:]
+    return updated
+
+
+# ----------------- Calibration / evaluation / save -----------------
+def _calibrate(base_clf, X_cal, y_cal):
+    """
+    Calibrate the already fitted `base_clf` on the held-out calibration rows (never seen by the fit).
+    Returns `base_clf` itself when there are too few rows / classes or calibration fails.
+    """
+    # ---- CALIBRATION (robust) ----
+    import warnings
+    warnings.filterwarnings("ignore", category=UserWarning, module="sklearn.calibration")
+
+    # if calibration data is too small or single-class, skip calibration
+    unique_cal = np.unique(y_cal)
+    if len(unique_cal) < 2 or len(y_cal) < 10:
+        print(f"[RETRAIN] INFO: calibration skipped (unique_cal={unique_cal}, n_cal={len(y_cal)}) — using base classifier without calibration")
+        return base_clf
+    # pick method: isotonic needs more data; fallback to 'sigmoid' for small sets
+    method = "isotonic" if len(y_cal) >= 200 else "sigmoid"
+    print(f"[RETRAIN] INFO: running calibration with method={method}, n_cal={len(y_cal)}")
+    try:
+        cal_clf = _prefit_calibrator(base_clf, method)
+        cal_clf.fit(X_cal, y_cal)
+        print("[RETRAIN] Calibration completed successfully.")
+        return cal_clf
+    except Exception as e:
+        # on any calibration error, fallback to base classifier but continue
+        print("[RETRAIN] Calibration failed:", str(e))
+        return base_clf
+
+
+def _prefit_calibrator(clf, method: str):
+    """CalibratedClassifierCV that only fits the calibrator on top of the fitted `clf`."""
+    from sklearn.calibration import CalibratedClassifierCV
+    try:
+        from sklearn.frozen import FrozenEstimator  # scikit-learn >= 1.6 (cv="prefit" is gone in 1.8)
+    except ImportError:
+        return CalibratedClassifierCV(clf, cv="prefit", method=method)
+    return CalibratedClassifierCV(FrozenEstimator(clf), method=method)
+
+
+def _evaluate_and_save(clf, vectorizer, X_test, y_test, base_version: str, report, timings: dict,
+                       extra_meta: dict, search: dict = None):
+    """Metrics on the held-out test rows, then save the version and its metrics_history record."""
+    from sklearn.metrics import confusion_matrix, precision_recall_curve, roc_auc_score
+    from sklearn.preprocessing import label_binarize
+
+    with _stage(timings, "evaluate"):
+        yte = y_test
+        preds = clf.predict(X_test)
+        metrics = compute_basic_metrics(yte, preds)
+        report(90)
+
+        # --- advanced evaluation: probs, confusion, PR-curves, confidence histogram, AUC ---
+        probs = clf.predict_proba(X_test)  # shape (n_samples, n_classes)
+        classes = list(clf.classes_)
+        # confusion matrix
+        cm = confusion_matrix(yte, preds, labels=classes).tolist()
+
+        # confidence histogram (max prob per sample)
+        max_probs = probs.max(axis=1)
+        hist_counts, hist_bins = np.histogram(max_probs, bins=10, range=(0.0, 1.0))
+        hist_bins = hist_bins.tolist()
+        hist_counts = hist_counts.tolist()
+        pct_below_0_5 = float((max_probs < 0.5).mean())
+
+        # precision-recall curves per class
+        pr_curves = {}
+        auc_per_class = {}
+        try:
+            Y_test_bin = label_binarize(yte, classes=classes)
+            for idx, cls in enumerate(classes):
+                y_true_bin = Y_test_bin[:, idx]
+                y_score = probs[:, idx]
+                precision, recall, thresholds = precision_recall_curve(y_true_bin, y_score)
+                pr_curves[cls] = {"precision": precision.tolist(), "recall": recall.tolist(), "thresholds": thresholds.tolist()}
+                # auc if possible
                 try:
-                    cal_clf = CalibratedClassifierCV(estimator=clone(base_clf), cv="prefit", method=method)
-                    cal_clf.fit(X_cal, y_cal)
-                    clf = cal_clf
-                    print("[RETRAIN] Calibration completed successfully.")
-                except Exception as e:
-                    # on any calibration error, fallback to base classifier but continue
-                    print("[RETRAIN] Calibration failed:", str(e))
-                    clf = base_clf
-
-            _JOBS[job_id]["progress"] = 70
-            # evaluate on held-out split (simple split)
-            from sklearn.model_selection import train_test_split
-            Xtr, Xte, ytr, yte = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-            Xte_v = vectorizer.transform(Xte)
-            preds = clf.predict(Xte_v)
-            metrics = compute_basic_metrics(yte, preds)
-
-
-            _JOBS[job_id]["progress"] = 90
-
-            # --- advanced evaluation: probs, confusion, PR-curves, confidence histogram, AUC ---
-            probs = clf.predict_proba(Xte_v)  # shape (n_samples, n_classes)
-            classes = list(clf.classes_)
-            # confusion matrix
-            cm = confusion_matrix(yte, preds, labels=classes).tolist()
-
-            # confidence histogram (max prob per sample)
-            max_probs = probs.max(axis=1)
-            hist_counts, hist_bins = np.histogram(max_probs, bins=10, range=(0.0, 1.0))
-            hist_bins = hist_bins.tolist()
-            hist_counts = hist_counts.tolist()
-            pct_below_0_5 = float((max_probs < 0.5).mean())
-
-            # precision-recall curves per class
+                    auc_per_class[cls] = float(roc_auc_score(y_true_bin, y_score)) if len(np.unique(y_true_bin)) > 1 else None
+                except Exception:
+                    auc_per_class[cls] = None
+        except Exception:
             pr_curves = {}
             auc_per_class = {}
+
+    # save new version
+    # activation happens in the API process (the scheduler), not in this worker process
+    with _stage(timings, "save"):
+        new_version = save_new_version(clf, vectorizer, metrics, base_version=base_version, activate=False,
+                                       extra_meta=extra_meta)
+    print(f"[RETRAIN] {new_version} stage timings (s): {timings}")
+
+    # persist metrics_history and model record in Mongo
+    db = get_db()
+    metrics_doc = {
+        "version": new_version,
+        "created_at": datetime.utcnow(),
+        "metrics": metrics,
+        "confusion": {"labels": classes, "matrix": cm},
+        "confidence_dist": {"bins": hist_bins, "counts": hist_counts, "pct_below_0_5": pct_below_0_5},
+        "pr_curve": pr_curves,
+        "auc_per_class": auc_per_class,
+        "n_samples": extra_meta["n_samples"],
+        "n_test": int(len(yte)),
+        "train_mode": extra_meta["train_mode"],
+        "stage_seconds": timings,
+    }
+    if search is not None:
+        metrics_doc["search"] = search
+    db.metrics_history.insert_one(metrics_doc)
+
+    db.models.insert_one({
+        "version": new_version,
+        "metrics": metrics,
+        "created_at": metrics_doc["created_at"],
+        "artifact_path": None
+    })
+
+    return new_version, metrics, timings
+
+
+# ----------------- Scheduler -----------------
+def _improves_on_active(metrics: dict):
+    """(promote?, reason): does a new version's PROMOTE_METRIC beat the active version's?"""
+    new = (metrics or {}).get(PROMOTE_METRIC)
+    if new is None:
+        return False, f"no {PROMOTE_METRIC} in the new metrics"
+    try:
+        active = get_registry().active()
+    except Exception as e:
+        return False, f"active version unavailable ({e})"
+    meta = active.metadata or {}
+    # older versions keep their metrics at the top level of metadata.json
+    current = (meta.get("metrics") or {}).get(PROMOTE_METRIC, meta.get(PROMOTE_METRIC))
+    if current is None:
+        return False, f"{active.version} has no {PROMOTE_METRIC} to compare (activate explicitly)"
+    verdict = "beats" if new > current else "does not beat"
+    return new > current, f"{PROMOTE_METRIC} {new:.4f} {verdict} {active.version}'s {current:.4f}"
+
+
+class RetrainScheduler:
+    """Claims queued / expired jobs from retrain_jobs and trains them in a process pool."""
+
+    def __init__(self, workers: int = RETRAIN_WORKERS, lease_seconds: int = RETRAIN_LEASE_SECONDS,
+                 owner: str = _OWNER):
+        self.workers = max(1, int(workers))
+        self.lease = timedelta(seconds=max(5, int(lease_seconds)))
+        self.owner = owner
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pool = None
+        self._running = {}  # Future -> claimed job document
+
+    def _make_pool(self):
+        # spawn: pymongo clients and torch threads must not be inherited through fork
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, daemon=True, name="retrain-scheduler")
+            self._thread.start()
+
+    def wake(self):
+        self.start()
+        self._wake.set()
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Stop claiming jobs. Jobs still training here are put back in the queue (without
+        using up an attempt) and their processes terminated, so another process resumes them.
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        running = [job["job_id"] for job in self._running.values()]
+        if running:
+            get_db().retrain_jobs.update_many(
+                {"job_id": {"$in": running}, "owner": self.owner, "status": "running"},
+                {"$set": {"status": "queued", "owner": None, "lease_until": None, "updated_at": _now(),
+                          "message": "requeued on shutdown"}, "$inc": {"attempts": -1}},
+            )
+            print(f"[RETRAIN] Requeued {len(running)} running job(s) on shutdown")
+        self._close_pool(terminate=bool(running))
+
+    def _close_pool(self, terminate: bool = False):
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        if terminate:
+            for proc in list(getattr(pool, "_processes", {}).values()):
+                proc.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    # ---------- state transitions (each one a single atomic update) ----------
+    def _claim(self):
+        now = _now()
+        return get_db().retrain_jobs.find_one_and_update(
+            {"$or": [{"status": "queued"},
+                     {"status": "running", "lease_until": {"$lt": now}}],
+             "attempts": {"$lt": RETRAIN_MAX_ATTEMPTS}},
+            {"$set": {"status": "running", "owner": self.owner, "lease_until": now + self.lease,
+                      "heartbeat_at": now, "started_at": now, "updated_at": now, "message": None},
+             "$inc": {"attempts": 1}},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _fail_exhausted(self):
+        now = _now()
+        get_db().retrain_jobs.update_many(
+            {"status": "running", "lease_until": {"$lt": now}, "attempts": {"$gte": RETRAIN_MAX_ATTEMPTS}},
+            {"$set": {"status": "failed", "updated_at": now, "finished_at": now,
+                      "message": f"worker lost {RETRAIN_MAX_ATTEMPTS} times (lease expired)"}},
+        )
+
+    def _heartbeat(self):
+        if not self._running:
+            return
+        now = _now()
+        get_db().retrain_jobs.update_many(
+            {"job_id": {"$in": [job["job_id"] for job in self._running.values()]},
+             "owner": self.owner, "status": "running"},
+            {"$set": {"lease_until": now + self.lease, "heartbeat_at": now}},
+        )
+
+    def _finish(self, job, fut):
+        job_id, now = job["job_id"], _now()
+        try:
+            result = fut.result()
+        except BrokenProcessPool:
+            # the training process died (e.g. OOM): retry while attempts remain
+            retry = job["attempts"] < RETRAIN_MAX_ATTEMPTS
+            print(f"[RETRAIN] Job {job_id} lost its worker process ({'requeued' if retry else 'giving up'})")
+            update = {"status": "queued" if retry else "failed", "owner": None,
+                      "message": "training process exited unexpectedly"}
+        except Exception as e:
+            print(f"[RETRAIN] Job {job_id} failed:", e)
+            update = {"status": "failed", "message": str(e)}
+        else:
+            promote, reason = False, "not requested"
+            if job.get("promote_if_improved"):
+                promote, reason = _improves_on_active(result["metrics"])
+            update = {"status": "done", "progress": 100, "model_version": result["version"],
+                      "result_metrics": result["metrics"], "stage_seconds": result.get("stage_seconds"),
+                      "promoted": promote, "promotion": reason}
+            print(f"[RETRAIN] {result['version']} {'promoted' if promote else 'not promoted'} ({reason})")
+            # the worker process only wrote the files; load it here (and swap it in when promoted)
+            get_registry().preload(result["version"], activate=promote)
+        update.update({"updated_at": now, "lease_until": None})
+        if update["status"] != "queued":
+            update["finished_at"] = now
+        get_db().retrain_jobs.update_one({"job_id": job_id, "owner": self.owner}, {"$set": update})
+
+    # ---------- loop ----------
+    def _loop(self):
+        last_beat = 0.0
+        while not self._stop.is_set():
             try:
-                Y_test_bin = label_binarize(yte, classes=classes)
-                for idx, cls in enumerate(classes):
-                    y_true_bin = Y_test_bin[:, idx]
-                    y_score = probs[:, idx]
-                    precision, recall, thresholds = precision_recall_curve(y_true_bin, y_score)
-                    pr_curves[cls] = {"precision": precision.tolist(), "recall": recall.tolist(), "thresholds": thresholds.tolist()}
-                    # auc if possible
-                    try:
-                        auc_per_class[cls] = float(roc_auc_score(y_true_bin, y_score)) if len(np.unique(y_true_bin)) > 1 else None
-                    except Exception:
-                        auc_per_class[cls] = None
-            except Exception:
-                pr_curves = {}
-                auc_per_class = {}
-
-            # save new version
-            new_version = save_new_version(clf, vectorizer, metrics, base_version=base_version)
-
-            # persist metrics_history and model record in Mongo
-            db = get_db()
-            metrics_doc = {
-                "version": new_version,
-                "created_at": datetime.utcnow(),
-                "metrics": metrics,
-                "confusion": {"labels": classes, "matrix": cm},
-                "confidence_dist": {"bins": hist_bins, "counts": hist_counts, "pct_below_0_5": pct_below_0_5},
-                "pr_curve": pr_curves,
-                "auc_per_class": auc_per_class,
-                "n_samples": int(len(df))
-            }
-            db.metrics_history.insert_one(metrics_doc)
-
-            db.models.insert_one({
-                "version": new_version,
-                "metrics": metrics,
-                "created_at": metrics_doc["created_at"],
-                "artifact_path": None
-            })
-
-            db.retrain_jobs.insert_one({
-                "job_id": job_id,
-                "status": "done",
-                "result_metrics": metrics,
-                "model_version": new_version
-            })
-
-            _JOBS[job_id]["status"] = "done"
-            print(f"[RETRAIN] Job {job_id} finished. New version: {new_version}")
-
-            _JOBS[job_id]["progress"] = 100
-            _JOBS[job_id]["result"] = {"metrics": metrics, "version": new_version}
-
-            
+                self._fail_exhausted()
+                while len(self._running) < self.workers and not self._stop.is_set():
+                    job = self._claim()
+                    if job is None:
+                        break
+                    if job["attempts"] > 1:
+                        print(f"[RETRAIN] Recovered job {job['job_id']} (attempt {job['attempts']})")
+                    if self._pool is None:
+                        self._pool = self._make_pool()
+                    fut = self._pool.submit(_run_job, job["job_id"], self.owner, job["dataset_path"],
+                                            job.get("include_feedbacks", True), job.get("base_version"),
+                                            job.get("mode", "full"), job.get("search", False))
+                    self._running[fut] = job
+
+                if time.monotonic() - last_beat >= self.lease.total_seconds() / 3:
+                    self._heartbeat()
+                    last_beat = time.monotonic()
+
+                if self._running:
+                    done, _ = wait(list(self._running), timeout=_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        self._finish(self._running.pop(fut), fut)
+                    if any(isinstance(f.exception(), BrokenProcessPool) for f in done):
+                        self._close_pool()  # a broken pool accepts no more work; the next claim makes a new one
+                else:
+                    self._wake.wait(_POLL_SECONDS)
+                    self._wake.clear()
+            except Exception as e:
+                # Mongo unreachable etc.: keep the thread alive and retry
+                print("[RETRAIN] scheduler error:", e)
+                self._stop.wait(_POLL_SECONDS)
 
+    def status(self) -> dict:
+        return {"owner": self.owner, "workers": self.workers,
+                "running": sorted(job["job_id"] for job in self._running.values())}
 
 
-        except Exception as e:
-            _JOBS[job_id]["status"] = "failed"
-            _JOBS[job_id]["message"] = str(e)
-        finally:
-            _JOB_QUEUE.task_done()
+_SCHEDULER = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def get_scheduler() -> RetrainScheduler:
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None:
+            _SCHEDULER = RetrainScheduler()
+    return _SCHEDULER
+
+
+def start_retrain_scheduler():
+    """Start claiming jobs (called at app startup, so jobs queued before a deploy resume)."""
+    get_scheduler().start()
+
 
-# start worker on import
-start_worker_thread()
+def shutdown_retrain_scheduler():
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        sched, _SCHEDULER = _SCHEDULER, None
+    if sched is not None:
+        sched.stop()
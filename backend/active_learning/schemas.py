@@ -11,6 +11,16 @@ class PredictResponse(BaseModel):
     confidence: float
     model_version: str
 
+class BulkPredictRequest(BaseModel):
+    texts: List[str]
+    model: str = "transformer"   # "transformer" or "tlrl" (TF-IDF + LR)
+    save: bool = True            # log predictions into feedbacks
+
+class BulkPredictResponse(BaseModel):
+    model: str
+    count: int
+    predictions: List[PredictResponse]
+
 class FeedbackItem(BaseModel):
     text: str
     predicted: str
@@ -28,6 +38,8 @@ class RetrainRequest(BaseModel):
     include_feedbacks: bool = True
     base_model_version: Optional[str] = None
     promote_if_improved: bool = True
+    mode: Optional[str] = None   # "full" | "incremental" (default: RETRAIN_MODE setting)
+    search: Optional[bool] = None  # hyperparameter search before a full retrain (default: RETRAIN_SEARCH setting)
 
 class RetrainStatus(BaseModel):
     job_id: str
@@ -1,9 +1,7 @@
 # utils.py
-import pandas as pd
 import io
 import uuid
 import os
-from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, confusion_matrix
 
 UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "uploads", "active")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -25,10 +23,12 @@ def save_uploaded_file(file_obj, filename=None):
         # assume bytes or str
         with open(path, "wb") as f:
             f.write(file_obj)
+    import pandas as pd
     df = pd.read_csv(path)
     return path, df
 
 def compute_basic_metrics(y_true, y_pred):
+    from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
     return {
         "accuracy": float(accuracy_score(y_true, y_pred)),
         "f1": float(f1_score(y_true, y_pred, average="weighted")),
@@ -0,0 +1,292 @@
+# write_behind.py
+import threading, queue, time
+from collections import deque
+
+import bson
+from bson import ObjectId
+from pymongo.errors import (AutoReconnect, BulkWriteError, ConnectionFailure, NetworkTimeout,
+                            PyMongoError, ServerSelectionTimeoutError)
+
+from app.db import get_db
+
+# try to load config from sqlite; fallback to defaults below
+try:
+    from app.sqlite_config import load_settings
+    _cfg = load_settings()
+except Exception:
+    _cfg = {}
+
+FEEDBACK_WRITE_BATCH = _cfg.get("FEEDBACK_WRITE_BATCH", 500)               # docs per insert_many
+FEEDBACK_WRITE_INTERVAL_MS = _cfg.get("FEEDBACK_WRITE_INTERVAL_MS", 200)   # max age of a buffered doc
+FEEDBACK_WRITE_MAX_PENDING = _cfg.get("FEEDBACK_WRITE_MAX_PENDING", 10000) # add() blocks beyond this
+
+_RETRY_BASE_S = 0.2      # first retry delay of a failed batch, doubled per attempt
+_RETRY_MAX_S = 10.0      # cap of the retry delay
+_PUT_SLICE_S = 0.05      # add() re-checks close() at least this often while the queue is full
+_DUPLICATE_KEY = 11000
+# write error codes worth retrying: network, elections / stepdowns, shutdown, timeouts
+_RETRYABLE_CODES = frozenset({6, 7, 50, 64, 89, 91, 189, 262, 9001, 10107, 11600, 11602, 13435, 13436})
+_TRANSIENT_ERRORS = (AutoReconnect, ConnectionFailure, NetworkTimeout, ServerSelectionTimeoutError)
+_MAX_BSON_SIZE = 16 * 1024 * 1024
+_DEAD_LETTER_KEEP = 100  # dead-lettered docs kept for inspection (dead_letters())
+_STOP = object()
+
+
+class WriteBehindBuffer:
+    """
+    In-process write-behind queue for one Mongo collection.
+      - add() assigns the _id up-front and returns immediately; a worker thread
+        batches documents into insert_many every `batch` docs or `interval_ms`
+      - a batch that fails is retried (capped backoff) until it is written; nothing behind it is
+        written first, so while the database is down the queue fills up and add() blocks
+        (backpressure) once `max_pending` docs are waiting -- nothing is dropped
+      - close() stops intake and drains everything still queued; whatever could not be written
+        before its timeout is returned (and printed) instead of being discarded silently
+    Retried batches skip duplicate-key errors, so a retry after a partial write is safe.
+    Only transient failures are retried: a doc that can never be written (encoding error,
+    oversized, document validation or any other non-retryable write error) is taken out of
+    its batch and dead-lettered, so it cannot block the docs queued behind it.
+    """
+
+    def __init__(self, collection: str, batch: int = 500, interval_ms: int = 200, max_pending: int = 10000):
+        self.collection = collection
+        self.batch = max(1, int(batch))
+        self.interval = max(1, int(interval_ms)) / 1000.0
+        self._queue = queue.Queue(maxsize=max(1, int(max_pending)))
+        self._thread = None
+        self._lock = threading.Lock()        # intake: the _closed check and the put are atomic
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self._give_up = threading.Event()    # set by close() once its timeout has passed
+        self._inflight = []                  # batch the worker is writing / retrying
+        self._unwritten = []                 # docs left over after close() gave up
+        self._dead_letters = deque(maxlen=_DEAD_LETTER_KEEP)  # (doc, reason), most recent last
+        self._stats = {"queued": 0, "written": 0, "batches": 0, "retries": 0, "unwritten": 0,
+                       "dead_lettered": 0, "blocked_adds": 0}
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._worker_loop, daemon=True,
+                                                    name=f"write-behind-{self.collection}")
+                    self._thread.start()
+
+    def add(self, doc: dict) -> ObjectId:
+        doc.setdefault("_id", ObjectId())
+        self._ensure_worker()
+        blocked = False
+        while True:
+            # the lock is released between slices, so a full queue never starves close()
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError(f"write-behind buffer for {self.collection} is closed")
+                try:
+                    self._queue.put(doc, timeout=_PUT_SLICE_S)
+                    break
+                except queue.Full:
+                    blocked = True
+        with self._stats_lock:
+            self._stats["queued"] += 1
+            self._stats["blocked_adds"] += blocked
+        return doc["_id"]
+
+    def _collect(self):
+        """Block for the first doc, then gather until the batch is full or the interval passes."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        docs = [first]
+        deadline = time.monotonic() + self.interval
+        while len(docs) < self.batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                doc = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if doc is _STOP:
+                return docs, True
+            docs.append(doc)
+        return docs, False
+
+    def _write(self, docs) -> bool:
+        """
+        insert_many until every doc is written or dead-lettered; False only when close()
+        gave up while retrying (the docs still to write are then in self._inflight).
+        """
+        coll = get_db()[self.collection]
+        pending = list(docs)
+        self._inflight = pending
+        dead = 0
+        attempt = 0
+        while pending:
+            try:
+                coll.insert_many(pending, ordered=False)
+                break
+            except BulkWriteError as e:
+                retry, rejected = [], []
+                for we in e.details.get("writeErrors", []):
+                    code = we.get("code")
+                    if code == _DUPLICATE_KEY:
+                        continue  # written by an earlier attempt
+                    doc = pending[we["index"]]
+                    if code in _RETRYABLE_CODES:
+                        retry.append(doc)
+                    else:
+                        rejected.append((doc, f"write error {code}: {we.get('errmsg')}"))
+                dead += self._dead_letter(rejected)
+                if e.details.get("writeConcernErrors"):
+                    # inserted but not acknowledged: send everything again, duplicates are skipped
+                    rejected_ids = {id(doc) for doc, _ in rejected}
+                    retry = [doc for doc in pending if id(doc) not in rejected_ids]
+                pending = retry
+                if not pending:
+                    break
+                err = e
+            except Exception as e:
+                if not _is_transient(e):
+                    # client-side rejections (InvalidDocument, DocumentTooLarge, TypeError, ...)
+                    # or a permanent server error: set the offending docs aside, keep the rest
+                    bad = [doc for doc in pending if not _encodable(doc)]
+                    if not bad:
+                        bad = pending
+                    bad_ids = {id(doc) for doc in bad}
+                    dead += self._dead_letter([(doc, f"{type(e).__name__}: {e}") for doc in bad])
+                    pending = [doc for doc in pending if id(doc) not in bad_ids]
+                    continue
+                err = e
+            self._inflight = pending
+            attempt += 1
+            with self._stats_lock:
+                self._stats["retries"] += 1
+            delay = min(_RETRY_MAX_S, _RETRY_BASE_S * 2 ** (attempt - 1))
+            if attempt == 1 or delay == _RETRY_MAX_S and attempt % 10 == 0:
+                print(f"⚠️ write-behind: {len(pending)} docs for {self.collection} not written "
+                      f"(attempt {attempt}), retrying in {delay:.1f}s:", err)
+            if self._give_up.wait(delay):
+                return False
+        self._inflight = []
+        with self._stats_lock:
+            self._stats["written"] += len(docs) - dead
+            self._stats["batches"] += 1
+        return True
+
+    def _dead_letter(self, rejected) -> int:
+        """Sets aside (doc, reason) pairs that can never be written; returns how many."""
+        if not rejected:
+            return 0
+        self._dead_letters.extend(rejected)
+        with self._stats_lock:
+            self._stats["dead_lettered"] += len(rejected)
+        print(f"❌ write-behind: dead-lettered {len(rejected)} docs for {self.collection} "
+              f"(first: _id={rejected[0][0].get('_id')}, {rejected[0][1]})")
+        return len(rejected)
+
+    def dead_letters(self) -> list:
+        """The last _DEAD_LETTER_KEEP docs that were rejected for good, as (doc, reason)."""
+        return list(self._dead_letters)
+
+    def _drain_queue(self):
+        rest = []
+        while True:
+            try:
+                doc = self._queue.get_nowait()
+            except queue.Empty:
+                return rest
+            if doc is not _STOP:
+                rest.append(doc)
+
+    def _worker_loop(self):
+        stop = False
+        while not stop:
+            docs, stop = self._collect()
+            if docs and not self._write(docs):
+                self._abandon(list(self._inflight) + self._drain_queue())
+                return
+        # drain whatever was queued before close()
+        rest = self._drain_queue()
+        for i in range(0, len(rest), self.batch):
+            if not self._write(rest[i:i + self.batch]):
+                self._abandon(list(self._inflight) + rest[i + self.batch:])
+                return
+
+    def _abandon(self, docs):
+        self._inflight = []
+        self._unwritten = docs
+        with self._stats_lock:
+            self._stats["unwritten"] = len(docs)
+
+    def close(self, timeout: float = 30.0) -> list:
+        """
+        Stop accepting docs and flush everything pending, for at most `timeout` seconds.
+        Returns the docs that could not be written (empty when everything was flushed).
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            if self._closed:
+                return list(self._unwritten)
+            self._closed = True
+        if self._thread is None:
+            return []
+        # every add() that got its doc in did so before _closed was set, i.e. ahead of _STOP
+        try:
+            self._queue.put(_STOP, timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Full:
+            pass
+        self._thread.join(max(0.0, deadline - time.monotonic()))
+        if self._thread.is_alive():
+            self._give_up.set()
+            self._thread.join(_RETRY_MAX_S)
+        if self._thread.is_alive():
+            # stuck inside insert_many: report what it holds and what is still queued
+            self._abandon(list(self._inflight) + self._drain_queue())
+        unwritten = list(self._unwritten)
+        if unwritten:
+            print(f"❌ write-behind: {len(unwritten)} docs for {self.collection} could not be written "
+                  f"within {timeout}s of shutdown")
+        return unwritten
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            out = dict(self._stats)
+        out["pending"] = self._queue.qsize() + len(self._inflight)
+        return out
+
+
+def _is_transient(e) -> bool:
+    return isinstance(e, _TRANSIENT_ERRORS) or (
+        isinstance(e, PyMongoError) and e.has_error_label("RetryableWriteError"))
+
+
+def _encodable(doc) -> bool:
+    try:
+        return len(bson.encode(doc)) <= _MAX_BSON_SIZE
+    except Exception:
+        return False
+
+
+_FEEDBACK_BUFFER = None
+_FEEDBACK_BUFFER_LOCK = threading.Lock()
+
+
+def get_feedback_buffer() -> WriteBehindBuffer:
+    """Shared write-behind buffer for the `feedbacks` collection."""
+    global _FEEDBACK_BUFFER
+    with _FEEDBACK_BUFFER_LOCK:
+        if _FEEDBACK_BUFFER is None:
+            _FEEDBACK_BUFFER = WriteBehindBuffer("feedbacks", batch=FEEDBACK_WRITE_BATCH,
+                                                 interval_ms=FEEDBACK_WRITE_INTERVAL_MS,
+                                                 max_pending=FEEDBACK_WRITE_MAX_PENDING)
+    return _FEEDBACK_BUFFER
+
+
+def shutdown_feedback_buffer() -> list:
+    """Flush and close the shared buffer; returns the docs that could not be written."""
+    global _FEEDBACK_BUFFER
+    with _FEEDBACK_BUFFER_LOCK:
+        buf, _FEEDBACK_BUFFER = _FEEDBACK_BUFFER, None
+    if buf is None:
+        return []
+    return buf.close()
@@ -0,0 +1,232 @@
+# app/analysis_jobs.py
+"""
+Background analyses, with their status kept in the `analysis_jobs` collection.
+
+One document per job, updated in place:
+    queued -> running -> done | failed
+  - the work runs in the process that accepted the upload (the rows are a local temp
+    file), but its status / progress live in Mongo, so any API worker can answer a poll
+    and finished jobs survive a restart
+  - the owning process renews `lease_until` of its unfinished jobs (heartbeat); a job whose
+    lease expired lost its process and is reported (and recorded) as failed
+  - finished jobs are removed a day after `finished_at` by a TTL index (app.db.INDEXES)
+"""
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from app.analyze import analyze_review_rows
+from app.analysis_store import AnalysisWriter
+from app.db import get_db
+
+# try to load config from sqlite; fallback to defaults below
+try:
+    from app.sqlite_config import load_settings
+    _cfg = load_settings()
+except Exception:
+    _cfg = {}
+
+ANALYSIS_JOB_WORKERS = _cfg.get("ANALYSIS_JOB_WORKERS", 2)        # jobs analysed concurrently
+ANALYSIS_JOB_MAX_PENDING = _cfg.get("ANALYSIS_JOB_MAX_PENDING", 16)  # queued + running (all processes) before new jobs are refused
+_LEASE_SECONDS = 60  # an unfinished job is given up this long after its owner's last heartbeat
+_ACTIVE = ("queued", "running")
+
+# identifies this process as the owner of the jobs it accepts
+_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+_LOCK = threading.Lock()
+_EXECUTOR = None
+_HEARTBEAT = None
+_STOP = threading.Event()
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _aware(value):
+    """Datetimes come back from Mongo naive (UTC) unless the client is tz_aware."""
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _get_executor():
+    global _EXECUTOR, _HEARTBEAT
+    with _LOCK:
+        if _EXECUTOR is None:
+            _STOP.clear()
+            _EXECUTOR = ThreadPoolExecutor(max_workers=ANALYSIS_JOB_WORKERS, thread_name_prefix="analysis-job")
+            _HEARTBEAT = threading.Thread(target=_heartbeat_loop, daemon=True, name="analysis-job-heartbeat")
+            _HEARTBEAT.start()
+    return _EXECUTOR
+
+
+def _heartbeat_loop():
+    while not _STOP.wait(_LEASE_SECONDS / 3):
+        try:
+            get_db().analysis_jobs.update_many(
+                {"owner": _OWNER, "status": {"$in": list(_ACTIVE)}},
+                {"$set": {"lease_until": _now() + timedelta(seconds=_LEASE_SECONDS)}},
+            )
+        except Exception as e:
+            print("[ANALYSIS] heartbeat error:", e)
+
+
+def shutdown_analysis_jobs():
+    global _EXECUTOR, _HEARTBEAT
+    with _LOCK:
+        executor, _EXECUTOR = _EXECUTOR, None
+        heartbeat, _HEARTBEAT = _HEARTBEAT, None
+    if executor is None:
+        return
+    executor.shutdown(wait=True, cancel_futures=True)
+    _STOP.set()
+    if heartbeat is not None:
+        heartbeat.join(timeout=1.0)
+    # jobs cancelled before they started: their uploads are gone with this process
+    now = _now()
+    get_db().analysis_jobs.update_many(
+        {"owner": _OWNER, "status": "queued"},
+        {"$set": {"status": "failed", "finished_at": now, "updated_at": now, "lease_until": None,
+                  "message": "server shut down before the job started"}},
+    )
+
+
+def submit_analysis_job(rows, model: str, total_rows: int = None, source=None, total_bytes: int = None,
+                        cleanup=None) -> str:
+    """
+    Queue an analysis of `rows` ((review, feedback_id, timestamp) iterable).
+    Progress is reported against `total_rows` when known, otherwise against the
+    read position of `source` (the spooled upload) out of `total_bytes`.
+    `cleanup` runs when the job ends (e.g. closes and deletes the upload copy).
+    Raises JobQueueFull when ANALYSIS_JOB_MAX_PENDING jobs are already active.
+    """
+    jobs = get_db().analysis_jobs
+    now = _now()
+    active = jobs.count_documents({"status": {"$in": list(_ACTIVE)}, "lease_until": {"$gte": now}})
+    if active >= ANALYSIS_JOB_MAX_PENDING:
+        raise JobQueueFull("Too many analysis jobs in progress, retry later.")
+
+    executor = _get_executor()
+    job_id = f"analysis_{uuid.uuid4().hex[:12]}"
+    jobs.insert_one({
+        "job_id": job_id,
+        "status": "queued",
+        "model": model,
+        "rows_processed": 0,
+        "total_rows": total_rows,
+        "bytes_read": 0,
+        "total_bytes": total_bytes,
+        "submitted_at": now,
+        "started_at": None,
+        "finished_at": None,
+        "visual_id": None,
+        "name": None,
+        "message": None,
+        "owner": _OWNER,
+        "lease_until": now + timedelta(seconds=_LEASE_SECONDS),
+        "updated_at": now,
+    })
+    executor.submit(_run_job, job_id, rows, model, source, cleanup)
+    return job_id
+
+
+def _update(job_id, **fields):
+    fields["updated_at"] = _now()
+    get_db().analysis_jobs.update_one({"job_id": job_id, "owner": _OWNER}, {"$set": fields})
+
+
+def _run_job(job_id, rows, model, source, cleanup):
+    writer = None
+
+    def _sink(records):
+        writer.add_rows(records)
+        fields = {"rows_processed": writer.review_count}
+        if source is not None:
+            try:
+                fields["bytes_read"] = source.tell()
+            except Exception:
+                pass
+        _update(job_id, **fields)
+
+    try:
+        _update(job_id, status="running", started_at=_now())
+        writer = AnalysisWriter(model)
+        result = analyze_review_rows(rows, model=model, row_sink=_sink)
+        doc = writer.save(result)
+        _update(job_id, status="done", finished_at=_now(), lease_until=None,
+                rows_processed=writer.review_count, visual_id=doc["visualId"], name=doc["name"])
+    except Exception as e:
+        print(f"[ANALYSIS] Job {job_id} failed:", e)
+        try:
+            if writer is not None:
+                writer.abort()
+            _update(job_id, status="failed", finished_at=_now(), lease_until=None, message=str(e))
+        except Exception as e2:
+            # Mongo itself is down: the lease runs out and the job is reported failed then
+            print(f"[ANALYSIS] Could not record the failure of job {job_id}:", e2)
+    finally:
+        if cleanup is not None:
+            try:
+                cleanup()
+            except Exception:
+                pass
+
+
+def _expire(job):
+    """Marks a job whose owner stopped renewing its lease as failed (once, atomically)."""
+    now = _now()
+    update = {"status": "failed", "finished_at": now, "updated_at": now, "lease_until": None,
+              "message": "worker lost (lease expired)"}
+    res = get_db().analysis_jobs.update_one(
+        {"job_id": job["job_id"], "status": {"$in": list(_ACTIVE)}, "lease_until": {"$lt": now}},
+        {"$set": update},
+    )
+    if res.modified_count:
+        job.update(update)
+
+
+def _epoch(value):
+    return _aware(value).timestamp() if isinstance(value, datetime) else value
+
+
+def get_analysis_job(job_id: str):
+    """Snapshot of a job with throughput (rows/s), progress (0-100) and ETA (seconds)."""
+    job = get_db().analysis_jobs.find_one({"job_id": job_id}, {"_id": 0, "owner": 0, "updated_at": 0})
+    if job is None:
+        return None
+    if job["status"] in _ACTIVE and job.get("lease_until") and _aware(job["lease_until"]) < _now():
+        _expire(job)
+    job.pop("lease_until", None)
+    for key in ("submitted_at", "started_at", "finished_at"):
+        job[key] = _epoch(job.get(key))
+
+    now = job["finished_at"] or _epoch(_now())
+    elapsed = (now - job["started_at"]) if job["started_at"] else 0.0
+    rows = job["rows_processed"]
+
+    fraction = None
+    if job["status"] == "done":
+        fraction = 1.0
+    elif job["total_rows"]:
+        fraction = min(1.0, rows / job["total_rows"])
+    elif job["total_bytes"]:
+        fraction = min(1.0, job["bytes_read"] / job["total_bytes"])
+
+    job["elapsed_seconds"] = round(elapsed, 2)
+    job["throughput_rows_per_sec"] = round(rows / elapsed, 2) if elapsed > 0 else 0.0
+    job["progress"] = int(round(fraction * 100)) if fraction is not None else None
+    if job["status"] == "running" and fraction:
+        job["eta_seconds"] = round(elapsed * (1.0 - fraction) / fraction, 1)
+    else:
+        job["eta_seconds"] = 0.0 if job["status"] == "done" else None
+    return job
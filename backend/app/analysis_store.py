@@ -0,0 +1,266 @@
+# app/analysis_store.py
+import base64
+import csv
+import io
+import tempfile
+from datetime import datetime, timezone
+
+import gridfs
+from bson import ObjectId
+
+from app.analyze import REPORT_HEADER, report_global_columns, report_review_columns
+from app.db import connect_db
+
+# rows per insert_many into `analysis_reviews`
+REVIEW_ROW_BATCH = 1000
+REPORT_BUCKET = "analysis_reports"
+# report rows kept in memory before the spool rolls over to a temp file
+REPORT_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+# per-review documents keep these out of the reassembled per_review_summary
+_ROW_ONLY_FIELDS = {"_id": 0, "analysis_id": 0, "cleaned_text": 0}
+
+
+def _report_bucket(db):
+    return gridfs.GridFSBucket(db, bucket_name=REPORT_BUCKET)
+
+
+class AnalysisWriter:
+    """
+    Persists one /feedback/analyze run in a split layout, so no single document
+    grows with the upload (large runs used to hit the 16 MB BSON limit):
+      - `analysis_reviews`: one document per review (per_review_summary entry +
+        cleaned text), bulk-inserted in REVIEW_ROW_BATCH batches as the analyzer
+        streams chunks through add_rows()
+      - GridFS bucket `analysis_reports`: the CSV report; its per-review columns are
+        spooled chunk by chunk in add_rows() (temp file past REPORT_SPOOL_MAX_BYTES) and
+        the global columns appended while it is uploaded in save()
+      - `analysis` (Visual_*): the summary only, pointing at the two above
+      - `cleaned_feedbacks` (Feed_*): counts, the cleaned texts live on the review rows
+    The analysis _id and the report file id are allocated up-front, so review rows can
+    reference the analysis before the summary exists and abort() can remove every part
+    a failed run left behind. Shared by the synchronous endpoint and the background jobs.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self.analysis_id = ObjectId()
+        self.report_file_id = ObjectId()
+        self._count = 0
+        self._pending = []
+        self._report = None
+        self._db = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = connect_db()
+        return self._db
+
+    @property
+    def review_count(self) -> int:
+        return self._count
+
+    def add_rows(self, records):
+        if self._report is None:
+            self._report = tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_MAX_BYTES, mode="w+",
+                                                         newline="", encoding="utf-8")
+        report = csv.writer(self._report)
+        for rec in records:
+            report.writerow(report_review_columns(rec["summary"], rec.get("report_text", rec["cleaned_text"])))
+            row = dict(rec["summary"])
+            row["analysis_id"] = self.analysis_id
+            row["cleaned_text"] = rec["cleaned_text"]
+            self._pending.append(row)
+            self._count += 1
+            if len(self._pending) >= REVIEW_ROW_BATCH:
+                self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self.db.analysis_reviews.insert_many(self._pending, ordered=False)
+            self._pending = []
+
+    def _close_report(self):
+        if self._report is not None:
+            self._report.close()
+            self._report = None
+
+    def _report_chunks(self, sentiment_distribution):
+        """Encoded CSV report (header + spooled rows + global columns), REVIEW_ROW_BATCH rows at a time."""
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(REPORT_HEADER)
+        global_columns = report_global_columns(sentiment_distribution)
+        if self._report is not None:
+            self._report.seek(0)
+            for i, row in enumerate(csv.reader(self._report), 1):
+                writer.writerow(row + global_columns)
+                if i % REVIEW_ROW_BATCH == 0:
+                    yield buf.getvalue().encode("utf-8")
+                    buf.seek(0)
+                    buf.truncate()
+        if buf.tell():
+            yield buf.getvalue().encode("utf-8")
+
+    def abort(self):
+        """Remove everything a run that failed (before or inside save()) has written."""
+        self._pending = []
+        self._close_report()
+        db = self.db
+        try:
+            db.analysis_reviews.delete_many({"analysis_id": self.analysis_id})
+            db.analysis.delete_one({"_id": self.analysis_id})
+            db.cleaned_feedbacks.delete_many({"analysis_id": self.analysis_id})
+            try:
+                _report_bucket(db).delete(self.report_file_id)
+            except gridfs.errors.NoFile:
+                pass
+        except Exception as e:
+            print("⚠️ Failed to clean up partial analysis:", e)
+
+    def _upload_report(self, filename: str, sentiment_distribution):
+        """Stream the report into GridFS under the pre-allocated report_file_id."""
+        grid_in = _report_bucket(self.db).open_upload_stream_with_id(
+            self.report_file_id,
+            filename,
+            metadata={"analysis_id": self.analysis_id, "content_type": "text/csv"},
+        )
+        try:
+            for chunk in self._report_chunks(sentiment_distribution):
+                grid_in.write(chunk)
+        except Exception:
+            grid_in.abort()
+            raise
+        grid_in.close()
+        self._close_report()
+
+    def save(self, result: dict) -> dict:
+        """Store the summary and the report; on failure every part of the run is removed again."""
+        try:
+            return self._save(result)
+        except Exception:
+            self.abort()
+            raise
+
+    def _save(self, result: dict) -> dict:
+        self._flush()
+        db = self.db
+        review_count = self.review_count
+        created_at = datetime.now(timezone.utc)
+        # the id suffix keeps names unique when two analyses finish in the same second
+        unique_name = f"Visual_{int(created_at.timestamp())}_{self.analysis_id}"
+
+        self._upload_report(f"{unique_name}.csv", result["sentiment_distribution"])
+
+        summary = {k: v for k, v in result.items() if k not in ("per_review_summary", "report_download")}
+        db.analysis.insert_one({
+            "_id": self.analysis_id,
+            "name": unique_name,
+            "model": self.model,
+            "review_count": review_count,
+            "result": summary,
+            "report_file_id": self.report_file_id,
+            "created_at": created_at,
+        })
+
+        # ---------- Cleaned feedback bookkeeping (texts live in analysis_reviews) ----------
+        feed_name = unique_name.replace("Visual_", "Feed_")
+        db.cleaned_feedbacks.update_one(
+            {"name": feed_name},
+            {
+                "$setOnInsert": {"name": feed_name},
+                "$set": {
+                    "analysis_id": self.analysis_id,
+                    "original_count": review_count,
+                    "cleaned_count": review_count,
+                    "created_at": created_at,
+                }
+            },
+            upsert=True
+        )
+
+        # summary only: the rows and the report are paged / streamed from the visual endpoints
+        visual_id = str(self.analysis_id)
+        return {
+            "visualId": visual_id,
+            "_id": visual_id,
+            "name": unique_name,
+            "model": self.model,
+            "review_count": review_count,
+            "result": summary,
+            "links": {
+                "visual": f"/feedback/visuals/{visual_id}",
+                "reviews": f"/feedback/visuals/{visual_id}/reviews",
+                "download": f"/feedback/visuals/{visual_id}/download",
+            },
+            "created_at": created_at.isoformat()
+        }
+
+
+# ----------------- Reads -----------------
+def is_split(doc) -> bool:
+    return "report_file_id" in doc
+
+
+def load_review_rows(db, analysis_id, skip: int = 0, limit: int = 0):
+    """per_review_summary entries of a split analysis, in review order."""
+    cursor = db.analysis_reviews.find({"analysis_id": analysis_id}, _ROW_ONLY_FIELDS).sort("id", 1)
+    if skip:
+        cursor = cursor.skip(skip)
+    if limit:
+        cursor = cursor.limit(limit)
+    return list(cursor)
+
+
+def iter_report_chunks(db, doc):
+    """Yield the CSV report bytes of an analysis (GridFS for split docs, base64 field for older ones)."""
+    if is_split(doc):
+        grid_out = _report_bucket(db).open_download_stream(doc["report_file_id"])
+        try:
+            while True:
+                chunk = grid_out.readchunk()
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            grid_out.close()
+        return
+    report = doc.get("result", {}).get("report_download") or doc.get("report_download")
+    if report:
+        yield base64.b64decode(report)
+
+
+def _wants(fields, path) -> bool:
+    return fields is None or "result" in fields or path in fields
+
+
+def expand_analysis(db, doc, fields=None) -> dict:
+    """
+    Reassemble a split analysis into the legacy document shape (older docs pass through).
+    `fields` is the requested projection; rows and report are only loaded when asked for.
+    """
+    if is_split(doc):
+        result = dict(doc.get("result") or {})
+        if _wants(fields, "result.per_review_summary"):
+            result["per_review_summary"] = load_review_rows(db, doc["_id"])
+        if _wants(fields, "result.report_download"):
+            report = b"".join(iter_report_chunks(db, doc))
+            result["report_download"] = base64.b64encode(report).decode("utf-8")
+        doc = {k: v for k, v in doc.items() if k != "report_file_id"}
+        if result or "result" in doc:
+            doc["result"] = result
+    else:
+        doc.pop("report_file_id", None)
+    return doc
+
+
+def delete_analysis_parts(db, doc):
+    """Remove the review rows and report belonging to a split analysis."""
+    if not is_split(doc):
+        return
+    db.analysis_reviews.delete_many({"analysis_id": doc["_id"]})
+    try:
+        _report_bucket(db).delete(doc["report_file_id"])
+    except gridfs.errors.NoFile:
+        pass
@@ -1,22 +1,38 @@
 from app.model_loader import vader_analyzer
-from app.preprocess import clean_text
+from app.preprocess import preprocess_review
+from app.aspect_matcher import get_aspect_matcher
+from app.result_cache import ResultCache, get_result_cache
 from collections import Counter
+import collections
+import itertools
 import numpy as np
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import threading
 import csv
 import io
+import json
+import os
 
 
 # try to load config from sqlite; fallback to hardcoded below
 try:
-    from app.sqlite_config import init_db, load_all
-    init_db()                # ensures file + tables exist
-    _cfg = load_all()
+    from app.sqlite_config import load_settings
+    _cfg = load_settings()   # ensures file + tables exist; read once per process
 except Exception:
     _cfg = {}
 
 # use DB values if present, else keep existing definitions
 TOP_N_ISSUES = _cfg.get("TOP_N_ISSUES", 5)
+TF_BATCH_SIZE = _cfg.get("TF_BATCH_SIZE", 32)  # reviews per padded transformer forward pass
+ANALYZE_WORKERS = _cfg.get("ANALYZE_WORKERS", min(4, os.cpu_count() or 1))  # process-pool size for large uploads
+SHARD_MIN_REVIEWS = _cfg.get("SHARD_MIN_REVIEWS", 2000)  # below this, run in-process
+STREAM_CHUNK_SIZE = _cfg.get("STREAM_CHUNK_SIZE", 500)  # rows read/scored per chunk (also the shard size)
+RESULT_CACHE_MAX_ENTRIES = _cfg.get("RESULT_CACHE_MAX_ENTRIES", 500_000)  # 0 disables the per-review score cache
+COMPOUND_RESERVOIR_SIZE = _cfg.get("COMPOUND_RESERVOIR_SIZE", 20_000)  # compound scores sampled for the median
+INFERENCE_BACKEND_DISTIL = _cfg.get("INFERENCE_BACKEND_DISTIL", "torch")    # torch | int8 | onnx | onnx-int8
+INFERENCE_BACKEND_ROBERTA = _cfg.get("INFERENCE_BACKEND_ROBERTA", "torch")
 ISSUE_CLUSTERS = _cfg.get("ISSUE_CLUSTERS", None)  # if None, your hardcoded dict should follow
 ASPECT_KEYWORDS = _cfg.get("ASPECT_KEYWORDS", None)
 SUGGESTION_MAP = _cfg.get("SUGGESTION_MAP", None)
@@ -33,6 +49,8 @@ ADVANCED_SUGGESTION_DATA = _cfg.get("ADVANCED_SUGGESTION_DATA", None)
    
 # ----------------- Helpers for suggestion ranking & AI-weighting -----------------
 def _safe_mean_abs(compound_scores):
+    if isinstance(compound_scores, CompoundStats):
+        return compound_scores.mean_abs()
     try:
         return float(np.mean(np.abs(np.array(compound_scores)))) if compound_scores else 0.0
     except Exception:
@@ -167,30 +185,121 @@ def generate_suggestions(top_issues, sentiment_distribution=None, compound_score
 
 
 # ----------------- Confidence Stats -----------------
+_CONFIDENCE_BINS = [-1.0, -0.5, 0.0, 0.5, 1.0]
+
+class CompoundStats:
+    """
+    Compound scores of a whole upload in bounded memory: count, sum, sum of |x| and the
+    confidence histogram are exact; the median comes from a reservoir sample of
+    COMPOUND_RESERVOIR_SIZE scores. It is exact up to that many reviews; beyond it,
+    `median_approximate` is set and the sample median lies within about 1/sqrt(size) in
+    rank (under 1% for the default 20000) of the true one.
+    """
+
+    def __init__(self, reservoir_size=None, seed=0):
+        self.reservoir_size = max(1, int(reservoir_size or COMPOUND_RESERVOIR_SIZE))
+        self.count = 0
+        self.total = 0.0
+        self.total_abs = 0.0
+        self.hist = np.zeros(len(_CONFIDENCE_BINS) - 1, dtype=np.int64)
+        self.reservoir = np.empty(self.reservoir_size, dtype=float)
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def median_approximate(self):
+        return self.count > self.reservoir_size
+
+    def add(self, scores):
+        arr = np.asarray(scores, dtype=float).ravel()
+        if not arr.size:
+            return
+        self.total += float(arr.sum())
+        self.total_abs += float(np.abs(arr).sum())
+        self.hist += np.histogram(arr, bins=_CONFIDENCE_BINS)[0]
+
+        # fill the free slots, then Algorithm R for the rest: the value seen as the t-th
+        # replaces slot j ~ U[0, t) when j falls inside the reservoir
+        fill = min(self.reservoir_size - min(self.count, self.reservoir_size), arr.size)
+        self.reservoir[self.count:self.count + fill] = arr[:fill]
+        rest = arr[fill:]
+        if rest.size:
+            seen = np.arange(self.count + fill + 1, self.count + arr.size + 1)
+            slots = self._rng.integers(0, seen)
+            hit = slots < self.reservoir_size
+            slots, values = slots[hit], rest[hit]
+            # a slot hit twice in one chunk keeps the later value, as the sequential algorithm would
+            last = len(slots) - 1 - np.unique(slots[::-1], return_index=True)[1]
+            self.reservoir[slots[last]] = values[last]
+        self.count += arr.size
+
+    def mean(self):
+        return self.total / self.count if self.count else float("nan")
+
+    def mean_abs(self):
+        return self.total_abs / self.count if self.count else 0.0
+
+    def median(self):
+        kept = min(self.count, self.reservoir_size)
+        return float(np.median(self.reservoir[:kept])) if kept else float("nan")
+
 def compute_confidence_stats(compound_scores):
-    arr = np.array(compound_scores)
-    avg = round(np.mean(arr), 4)
-    median = round(np.median(arr), 4)
-    hist, bins = np.histogram(arr, bins=[-1, -0.5, 0, 0.5, 1])
-    histogram = [{"range": f"{round(bins[i],2)} to {round(bins[i+1],2)}", "count": int(hist[i])} for i in range(len(hist))]
-    return {"average": avg, "median": median, "histogram": histogram}
+    stats = compound_scores
+    if not isinstance(stats, CompoundStats):
+        stats = CompoundStats(reservoir_size=len(compound_scores) or 1)
+        stats.add(compound_scores)
+    avg = round(stats.mean(), 4)
+    median = round(stats.median(), 4)
+    bins = _CONFIDENCE_BINS
+    histogram = [{"range": f"{round(bins[i],2)} to {round(bins[i+1],2)}", "count": int(stats.hist[i])}
+                 for i in range(len(stats.hist))]
+    # the median is sampled once an upload outgrows COMPOUND_RESERVOIR_SIZE (streamed analyses only)
+    return {"average": avg, "median": median, "median_approximate": stats.median_approximate,
+            "histogram": histogram}
 
 # ----------------- Wordcloud -----------------
+def _wordcloud_keywords():
+    return get_aspect_matcher(fallback=ASPECT_KEYWORDS).keywords
+
+def _count_wordcloud(counters, words, sentiment, all_keywords):
+    matched = [w for w in words if w in all_keywords]
+    if sentiment == "pos":
+        counters["pos"].update(matched)
+    elif sentiment == "neg":
+        counters["neg"].update(matched)
+
+def _wordcloud_rows(counters):
+    pos_wc = [{"word": w, "count": c} for w, c in counters["pos"].items()]
+    neg_wc = [{"word": w, "count": c} for w, c in counters["neg"].items()]
+    return {"positive": pos_wc, "negative": neg_wc}
+
 def generate_wordcloud_data(reviews, sentiments):
-    pos_words, neg_words = [], []
-    all_keywords = set(sum(ASPECT_KEYWORDS.values(), []))
+    counters = {"pos": Counter(), "neg": Counter()}
+    all_keywords = _wordcloud_keywords()
     for review, sentiment in zip(reviews, sentiments):
-        words = set(clean_text(review).split())
-        matched = [w for w in words if w in all_keywords]
-        if sentiment == "pos":
-            pos_words.extend(matched)
-        elif sentiment == "neg":
-            neg_words.extend(matched)
-    pos_wc = [{"word": w, "count": c} for w, c in Counter(pos_words).items()]
-    neg_wc = [{"word": w, "count": c} for w, c in Counter(neg_words).items()]
-    return {"positive": pos_wc, "negative": neg_wc}
+        _count_wordcloud(counters, preprocess_review(review).token_set, sentiment, all_keywords)
+    return _wordcloud_rows(counters)
 
 # ----------------- Trend Analysis -----------------
+def _count_trend(trend_counter, ts, sentiment):
+    ts = ts.strip().replace('"', '')
+    date = None
+    for fmt in ("%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            date = datetime.strptime(ts, fmt).date()
+            break
+        except ValueError:
+            continue
+    if not date:
+        return
+    if date not in trend_counter:
+        trend_counter[date] = {"pos": 0, "neg": 0, "neu": 0}
+    if sentiment not in ["pos", "neg", "neu"]:
+        sentiment = "neu"
+    trend_counter[date][sentiment] += 1
+
+def _trend_rows(trend_counter):
+    return [{"date": str(d), **counts} for d, counts in sorted(trend_counter.items())]
+
 def compute_trends(reviews, timestamps=None, sentiments=None):
     if timestamps is None:
         return []
@@ -200,195 +309,528 @@ def compute_trends(reviews, timestamps=None, sentiments=None):
         sentiments = ["neu"] * len(timestamps)
 
     for ts, sentiment in zip(timestamps, sentiments):
-        ts = ts.strip().replace('"', '')
-        date = None
-        for fmt in ("%Y-%m-%d", "%d-%m-%Y"):
-            try:
-                date = datetime.strptime(ts, fmt).date()
-                break
-            except ValueError:
-                continue
-        if not date:
-            continue
-        if date not in trend_counter:
-            trend_counter[date] = {"pos": 0, "neg": 0, "neu": 0}
-        if sentiment not in ["pos", "neg", "neu"]:
-            sentiment = "neu"
-        trend_counter[date][sentiment] += 1
+        _count_trend(trend_counter, ts, sentiment)
 
+    return _trend_rows(trend_counter)
 
-    return [{"date": str(d), **counts} for d, counts in sorted(trend_counter.items())]
 
 
-# ----------------- VADER + Ensemble Analysis (uses raw review text) -----------------
-def analyze_reviews_vader(reviews, timestamps=None, cleaned_reviews=None, feedback_ids=None):
-    per_review_summary = []
-    sentiment_counts = {"pos": 0, "neu": 0, "neg": 0}
-    aspect_sentiment = {
-        aspect: {
-            "pos": 0,
-            "neu": 0,
-            "neg": 0,
-            "confidence": 0.0,
-            "severity_score": 0
-        } for aspect in ASPECT_KEYWORDS
-    }
-    negative_words = []
-    compound_scores = []
-    sentiments_list = []
+# ----------------- Batched Transformer Inference -----------------
+_TF_FALLBACK_PROBS = {"pos": 0.5, "neg": 0.5, "neu": 0.0}
+
+def _probs_to_dict(probs):
+    if len(probs) == 2:
+        return {"neg": float(probs[0]), "pos": float(probs[1]), "neu": 0.0}
+    elif len(probs) == 3:
+        return {"neg": float(probs[0]), "neu": float(probs[1]), "pos": float(probs[2])}
+    else:
+        pos = float(probs[-1]); neg = float(probs[0])
+        return {"pos": pos, "neg": neg, "neu": max(0.0, 1.0 - pos - neg)}
+
+def _tf_probs_batch(tokenizer, model, texts, batch_size=None):
+    """
+    Score `texts` with one sequence-classification model.
+      - tokenizes everything once, then sorts by token length so each padded batch
+        holds similarly sized inputs (less padding → less wasted compute)
+      - runs one forward pass per batch of `batch_size` reviews
+    Returns a list of {"pos","neg","neu"} dicts in the original input order.
+    """
+    if not tokenizer or not model or not texts:
+        return [dict(_TF_FALLBACK_PROBS) for _ in texts]
+
+    import torch
 
-    # lazy-load transformers
+    batch_size = max(1, int(batch_size or TF_BATCH_SIZE))
     try:
-        from transformers import AutoTokenizer, AutoModelForSequenceClassification
-        import torch
-        _TF_AVAILABLE = True
+        enc = tokenizer(list(texts), truncation=True, max_length=256)
     except Exception:
-        _TF_AVAILABLE = False
+        return [dict(_TF_FALLBACK_PROBS) for _ in texts]
 
-    if _TF_AVAILABLE and not hasattr(analyze_reviews_vader, "_tf_inited"):
-        try:
-            analyze_reviews_vader._distil_tokenizer = AutoTokenizer.from_pretrained(
-                "distilbert-base-uncased-finetuned-sst-2-english"
-            )
-            analyze_reviews_vader._distil_model = AutoModelForSequenceClassification.from_pretrained(
-                "distilbert-base-uncased-finetuned-sst-2-english"
-            )
-            analyze_reviews_vader._distil_model.eval()
-        except Exception:
-            analyze_reviews_vader._distil_tokenizer = analyze_reviews_vader._distil_model = None
+    keys = list(enc.keys())
+    order = sorted(range(len(texts)), key=lambda i: len(enc["input_ids"][i]))
+    out = [None] * len(texts)
 
+    for start in range(0, len(order), batch_size):
+        idxs = order[start:start + batch_size]
         try:
-            analyze_reviews_vader._roberta_tokenizer = AutoTokenizer.from_pretrained(
-                "cardiffnlp/twitter-roberta-base-sentiment"
-            )
-            analyze_reviews_vader._roberta_model = AutoModelForSequenceClassification.from_pretrained(
-                "cardiffnlp/twitter-roberta-base-sentiment"
-            )
-            analyze_reviews_vader._roberta_model.eval()
+            features = [{k: enc[k][i] for k in keys} for i in idxs]
+            inputs = tokenizer.pad(features, padding=True, return_tensors="pt")
+            with torch.no_grad():
+                probs = torch.softmax(model(**inputs).logits, dim=-1).tolist()
+            for i, p in zip(idxs, probs):
+                out[i] = _probs_to_dict(p)
         except Exception:
-            analyze_reviews_vader._roberta_tokenizer = analyze_reviews_vader._roberta_model = None
+            for i in idxs:
+                out[i] = dict(_TF_FALLBACK_PROBS)
 
-        analyze_reviews_vader._tf_inited = True
+    return out
 
-    def _tf_probs(tokenizer, model, txt):
-        if not tokenizer or not model:
-            return {"pos": 0.5, "neg": 0.5, "neu": 0.0}
+# ----------------- Ensemble Model Loading -----------------
+DISTIL_MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+ROBERTA_MODEL_NAME = "cardiffnlp/twitter-roberta-base-sentiment"
+_ENSEMBLE_DEFAULTS = {"ENSEMBLE_W_VADER": 0.2, "ENSEMBLE_W_DISTIL": 0.4, "ENSEMBLE_W_ROBERTA": 0.4,
+                      "ENSEMBLE_POS_THRESH": 0.55}
+# values at import; ensemble_settings() re-reads the settings table for every scored chunk
+ENSEMBLE_WEIGHTS = tuple(_cfg.get(k, _ENSEMBLE_DEFAULTS[k])  # (w_v, w_d, w_r)
+                         for k in ("ENSEMBLE_W_VADER", "ENSEMBLE_W_DISTIL", "ENSEMBLE_W_ROBERTA"))
+ENSEMBLE_POS_THRESH = _cfg.get("ENSEMBLE_POS_THRESH", _ENSEMBLE_DEFAULTS["ENSEMBLE_POS_THRESH"])
+
+_TF_MODELS = {}  # "distil" / "roberta" -> (tokenizer, model, backend); (None, None, None) if it failed to load
+_TF_LOCKS = {"distil": threading.Lock(), "roberta": threading.Lock()}
+_NO_TF_MODEL = (None, None, None)
+
+
+def _tf_importable():
+    try:
+        import torch  # noqa: F401
+        from app.inference_backend import hf_auto_classes
+        hf_auto_classes()
+        return True
+    except Exception:
+        return False
+
+
+def load_tf_model(which):
+    """
+    Load one ensemble model ("distil" or "roberta") once per process.
+    Concurrent first callers wait on the model's lock instead of loading it twice.
+    Returns (tokenizer, model, backend); all None when it cannot be loaded.
+    """
+    loaded = _TF_MODELS.get(which)
+    if loaded is not None:
+        return loaded
+    with _TF_LOCKS[which]:
+        loaded = _TF_MODELS.get(which)
+        if loaded is not None:
+            return loaded
+        name, backend = {
+            "distil": (DISTIL_MODEL_NAME, INFERENCE_BACKEND_DISTIL),
+            "roberta": (ROBERTA_MODEL_NAME, INFERENCE_BACKEND_ROBERTA),
+        }[which]
         try:
-            inputs = tokenizer(txt, return_tensors="pt", truncation=True, max_length=256)
-            with torch.no_grad():
-                logits = model(**inputs).logits.squeeze()
-                probs = torch.softmax(logits, dim=0).tolist()
-            if len(probs) == 2:
-                return {"neg": float(probs[0]), "pos": float(probs[1]), "neu": 0.0}
-            elif len(probs) == 3:
-                return {"neg": float(probs[0]), "neu": float(probs[1]), "pos": float(probs[2])}
-            else:
-                pos = float(probs[-1]); neg = float(probs[0])
-                return {"pos": pos, "neg": neg, "neu": max(0.0, 1.0 - pos - neg)}
+            from app.inference_backend import apply_backend, hf_auto_classes
+            _, AutoTokenizer, AutoModelForSequenceClassification = hf_auto_classes()
+
+            tokenizer = AutoTokenizer.from_pretrained(name)
+            model = AutoModelForSequenceClassification.from_pretrained(name).eval()
+            model, backend = apply_backend(model, tokenizer, backend, name)
+            loaded = (tokenizer, model, backend)
         except Exception:
-            return {"pos": 0.5, "neg": 0.5, "neu": 0.0}
+            loaded = _NO_TF_MODEL
+        _TF_MODELS[which] = loaded
+        return loaded
 
-    def _ensemble_probs(vader_pos, vader_neg, distil_probs, roberta_probs, w_v=0.2, w_d=0.4, w_r=0.4):
-        vpos = float(vader_pos); vneg = float(vader_neg)
-        total_v = vpos + vneg
-        if total_v > 0:
-            vpos_p, vneg_p = vpos / total_v, vneg / total_v
-        else:
-            vpos_p, vneg_p = 0.5, 0.5
-        pos = (w_v * vpos_p) + (w_d * distil_probs.get("pos", 0.0)) + (w_r * roberta_probs.get("pos", 0.0))
-        neg = (w_v * vneg_p) + (w_d * distil_probs.get("neg", 0.0)) + (w_r * roberta_probs.get("neg", 0.0))
-        neu = (w_d * distil_probs.get("neu", 0.0)) + (w_r * roberta_probs.get("neu", 0.0))
-        s = pos + neg + neu
-        if s <= 0:
-            return {"pos": 0.5, "neg": 0.5, "neu": 0.0}
-        return {"pos": pos / s, "neg": neg / s, "neu": neu / s}
-
-    def _ensemble_label_and_conf(final_probs, pos_thresh=0.55):
-        p = final_probs["pos"]; n = final_probs["neg"]; ne = final_probs["neu"]
-        if p >= pos_thresh and p > n:
-            label = "pos"; conf = p
-        elif n >= pos_thresh and n > p:
-            label = "neg"; conf = n
-        else:
-            label = "neu"
-            closeness = 1.0 - abs(p - 0.5) * 2.0
-            conf = max(ne, 0.25 * closeness)
-        conf_pct = int(round(max(0.0, min(1.0, conf)) * 100))
-        return label, conf_pct
-
-    if feedback_ids is None:
-        feedback_ids = [None] * len(reviews)
-
-    for idx, review in enumerate(reviews):
-        feedback_id = feedback_ids[idx] if idx < len(feedback_ids) else None
-
-        # <<< USE RAW REVIEW TEXT HERE >>>
-        text = review
-
-        # VADER
-        scores = vader_analyzer.polarity_scores(text)
-        compound = scores["compound"]
-        compound_scores.append(compound)
-
-        # pseudo VADER probs normalized
-        vpos = scores.get("pos", 0.0)
-        vneg = scores.get("neg", 0.0)
-        vneu = max(0.0, 1.0 - (vpos + vneg))
-        s_v = vpos + vneg + vneu or 1.0
-        vpos_n, vneg_n, vneu_n = vpos / s_v, vneg / s_v, vneu / s_v
-
-        # transformer probs (safe fallbacks)
-        if _TF_AVAILABLE:
-            distil_probs = _tf_probs(getattr(analyze_reviews_vader, "_distil_tokenizer", None),
-                                     getattr(analyze_reviews_vader, "_distil_model", None),
-                                     text)
-            roberta_probs = _tf_probs(getattr(analyze_reviews_vader, "_roberta_tokenizer", None),
-                                      getattr(analyze_reviews_vader, "_roberta_model", None),
-                                      text)
-        else:
-            distil_probs = {"pos": vpos_n, "neg": vneg_n, "neu": vneu_n}
-            roberta_probs = {"pos": vpos_n, "neg": vneg_n, "neu": vneu_n}
 
-        # ensemble blend -> final probs, label, confidence
-        final_probs = _ensemble_probs(vpos, vneg, distil_probs, roberta_probs)
-        sentiment, confidence_pct = _ensemble_label_and_conf(final_probs)
+def _init_tf_models():
+    """
+    Load the DistilBERT / RoBERTa ensemble models (once per process; normally at startup warm-up).
+    Returns True when transformers + torch are importable.
+    """
+    if not _tf_importable():
+        return False
+    for which in _TF_LOCKS:
+        load_tf_model(which)
+    return True
 
-        sentiments_list.append(sentiment)
-        sentiment_counts[sentiment] += 1
-        # --- Aspect detection (restore logic) ---
-        tokens = clean_text(review).split()
-        for asp, kws in ASPECT_KEYWORDS.items():
-            if any(w in tokens for w in kws):
-                aspect_sentiment[asp][sentiment] += 1
 
+# ----------------- Vectorized Ensemble -----------------
+# every (n, 3) probability array in this section is ordered [pos, neg, neu]
+_PROB_KEYS = ("pos", "neg", "neu")
+
+def ensemble_settings():
+    """
+    (weights, pos_thresh) as currently stored in the settings table. Read once per scored
+    chunk (four rows), like the aspect keywords, so admin edits apply to the next analysis
+    in every process without a restart; the import-time values are used if it cannot be read.
+    """
+    try:
+        from app.sqlite_config import load_float_settings
+        current = load_float_settings(_ENSEMBLE_DEFAULTS)
+    except Exception:
+        return ENSEMBLE_WEIGHTS, ENSEMBLE_POS_THRESH
+    value = lambda k: current.get(k, _ENSEMBLE_DEFAULTS[k])
+    weights = (value("ENSEMBLE_W_VADER"), value("ENSEMBLE_W_DISTIL"), value("ENSEMBLE_W_ROBERTA"))
+    return weights, value("ENSEMBLE_POS_THRESH")
+
+def _probs_matrix(prob_dicts):
+    """List of {"pos","neg","neu"} dicts -> (n, 3) float array."""
+    return np.array([[d.get(k, 0.0) for k in _PROB_KEYS] for d in prob_dicts], dtype=np.float64).reshape(-1, 3)
+
+def _ensemble_probs(vader_pos, vader_neg, distil_probs, roberta_probs, weights=None):
+    """
+    Blend a whole batch at once.
+      - vader_pos, vader_neg: (n,) raw VADER pos/neg scores (renormalized to sum to 1; 0.5/0.5 if both 0)
+      - distil_probs, roberta_probs: (n, 3) arrays
+    Returns the normalized (n, 3) blend; rows with no mass at all become [0.5, 0.5, 0].
+    """
+    w_v, w_d, w_r = ENSEMBLE_WEIGHTS if weights is None else weights
+    vpos = np.asarray(vader_pos, dtype=np.float64)
+    vneg = np.asarray(vader_neg, dtype=np.float64)
+    total_v = vpos + vneg
+    has_v = total_v > 0
+    total_v = np.where(has_v, total_v, 1.0)
+    vpos_p = np.where(has_v, vpos / total_v, 0.5)
+    vneg_p = np.where(has_v, vneg / total_v, 0.5)
+
+    pos = (w_v * vpos_p) + (w_d * distil_probs[:, 0]) + (w_r * roberta_probs[:, 0])
+    neg = (w_v * vneg_p) + (w_d * distil_probs[:, 1]) + (w_r * roberta_probs[:, 1])
+    neu = (w_d * distil_probs[:, 2]) + (w_r * roberta_probs[:, 2])
+    s = pos + neg + neu
+    has_mass = s > 0
+    s = np.where(has_mass, s, 1.0)
+    out = np.stack([pos / s, neg / s, neu / s], axis=1)
+    out[~has_mass] = (0.5, 0.5, 0.0)
+    return out
+
+def _ensemble_label_and_conf(final_probs, pos_thresh=None):
+    """
+    Labels and confidence percentages for (n, 3) blended probs.
+      - pos / neg when that class reaches pos_thresh and beats the other
+      - otherwise neu, with confidence max(neu, 0.25 * closeness of pos to 0.5)
+    Returns (labels: (n,) str array, conf_pct: (n,) int array).
+    """
+    pos_thresh = ENSEMBLE_POS_THRESH if pos_thresh is None else pos_thresh
+    p, n, ne = final_probs[:, 0], final_probs[:, 1], final_probs[:, 2]
+    is_pos = (p >= pos_thresh) & (p > n)
+    is_neg = ~is_pos & (n >= pos_thresh) & (n > p)
+    closeness = 1.0 - np.abs(p - 0.5) * 2.0
+    conf = np.where(is_pos, p, np.where(is_neg, n, np.maximum(ne, 0.25 * closeness)))
+    conf_pct = np.rint(np.clip(conf, 0.0, 1.0) * 100).astype(np.int64)  # rint: half-to-even, like round()
+    labels = np.where(is_pos, "pos", np.where(is_neg, "neg", "neu"))
+    return labels, conf_pct
+
+
+# ----------------- Per-review Result Cache -----------------
+def _cache_model_key(tf_available, weights=None, pos_thresh=None):
+    """Identifies everything that affects a review's scores (models actually loaded, weights, threshold)."""
+    _, distil_model, distil_backend = _TF_MODELS.get("distil", _NO_TF_MODEL)
+    _, roberta_model, roberta_backend = _TF_MODELS.get("roberta", _NO_TF_MODEL)
+    distil_loaded = tf_available and distil_model is not None
+    roberta_loaded = tf_available and roberta_model is not None
+    key = {
+        "v": 1,
+        "tf": bool(tf_available),
+        "distil": DISTIL_MODEL_NAME if distil_loaded else None,
+        "roberta": ROBERTA_MODEL_NAME if roberta_loaded else None,
+        "weights": list(ENSEMBLE_WEIGHTS if weights is None else weights),
+        "pos_thresh": ENSEMBLE_POS_THRESH if pos_thresh is None else pos_thresh,
+    }
+    # quantized / ONNX scores differ slightly from fp32; fp32 keeps the original key
+    backends = {
+        "distil": distil_backend if distil_loaded else None,
+        "roberta": roberta_backend if roberta_loaded else None,
+    }
+    backends = {k: b for k, b in backends.items() if b not in (None, "torch")}
+    if backends:
+        key["backends"] = backends
+    return json.dumps(key, sort_keys=True)
+
+def _cache_lookup(keys):
+    if RESULT_CACHE_MAX_ENTRIES <= 0:
+        return {}
+    try:
+        return get_result_cache(RESULT_CACHE_MAX_ENTRIES).get_many(keys)
+    except Exception:
+        return {}
+
+def _cache_store(entries):
+    if RESULT_CACHE_MAX_ENTRIES <= 0 or not entries:
+        return
+    try:
+        get_result_cache(RESULT_CACHE_MAX_ENTRIES).put_many(entries)
+    except Exception:
+        pass
+
+def _vader_probs(vpos, vneg):
+    """(n, 3) VADER probs: pos/neg as scored, neu = the remainder, renormalized."""
+    vneu = np.maximum(0.0, 1.0 - (vpos + vneg))
+    s_v = vpos + vneg + vneu
+    s_v = np.where(s_v > 0, s_v, 1.0)
+    return np.stack([vpos / s_v, vneg / s_v, vneu / s_v], axis=1)
+
+def _score_reviews(texts, distil_probs=None, roberta_probs=None, weights=None, pos_thresh=None):
+    """
+    VADER + ensemble scores for a batch of reviews (the cacheable part), blended in one
+    vectorized pass. Reviews without transformer probs (None entries, or no lists at all)
+    use normalized VADER for both ensemble members.
+    Returns arrays: compound, vpos, vneg (n,); vader, distil, roberta, probs (n, 3); label, conf (n,).
+    """
+    n = len(texts)
+    scores = [vader_analyzer.polarity_scores(text) for text in texts]
+    vpos = np.array([sc.get("pos", 0.0) for sc in scores], dtype=np.float64)
+    vneg = np.array([sc.get("neg", 0.0) for sc in scores], dtype=np.float64)
+    vader = _vader_probs(vpos, vneg)
+
+    distil_probs = distil_probs or [None] * n
+    roberta_probs = roberta_probs or [None] * n
+    has_tf = np.array([d is not None and r is not None for d, r in zip(distil_probs, roberta_probs)], dtype=bool)
+    distil, roberta = vader.copy(), vader.copy()
+    if has_tf.any():
+        distil[has_tf] = _probs_matrix([d for d, ok in zip(distil_probs, has_tf) if ok])
+        roberta[has_tf] = _probs_matrix([r for r, ok in zip(roberta_probs, has_tf) if ok])
+
+    probs = _ensemble_probs(vpos, vneg, distil, roberta, weights=weights)
+    labels, conf = _ensemble_label_and_conf(probs, pos_thresh=pos_thresh)
+    return {
+        "compound": np.array([sc["compound"] for sc in scores], dtype=np.float64),
+        "vpos": vpos,
+        "vneg": vneg,
+        "vader": vader,
+        "distil": distil,
+        "roberta": roberta,
+        "probs": probs,
+        "label": labels,
+        "conf": conf,
+    }
+
+def _cache_entries(scored):
+    """Per-review dicts for the result cache (same layout as earlier cache versions)."""
+    def as_dicts(arr):
+        return [dict(zip(_PROB_KEYS, row)) for row in arr.tolist()]
+    return [
+        {"compound": c, "vpos": vp, "vneg": vn, "distil": d, "roberta": r, "probs": p, "label": l, "conf": cf}
+        for c, vp, vn, d, r, p, l, cf in zip(
+            scored["compound"].tolist(), scored["vpos"].tolist(), scored["vneg"].tolist(),
+            as_dicts(scored["distil"]), as_dicts(scored["roberta"]), as_dicts(scored["probs"]),
+            scored["label"].tolist(), scored["conf"].tolist())
+    ]
 
 
-        from nltk.corpus import stopwords
-        STOPWORDS = set(stopwords.words("english"))
+# ----------------- Per-shard Scoring -----------------
+def _empty_partial(aspects=()):
+    return {
+        "review_count": 0,
+        "per_review_summary": [],
+        "sentiment_counts": {"pos": 0, "neu": 0, "neg": 0},
+        "aspect_counts": {aspect: {"pos": 0, "neu": 0, "neg": 0} for aspect in aspects},
+        "negative_words": Counter(),
+        "compound_scores": [],
+        "wordcloud": {"pos": Counter(), "neg": Counter()},
+        "trend_counter": {},
+        "examples": {},
+        "report_texts": [],
+        "cleaned": [],
+    }
 
-        import re
+def _score_shard(rows, offset=0, batch_size=None):
+    """
+    Score one contiguous slice of the upload.
+      - rows: list of (review, feedback_id, timestamp) tuples
+      - offset: index of rows[0] in the full upload (keeps per-review ids stable across shards)
+    Returns a partial dict of mergeable counters (see _merge_partials).
+    """
+    matcher = get_aspect_matcher(fallback=ASPECT_KEYWORDS)
+    partial = _empty_partial(matcher.aspects)
+    per_review_summary = partial["per_review_summary"]
+    sentiment_counts = partial["sentiment_counts"]
+    aspect_counts = partial["aspect_counts"]
+    negative_words = partial["negative_words"]
+    compound_scores = partial["compound_scores"]
+    wordcloud_keywords = matcher.keywords
+    # first matching review per issue cluster (lets _build_result pick examples without the full upload)
+    example_kws = {cluster: kws[:4] for cluster, kws in ISSUE_CLUSTERS.items()}
+
+    _TF_AVAILABLE = _init_tf_models()
+    weights, pos_thresh = ensemble_settings()
+
+    reviews = [r[0] for r in rows]
+    # one preprocessing pass per review, shared by aspects / negative words / wordcloud / report
+    records = [preprocess_review(review) for review in reviews]
+
+    # cached scores from earlier uploads; only the misses go through VADER / the transformers
+    model_key = _cache_model_key(_TF_AVAILABLE, weights, pos_thresh)
+    keys = [ResultCache.key_for(review, model_key) for review in reviews]
+    cached = _cache_lookup(keys)
+    miss_idx = [i for i, k in enumerate(keys) if k not in cached]
+
+    # transformer probs for the shard's misses in padded batches (one pass per model)
+    distil_all, roberta_all = {}, {}
+    if _TF_AVAILABLE and miss_idx:
+        miss_texts = [reviews[i] for i in miss_idx]
+        distil_tok, distil_model, _ = _TF_MODELS.get("distil", _NO_TF_MODEL)
+        roberta_tok, roberta_model, _ = _TF_MODELS.get("roberta", _NO_TF_MODEL)
+        distil_all = dict(zip(miss_idx, _tf_probs_batch(distil_tok, distil_model, miss_texts, batch_size=batch_size)))
+        roberta_all = dict(zip(miss_idx, _tf_probs_batch(roberta_tok, roberta_model, miss_texts, batch_size=batch_size)))
+
+    # VADER + ensemble blend for the misses in one vectorized pass; hits come from the cache
+    n = len(rows)
+    compound = np.zeros(n)
+    vpos, vneg = np.zeros(n), np.zeros(n)
+    probs = np.zeros((n, 3))
+    labels = np.empty(n, dtype=object)
+    conf = np.zeros(n, dtype=np.int64)
+    new_entries = {}
+    if miss_idx:
+        fresh = _score_reviews([reviews[i] for i in miss_idx],
+                               [distil_all.get(i) for i in miss_idx], [roberta_all.get(i) for i in miss_idx],
+                               weights=weights, pos_thresh=pos_thresh)
+        new_entries = dict(zip((keys[i] for i in miss_idx), _cache_entries(fresh)))
+        compound[miss_idx], vpos[miss_idx], vneg[miss_idx] = fresh["compound"], fresh["vpos"], fresh["vneg"]
+        probs[miss_idx] = fresh["probs"]
+        labels[miss_idx] = fresh["label"].tolist()
+        conf[miss_idx] = fresh["conf"]
+    hit_idx = [i for i, k in enumerate(keys) if k in cached]
+    if hit_idx:
+        hits = [cached[keys[i]] for i in hit_idx]
+        compound[hit_idx] = [h["compound"] for h in hits]
+        vpos[hit_idx] = [h["vpos"] for h in hits]
+        vneg[hit_idx] = [h["vneg"] for h in hits]
+        probs[hit_idx] = _probs_matrix([h["probs"] for h in hits])
+        labels[hit_idx] = [h["label"] for h in hits]
+        conf[hit_idx] = [h["conf"] for h in hits]
+
+    # percentages for the summary rows; per-review dicts are only built below, when serializing
+    compound_l = compound.tolist()
+    labels_l = labels.tolist()
+    conf_l = conf.tolist()
+    vader_pct = (_vader_probs(vpos, vneg) * 100).tolist()
+    ens_pct = (probs * 100).tolist()
+    compound_scores.extend(compound_l)
+
+    for idx, (review, feedback_id, timestamp) in enumerate(rows):
+        rec = records[idx]
+        sentiment = labels_l[idx]
+
+        sentiment_counts[sentiment] += 1
+        # --- Aspect detection (restore logic) ---
+        for asp in matcher.match(rec.normalized_tokens):
+            aspect_counts[asp][sentiment] += 1
 
         # collect negative words (simple heuristic)
         if sentiment == "neg":
-            toks = [t for t in re.findall(r"[a-zA-Z]{2,}", text.lower()) if t not in STOPWORDS]
-            negative_words.extend(toks[:4])
+            negative_words.update(rec.negative_candidates)
 
         per_review_summary.append({
-            "id": idx + 1,
+            "id": offset + idx + 1,
             "feedback_id": feedback_id,
             "text": review[:50] + ("..." if len(review) > 50 else ""),
             "sentiment": sentiment,
-            "compound": compound,
-            "confidence": confidence_pct,
-            "vader_pos_pct": round(vpos_n * 100, 2),
-            "vader_neg_pct": round(vneg_n * 100, 2),
-            "vader_neu_pct": round(vneu_n * 100, 2),
-            "ensemble_pos": round(final_probs["pos"] * 100, 2),
-            "ensemble_neg": round(final_probs["neg"] * 100, 2),
-            "ensemble_neu": round(final_probs["neu"] * 100, 2)
+            "compound": compound_l[idx],
+            "confidence": conf_l[idx],
+            "vader_pos_pct": round(vader_pct[idx][0], 2),
+            "vader_neg_pct": round(vader_pct[idx][1], 2),
+            "vader_neu_pct": round(vader_pct[idx][2], 2),
+            "ensemble_pos": round(ens_pct[idx][0], 2),
+            "ensemble_neg": round(ens_pct[idx][1], 2),
+            "ensemble_neu": round(ens_pct[idx][2], 2)
         })
 
-    total = len(reviews) if reviews else 1
+        _count_wordcloud(partial["wordcloud"], rec.token_set, sentiment, wordcloud_keywords)
+        if timestamp:
+            _count_trend(partial["trend_counter"], timestamp, sentiment)
+        if example_kws:
+            for cluster in list(example_kws):
+                if any(kw in rec.lowered for kw in example_kws[cluster]):
+                    partial["examples"][cluster] = (review[:140] + "...") if len(review) > 140 else review
+                    del example_kws[cluster]
+        cleaned = rec.cleaned
+        partial["report_texts"].append((cleaned[:140] + "...") if len(cleaned) > 140 else cleaned)
+        partial["cleaned"].append(cleaned)
+
+    _cache_store(new_entries)
+    partial["review_count"] = len(rows)
+    return partial
+
+def _empty_merged(keep_rows=True):
+    """
+    Accumulator for _merge_into. Compound scores are folded into CompoundStats; with
+    keep_rows=False the per-review rows and report texts are not kept either, so the
+    merged state stays the same size however long the upload is.
+    """
+    merged = _empty_partial(get_aspect_matcher(fallback=ASPECT_KEYWORDS).aspects)
+    del merged["compound_scores"], merged["cleaned"]
+    merged["compound_stats"] = CompoundStats()
+    if not keep_rows:
+        del merged["per_review_summary"], merged["report_texts"]
+    return merged
+
+def _merge_into(merged, part):
+    """
+    Fold one shard partial into `merged` (shards must arrive in upload order).
+    Counter.update keeps first-seen order, so most_common() ties resolve exactly
+    as in a single-process run. The bulky "cleaned" texts are not carried over.
+    """
+    merged["review_count"] += part["review_count"]
+    if "per_review_summary" in merged:
+        merged["per_review_summary"].extend(part["per_review_summary"])
+        merged["report_texts"].extend(part["report_texts"])
+    merged["compound_stats"].add(part["compound_scores"])
+    merged["negative_words"].update(part["negative_words"])
+    for k, v in part["sentiment_counts"].items():
+        merged["sentiment_counts"][k] += v
+    for asp, counts in part["aspect_counts"].items():
+        dst = merged["aspect_counts"].setdefault(asp, {"pos": 0, "neu": 0, "neg": 0})
+        for k, v in counts.items():
+            dst[k] += v
+    for k in ("pos", "neg"):
+        merged["wordcloud"][k].update(part["wordcloud"][k])
+    for date, counts in part["trend_counter"].items():
+        dst = merged["trend_counter"].setdefault(date, {"pos": 0, "neg": 0, "neu": 0})
+        for k, v in counts.items():
+            dst[k] += v
+    for cluster, example in part["examples"].items():
+        merged["examples"].setdefault(cluster, example)
+    return merged
+
+def _merge_partials(partials):
+    merged = _empty_merged()
+    for part in partials:
+        _merge_into(merged, part)
+    return merged
+
+
+# ----------------- CSV Report -----------------
+REPORT_HEADER = [
+    "Review ID", "FeedbackID", "Text", "Sentiment", "Compound", "Confidence(%)",
+    "Pos% (per-review)", "Neg% (per-review)", "Neu% (per-review)",
+    "Pos% (global)", "Neg% (global)", "Neu% (global)"
+]
+
+def report_review_columns(rev, text):
+    """Per-review part of a report row (everything but the three global columns)."""
+    return [
+        rev.get("id"),
+        rev.get("feedback_id"),
+        (text[:140] + "...") if len(text) > 140 else text,
+        rev.get("sentiment"),
+        rev.get("compound"),
+        rev.get("confidence", 0),
+        rev.get("ensemble_pos", rev.get("vader_pos_pct")),
+        rev.get("ensemble_neg", rev.get("vader_neg_pct")),
+        rev.get("ensemble_neu", rev.get("vader_neu_pct")),
+    ]
+
+def report_global_columns(sentiment_distribution):
+    """The three global columns, identical on every row (known once the whole upload is scored)."""
+    return [
+        sentiment_distribution.get("pos_percent", 0),
+        sentiment_distribution.get("neg_percent", 0),
+        sentiment_distribution.get("neu_percent", 0)
+    ]
+
+
+# ----------------- Result Assembly -----------------
+def _build_result(partial, report_texts=None):
+    """
+    Turn merged shard counters into the API result. `report_texts` overrides the
+    per-review text written to the CSV report (defaults to the cleaned reviews).
+    Without per-review rows in `partial` (streamed to a row_sink) the result has no
+    per_review_summary / report_download: the sink owns those.
+    """
+    per_review_summary = partial.get("per_review_summary")
+    sentiment_counts = partial["sentiment_counts"]
+    compound_stats = partial["compound_stats"]
+    aspect_sentiment = {
+        aspect: {
+            "pos": counts["pos"],
+            "neu": counts["neu"],
+            "neg": counts["neg"],
+            "confidence": 0.0,
+            "severity_score": 0
+        } for aspect, counts in partial["aspect_counts"].items()
+    }
+
+    total = partial["review_count"] or 1
     sentiment_distribution = {
         "pos": sentiment_counts["pos"],
         "neg": sentiment_counts["neg"],
@@ -402,13 +844,13 @@ def analyze_reviews_vader(reviews, timestamps=None, cleaned_reviews=None, feedba
         total_a = stats["pos"] + stats["neu"] + stats["neg"]
         stats["severity_score"] = int((stats["neg"] / total_a) * 100) if total_a > 0 else 0
 
-    avg_abs_comp = float(np.mean(np.abs(np.array(compound_scores)))) if compound_scores else 0
+    avg_abs_comp = compound_stats.mean_abs()
     for asp, stats in aspect_sentiment.items():
         total_a = stats["pos"] + stats["neu"] + stats["neg"]
         mention_factor = min(1.0, total_a / 3)
         stats["confidence"] = round(0.5 * mention_factor + 0.5 * avg_abs_comp, 4)
 
-    top_issues_counter = Counter(negative_words)
+    top_issues_counter = partial["negative_words"]
     total_negatives = sum(top_issues_counter.values()) or 1
     top_issues = [
         {"keyword": kw, "count": cnt, "percent": round((cnt / total_negatives) * 100, 2)}
@@ -425,57 +867,20 @@ def analyze_reviews_vader(reviews, timestamps=None, cleaned_reviews=None, feedba
             if cluster == it["keyword"]:
                 it["keywords"] = kws[:4]
                 break
-        it["example"] = "No sample available."
-        for rv in reviews:
-            rv_low = rv.lower()
-            for kw in it["keywords"]:
-                if kw in rv_low:
-                    it["example"] = (rv[:140] + "...") if len(rv) > 140 else rv
-                    break
-            if it["example"] != "No sample available.":
-                break
+        it["example"] = partial["examples"].get(it["keyword"], "No sample available.")
         it["trend"] = [max(0, round(it["percent"] * f, 2)) for f in [0.6, 0.9, 1.0]]
 
     suggestions = generate_suggestions(top_issues,
                                        sentiment_distribution=sentiment_distribution,
-                                       compound_scores=compound_scores,
+                                       compound_scores=compound_stats,
                                        aspect_sentiment=aspect_sentiment,
                                        top_k=5)
     impact_score = compute_impact_score(sentiment_distribution, top_issues)
-    confidence_overview = compute_confidence_stats(compound_scores)
-    wordcloud_data = generate_wordcloud_data(reviews, sentiments_list)
-    trend_over_time = compute_trends(reviews, timestamps, sentiments_list)
+    confidence_overview = compute_confidence_stats(compound_stats)
+    wordcloud_data = _wordcloud_rows(partial["wordcloud"])
+    trend_over_time = _trend_rows(partial["trend_counter"])
 
-    output_csv = io.StringIO()
-    writer = csv.writer(output_csv)
-    writer.writerow([
-        "Review ID", "FeedbackID", "Text", "Sentiment", "Compound", "Confidence(%)",
-        "Pos% (per-review)", "Neg% (per-review)", "Neu% (per-review)",
-        "Pos% (global)", "Neg% (global)", "Neu% (global)"
-    ])
-
-    cleaned_iter = cleaned_reviews if cleaned_reviews is not None else [r for r in reviews]
-
-    for rev, clean_text_value in zip(per_review_summary, cleaned_iter):
-        conf_pct = rev.get("confidence", 0)
-        writer.writerow([
-            rev.get("id"),
-            rev.get("feedback_id"),
-            (clean_text_value[:140] + "...") if len(clean_text_value) > 140 else clean_text_value,
-            rev.get("sentiment"),
-            rev.get("compound"),
-            conf_pct,
-            rev.get("ensemble_pos", rev.get("vader_pos_pct", sentiment_distribution.get("pos_percent", 0))),
-            rev.get("ensemble_neg", rev.get("vader_neg_pct", sentiment_distribution.get("neg_percent", 0))),
-            rev.get("ensemble_neu", rev.get("vader_neu_pct", sentiment_distribution.get("neu_percent", 0))),
-            sentiment_distribution.get("pos_percent", 0),
-            sentiment_distribution.get("neg_percent", 0),
-            sentiment_distribution.get("neu_percent", 0)
-        ])
-
-    report_csv_base64 = output_csv.getvalue()
-
-    return {
+    result = {
         "sentiment_distribution": sentiment_distribution,
         "per_review_summary": per_review_summary,
         "aspect_sentiment": aspect_sentiment,
@@ -485,8 +890,158 @@ def analyze_reviews_vader(reviews, timestamps=None, cleaned_reviews=None, feedba
         "confidence_overview": confidence_overview,
         "wordcloud_data": wordcloud_data,
         "trend_over_time": trend_over_time,
-        "report_download": report_csv_base64
+        "report_download": None
     }
+    if per_review_summary is None:
+        del result["per_review_summary"], result["report_download"]
+        return result
+
+    output_csv = io.StringIO()
+    writer = csv.writer(output_csv)
+    writer.writerow(REPORT_HEADER)
+
+    cleaned_iter = report_texts if report_texts is not None else partial["report_texts"]
+    global_columns = report_global_columns(sentiment_distribution)
+    for rev, clean_text_value in zip(per_review_summary, cleaned_iter):
+        writer.writerow(report_review_columns(rev, clean_text_value) + global_columns)
+
+    result["report_download"] = output_csv.getvalue()
+    return result
+
+
+# ----------------- VADER + Ensemble Analysis (uses raw review text) -----------------
+def analyze_reviews_vader(reviews, timestamps=None, cleaned_reviews=None, feedback_ids=None, batch_size=None):
+    reviews = list(reviews)
+    feedback_ids = feedback_ids or []
+    timestamps = timestamps or []
+    rows = (
+        (review,
+         feedback_ids[idx] if idx < len(feedback_ids) else None,
+         timestamps[idx] if idx < len(timestamps) else None)
+        for idx, review in enumerate(reviews)
+    )
+    partial = _score_rows(rows, batch_size=batch_size)
+    report_texts = cleaned_reviews if cleaned_reviews is not None else reviews
+    return _build_result(partial, report_texts=report_texts)
+
+def analyze_review_rows_vader(rows, row_sink=None, batch_size=None):
+    """
+    Streaming variant: `rows` is any iterable of (review, feedback_id, timestamp)
+    tuples (e.g. a CSV reader generator). Only STREAM_CHUNK_SIZE raw rows are held
+    at a time; `row_sink(records)` is called per chunk with
+    {"id", "feedback_id", "cleaned_text", "report_text", "summary"} records (summary is
+    the per_review_summary entry, report_text the report's Text column) so callers can
+    persist them without buffering the whole upload.
+    With a row_sink only aggregates are kept: the result carries no per_review_summary
+    or report_download (the sink writes them, see report_review_columns).
+    """
+    partial = _score_rows(rows, batch_size=batch_size, row_sink=row_sink)
+    return _build_result(partial)
+
+def _iter_chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _score_rows(rows, batch_size=None, row_sink=None):
+    """
+    Score an iterable of rows chunk by chunk and fold the partials together.
+    Once the stream proves to hold at least SHARD_MIN_REVIEWS rows, chunks are
+    fanned out to the process pool (bounded number in flight); smaller uploads
+    stay in-process.
+    """
+    chunks = _iter_chunks(rows, STREAM_CHUNK_SIZE)
+
+    # buffer just enough chunks to decide whether sharding pays off
+    head, buffered = [], 0
+    if ANALYZE_WORKERS > 1:
+        for chunk in chunks:
+            head.append(chunk)
+            buffered += len(chunk)
+            if buffered >= SHARD_MIN_REVIEWS:
+                break
+    use_pool = ANALYZE_WORKERS > 1 and buffered >= SHARD_MIN_REVIEWS
+
+    all_chunks = itertools.chain(head, chunks)
+    if use_pool:
+        parts = _map_chunks_in_pool(all_chunks, batch_size)
+    else:
+        parts = _map_chunks_inline(all_chunks, batch_size)
+
+    merged = _empty_merged(keep_rows=row_sink is None)
+    for part in parts:
+        if row_sink is not None:
+            start = merged["review_count"]
+            row_sink([
+                {"id": start + i + 1, "feedback_id": rev["feedback_id"], "cleaned_text": cleaned,
+                 "report_text": report_text, "summary": rev}
+                for i, (rev, cleaned, report_text) in enumerate(
+                    zip(part["per_review_summary"], part["cleaned"], part["report_texts"]))
+            ])
+        _merge_into(merged, part)
+    return merged
+
+def _map_chunks_inline(chunks, batch_size):
+    offset = 0
+    for chunk in chunks:
+        yield _score_shard(chunk, offset, batch_size)
+        offset += len(chunk)
+
+
+# ----------------- Process-pool Sharding -----------------
+_SHARD_POOL = None
+_SHARD_POOL_LOCK = threading.Lock()
+
+def _init_shard_worker(n_workers):
+    """Pool initializer: split the cores between workers and load the models up-front."""
+    try:
+        import torch
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // max(1, n_workers)))
+    except Exception:
+        pass
+    _init_tf_models()
+
+def _get_shard_pool():
+    """One long-lived pool per API process, so models are loaded once per worker, not per request."""
+    global _SHARD_POOL
+    with _SHARD_POOL_LOCK:
+        if _SHARD_POOL is None:
+            _SHARD_POOL = ProcessPoolExecutor(
+                max_workers=ANALYZE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_shard_worker,
+                initargs=(ANALYZE_WORKERS,),
+            )
+    return _SHARD_POOL
+
+def shutdown_shard_pool():
+    global _SHARD_POOL
+    with _SHARD_POOL_LOCK:
+        if _SHARD_POOL is not None:
+            _SHARD_POOL.shutdown(wait=True, cancel_futures=True)
+            _SHARD_POOL = None
+
+def _map_chunks_in_pool(chunks, batch_size):
+    """
+    Submit chunks to the shard pool and yield results in upload order. At most
+    2 x ANALYZE_WORKERS chunks are in flight, so reading the upload never runs
+    far ahead of scoring.
+    """
+    pool = _get_shard_pool()
+    pending = collections.deque()
+    offset = 0
+    for chunk in chunks:
+        pending.append(pool.submit(_score_shard, chunk, offset, batch_size))
+        offset += len(chunk)
+        if len(pending) >= ANALYZE_WORKERS * 2:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
 
 
 # ----------------- Hugging Face Placeholder -----------------
@@ -509,3 +1064,10 @@ def analyze_reviews(reviews, model="vader", timestamps=None, cleaned_reviews=Non
     else:
         raise ValueError("Unsupported model. Use 'vader', 'huggingface', or 'tl_model'.")
 
+def analyze_review_rows(rows, model="vader", row_sink=None):
+    """Streaming counterpart of analyze_reviews (rows of (review, feedback_id, timestamp))."""
+    model = model.lower().strip()
+    if model in ("vader", "huggingface", "tl_model"):
+        return analyze_review_rows_vader(rows, row_sink=row_sink)
+    else:
+        raise ValueError("Unsupported model. Use 'vader', 'huggingface', or 'tl_model'.")
@@ -0,0 +1,74 @@
+# app/aspect_matcher.py
+import threading
+from typing import Dict, List, Set
+
+from app.preprocess import normalize_text, stop_words
+
+
+class AspectMatcher:
+    """
+    Precompiled aspect keyword index.
+      - keywords are normalized with the same pipeline as reviews (normalize_text)
+      - index: first token -> [(phrase tokens, aspect), ...]
+      - match() walks the review tokens once; single-word keywords are a dict hit,
+        multi-word keywords ("customer care", "out of stock") compare the following tokens
+    Match on normalize_text() tokens (stopwords kept) so phrases containing
+    stopwords still line up.
+    """
+
+    def __init__(self, aspect_keywords: Dict[str, List[str]]):
+        self.aspect_keywords = {aspect: list(kws) for aspect, kws in aspect_keywords.items()}
+        self.aspects = list(self.aspect_keywords)
+        self._index = {}
+        for aspect, kws in self.aspect_keywords.items():
+            for kw in kws:
+                phrase = tuple(normalize_text(kw).split())
+                # single stopword keywords could never match cleaned tokens before; keep it that way
+                if not phrase or (len(phrase) == 1 and phrase[0] in stop_words):
+                    continue
+                self._index.setdefault(phrase[0], []).append((phrase, aspect))
+
+    @property
+    def keywords(self) -> Set[str]:
+        return set(sum(self.aspect_keywords.values(), []))
+
+    def match(self, tokens: List[str]) -> Set[str]:
+        """Return the set of aspects mentioned in `tokens` (one linear pass)."""
+        found = set()
+        index = self._index
+        for i, tok in enumerate(tokens):
+            entries = index.get(tok)
+            if not entries:
+                continue
+            for phrase, aspect in entries:
+                if aspect in found:
+                    continue
+                if len(phrase) == 1 or tuple(tokens[i:i + len(phrase)]) == phrase:
+                    found.add(aspect)
+        return found
+
+
+# ----------------- Shared instance (rebuilt when the admin config changes) -----------------
+_MATCHER = None
+_MATCHER_LOCK = threading.Lock()
+
+
+def get_aspect_matcher(fallback: Dict[str, List[str]] = None) -> AspectMatcher:
+    """
+    Return the current matcher. The aspect_keywords table is re-read on every call
+    (a handful of rows) and the index is rebuilt only when its contents changed,
+    so edits from the admin API / config tool apply to the next analysis in every
+    process without a restart.
+    """
+    global _MATCHER
+    try:
+        from app.sqlite_config import load_aspect_keywords
+        aspect_keywords = load_aspect_keywords()
+    except Exception:
+        aspect_keywords = {}
+    aspect_keywords = aspect_keywords or fallback or {}
+
+    with _MATCHER_LOCK:
+        if _MATCHER is None or _MATCHER.aspect_keywords != aspect_keywords:
+            _MATCHER = AspectMatcher(aspect_keywords)
+        return _MATCHER
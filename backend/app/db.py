@@ -38,3 +38,65 @@ def connect_db():
 
 def get_db():
     return connect_db()
+
+
+# ----------------- Indexes -----------------
+# (collection, keys, options); create_index is a no-op when the index already exists.
+# app/scripts/check_query_plans.py explains the queries these are meant to serve.
+INDEXES = [
+    # /feedback/visuals keyset pagination: newest first, _id breaks created_at ties
+    ("analysis", [("created_at", -1), ("_id", -1)], {"name": "created_at_id_desc"}),
+    ("analysis", [("name", 1)], {"name": "name"}),
+    # per-review rows of split analyses, read back in review order
+    ("analysis_reviews", [("analysis_id", 1), ("id", 1)], {"name": "analysis_id_review_id"}),
+    ("cleaned_feedbacks", [("name", 1)], {"name": "name"}),
+    # /active/feedbacks/recent
+    ("feedbacks", [("saved_at", -1)], {"name": "saved_at_desc"}),
+    # /active/uncertain_samples only ever asks for confidence < 0.5, so index just those
+    ("feedbacks", [("saved_at", -1), ("confidence", 1)], {
+        "name": "uncertain_saved_at_desc",
+        "partialFilterExpression": {"confidence": {"$lt": 0.5}},
+    }),
+    # retraining pulls corrected feedback
+    ("feedbacks", [("corrected", 1)], {"name": "corrected"}),
+    ("metrics_history", [("created_at", -1)], {"name": "created_at_desc"}),
+    ("models", [("created_at", -1)], {"name": "created_at_desc"}),
+    ("models", [("version", 1)], {"name": "version"}),
+    ("retrain_jobs", [("job_id", 1)], {"name": "job_id"}),
+    ("retrain_jobs", [("status", 1), ("created_at", 1)], {"name": "status_created_at"}),
+    # background analyses: polled by job_id, pending ones counted on submit,
+    # finished ones expire after a day
+    ("analysis_jobs", [("job_id", 1)], {"name": "job_id"}),
+    ("analysis_jobs", [("status", 1), ("lease_until", 1)], {"name": "status_lease_until"}),
+    ("analysis_jobs", [("finished_at", 1)], {"name": "finished_at_ttl", "expireAfterSeconds": 24 * 3600}),
+    ("admins", [("username", 1)], {"name": "username"}),
+    ("admins", [("admin_id", 1)], {"name": "admin_id"}),
+    ("users", [("createdAt", 1)], {"name": "createdAt"}),
+    ("model_growth", [("version", 1)], {"name": "version"}),
+    ("user_growth", [("date", 1)], {"name": "date"}),
+    ("model_history", [("createdAt", -1)], {"name": "createdAt_desc"}),
+    ("logs", [("timestamp", -1)], {"name": "timestamp_desc"}),
+]
+
+
+def ensure_indexes(db=None):
+    """Create REQUIRED_COLLECTIONS and INDEXES if missing (safe to run on every startup)."""
+    db = db if db is not None else connect_db()
+    try:
+        existing = set(db.list_collection_names())
+    except pymongo.errors.ServerSelectionTimeoutError as e:
+        print("❌ Skipping index bootstrap, MongoDB unreachable:", e)
+        return
+
+    for coll in REQUIRED_COLLECTIONS:
+        if coll not in existing:
+            try:
+                db.create_collection(coll)
+            except pymongo.errors.CollectionInvalid:
+                pass  # created concurrently
+
+    for coll, keys, options in INDEXES:
+        try:
+            db[coll].create_index(keys, **options)
+        except Exception as e:
+            print(f"⚠️ Could not create index {options.get('name')} on {coll}:", e)
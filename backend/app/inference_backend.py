@@ -0,0 +1,177 @@
+# app/inference_backend.py
+"""
+CPU inference backends for the sequence-classification models
+(submodels/transformer and the DistilBERT / RoBERTa ensemble).
+
+    "torch"      fp32 eager PyTorch (default, unchanged behaviour)
+    "int8"       torch dynamic quantization: nn.Linear weights stored as int8,
+                 activations quantized on the fly
+    "onnx"       exported once to data/onnx/<name>.onnx and run with onnxruntime
+    "onnx-int8"  same export, weights dynamically quantized with onnxruntime.quantization
+
+onnxruntime (and onnx, for the export) are optional; when they are missing or a
+conversion fails the fp32 model is used and a warning is printed.
+Every backend returns an object that is called like the HF model (`model(**inputs).logits`).
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+BACKENDS = ("torch", "int8", "onnx", "onnx-int8")
+DEFAULT_BACKEND = "torch"
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+ONNX_DIR = BASE_DIR / "data" / "onnx"
+ONNX_OPSET = 17
+
+_EXPORT_LOCK = threading.Lock()
+_HF_IMPORT_LOCK = threading.Lock()
+
+
+def hf_auto_classes():
+    """
+    (AutoConfig, AutoTokenizer, AutoModelForSequenceClassification).
+    transformers replaces itself with a lazy module while it is still being imported, so a
+    second thread can see it half-initialized ("cannot import name" during parallel warm-up).
+    Every import of transformers goes through here, under one lock.
+    """
+    with _HF_IMPORT_LOCK:
+        from transformers import AutoConfig, AutoTokenizer, AutoModelForSequenceClassification
+    return AutoConfig, AutoTokenizer, AutoModelForSequenceClassification
+
+
+def normalize_backend(name) -> str:
+    name = (name or DEFAULT_BACKEND).strip().lower()
+    if name not in BACKENDS:
+        print(f"⚠️ Unknown inference backend {name!r}, using {DEFAULT_BACKEND}")
+        return DEFAULT_BACKEND
+    return name
+
+
+def model_device(model):
+    """Device the inputs should be moved to (ONNX sessions always take CPU tensors)."""
+    device = getattr(model, "device", None)
+    if device is not None:
+        return device
+    return next(model.parameters()).device
+
+
+# ----------------- int8 (torch dynamic quantization) -----------------
+def quantize_int8(model):
+    import torch
+    quantized = torch.ao.quantization.quantize_dynamic(model.cpu(), {torch.nn.Linear}, dtype=torch.qint8)
+    return quantized.eval()
+
+
+# ----------------- ONNX Runtime -----------------
+class OnnxSequenceClassifier:
+    """onnxruntime session behind the slice of the HF model API the predictors use."""
+
+    def __init__(self, path, config):
+        import onnxruntime as ort
+        import torch
+
+        self._torch = torch
+        self.path = str(path)
+        self.config = config
+        self.device = torch.device("cpu")
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(self.path, sess_options=opts, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def eval(self):
+        return self
+
+    def __call__(self, **inputs):
+        feed = {k: inputs[k].cpu().numpy().astype("int64") for k in self.input_names if k in inputs}
+        logits = self.session.run(["logits"], feed)[0]
+        return SimpleNamespace(logits=self._torch.from_numpy(logits))
+
+
+def _fingerprint(model) -> str:
+    """Cheap identity of a checkpoint: config + shape and a few values of every tensor."""
+    h = hashlib.sha1(model.config.to_json_string().encode("utf-8"))
+    for name, t in model.state_dict().items():
+        h.update(name.encode("utf-8"))
+        h.update(str(tuple(t.shape)).encode("utf-8"))
+        h.update(t.detach().flatten()[:16].float().cpu().numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def _export_onnx(model, tokenizer, path: Path):
+    import torch
+
+    names = [n for n in tokenizer.model_input_names if n in ("input_ids", "attention_mask", "token_type_ids")]
+    sample = tokenizer(["warm-up review text", "a second, longer warm-up review"], padding=True, return_tensors="pt")
+    names = [n for n in names if n in sample]
+
+    class _Logits(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, *args):
+            return self.inner(**dict(zip(names, args))).logits
+
+    tmp = path.with_suffix(".tmp.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            _Logits(model.eval()), tuple(sample[n] for n in names), str(tmp),
+            input_names=names, output_names=["logits"],
+            dynamic_axes={**{n: {0: "batch", 1: "seq"} for n in names}, "logits": {0: "batch"}},
+            opset_version=ONNX_OPSET, dynamo=False,
+        )
+    os.replace(tmp, path)
+
+
+def to_onnx(model, tokenizer, name: str, quantize: bool = False) -> OnnxSequenceClassifier:
+    """
+    Export `model` (once per checkpoint) and open it with onnxruntime.
+    Files are keyed by a fingerprint of the weights, so a retrained checkpoint is re-exported.
+    """
+    slug = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+    stem = f"{slug}-{_fingerprint(model)}"
+    fp32_path = ONNX_DIR / f"{stem}.onnx"
+    path = ONNX_DIR / f"{stem}.int8.onnx" if quantize else fp32_path
+
+    with _EXPORT_LOCK:
+        if not path.exists():
+            ONNX_DIR.mkdir(parents=True, exist_ok=True)
+            if not fp32_path.exists():
+                print(f"[ONNX] Exporting {name} -> {fp32_path}")
+                _export_onnx(model, tokenizer, fp32_path)
+            if quantize:
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+                tmp = path.with_suffix(".tmp.onnx")
+                quantize_dynamic(str(fp32_path), str(tmp), weight_type=QuantType.QInt8)
+                os.replace(tmp, path)
+            with open(path.with_suffix(".json"), "w") as f:
+                json.dump({"source": name, "opset": ONNX_OPSET, "quantized": quantize}, f)
+    return OnnxSequenceClassifier(path, model.config)
+
+
+# ----------------- Entry point -----------------
+def apply_backend(model, tokenizer, backend: str, name: str):
+    """
+    Convert a loaded fp32 model to `backend`.
+    Returns (model, backend actually in use); falls back to ("torch") on any failure.
+    """
+    backend = normalize_backend(backend)
+    if model is None or backend == "torch":
+        return model, "torch"
+    try:
+        if backend == "int8":
+            converted = quantize_int8(model)
+        else:
+            converted = to_onnx(model, tokenizer, name, quantize=(backend == "onnx-int8"))
+        print(f"[INFERENCE] {name}: using {backend} backend")
+        return converted, backend
+    except ImportError as e:
+        print(f"⚠️ {name}: {backend} backend needs an optional dependency ({e}); using fp32 torch")
+    except Exception as e:
+        print(f"⚠️ {name}: {backend} backend failed, using fp32 torch:", e)
+    return model, "torch"
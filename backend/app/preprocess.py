@@ -1,22 +1,37 @@
+import os
 import re
-import nltk
-from nltk.corpus import stopwords
 import emoji
+from typing import List, NamedTuple, Set
 
-# Download required resources
-nltk.download('stopwords')
-nltk.download('vader_lexicon')  # for sentiment models using VADER later
+# NLTK data ships with the backend (backend/nltk_data), so import never downloads anything.
+# VADER scoring uses the vaderSentiment package, which carries its own lexicon.
+NLTK_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "nltk_data")
+
+def _load_stopwords(lang: str = "english") -> Set[str]:
+    path = os.path.join(NLTK_DATA_DIR, "corpora", "stopwords", lang)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return {w.strip() for w in f if w.strip()}
+    # bundled copy missing: use a locally installed NLTK corpus (LookupError if there is none)
+    from nltk.corpus import stopwords
+    return set(stopwords.words(lang))
 
 # Stopwords set
-stop_words = set(stopwords.words('english'))
+stop_words = _load_stopwords("english")
 
-def clean_text(text: str) -> str:
+# Compiled once; these run for every review
+_URL_MENTION_RE = re.compile(r"http\S+|www\S+|@\w+|#\w+")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+_NEG_WORD_RE = re.compile(r"[a-zA-Z]{2,}")
+NEG_CANDIDATES_PER_REVIEW = 4
+
+def normalize_text(text: str) -> str:
     """
-    Enhanced preprocessing pipeline for noisy/unstructured text.
+    Normalization half of clean_text (stopwords are kept).
     - Lowercase normalization
     - Remove emojis and special symbols
     - Remove non-alphanumeric characters (except spaces)
-    - Remove stopwords
     - Normalize whitespace
     """
     if not text:
@@ -29,15 +44,57 @@ def clean_text(text: str) -> str:
     text = emoji.replace_emoji(text, replace='')
 
     # Remove URLs, mentions, hashtags
-    text = re.sub(r"http\S+|www\S+|@\w+|#\w+", "", text)
+    text = _URL_MENTION_RE.sub("", text)
 
     # Remove special characters and punctuation (keep alphanumeric and space)
-    text = re.sub(r"[^a-z0-9\s]", " ", text)
+    text = _NON_ALNUM_RE.sub(" ", text)
 
     # Remove extra whitespace
-    text = re.sub(r"\s+", " ", text).strip()
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+
+    return text
 
+def clean_text(text: str) -> str:
+    """
+    Enhanced preprocessing pipeline for noisy/unstructured text.
+    - normalize_text (lowercase, emojis, URLs, punctuation, whitespace)
+    - Remove stopwords
+    """
     # Remove stopwords
-    words = [w for w in text.split() if w not in stop_words]
+    words = [w for w in normalize_text(text).split() if w not in stop_words]
 
     return " ".join(words)
+
+
+class PreprocessedReview(NamedTuple):
+    """Per-review text features shared by every analysis stage (computed once)."""
+    text: str                       # raw review
+    lowered: str                    # text.lower()
+    normalized_tokens: List[str]    # normalize_text() tokens, stopwords kept (phrase matching)
+    tokens: List[str]               # clean_text() tokens
+    token_set: Set[str]
+    cleaned: str                    # == clean_text(text)
+    negative_candidates: List[str]  # first non-stopword [a-z]{2,} words of the raw text
+
+def preprocess_review(text: str) -> PreprocessedReview:
+    lowered = text.lower() if text else ""
+    normalized_tokens = normalize_text(text).split()
+    tokens = [w for w in normalized_tokens if w not in stop_words]
+
+    negative_candidates = []
+    for m in _NEG_WORD_RE.finditer(lowered):
+        w = m.group(0)
+        if w not in stop_words:
+            negative_candidates.append(w)
+            if len(negative_candidates) >= NEG_CANDIDATES_PER_REVIEW:
+                break
+
+    return PreprocessedReview(
+        text=text,
+        lowered=lowered,
+        normalized_tokens=normalized_tokens,
+        tokens=tokens,
+        token_set=set(tokens),
+        cleaned=" ".join(tokens),
+        negative_candidates=negative_candidates,
+    )
@@ -0,0 +1,139 @@
+# app/result_cache.py
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable
+
+from app.sqlite_config import BASE_DIR
+
+# lives next to data/config.db
+CACHE_PATH = BASE_DIR / "data" / "result_cache.db"
+CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+# SQLite caps bound parameters per statement; look keys up in slices of this size
+_SQL_CHUNK = 500
+
+
+class ResultCache:
+    """
+    Content-addressed per-review score cache.
+      - key: sha256(model_key + raw review text); model_key identifies the models,
+        ensemble weights and threshold, so changing any of them never serves stale scores
+      - value: JSON blob of the per-review scores (VADER, transformer probs, ensemble label/conf)
+      - bounded by max_entries with LRU eviction on `last_used`
+      - hit/miss counters are stored in the DB, so shard worker processes add up
+    WAL mode lets the API process and the shard pool read/write concurrently.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries: int = 500_000):
+        self.path = str(path)
+        self.max_entries = int(max_entries)
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS review_scores (k TEXT PRIMARY KEY, v TEXT, last_used REAL)""")
+            conn.execute("""CREATE INDEX IF NOT EXISTS review_scores_last_used ON review_scores (last_used)""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS cache_stats (name TEXT PRIMARY KEY, value INTEGER)""")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def key_for(text: str, model_key: str) -> str:
+        return hashlib.sha256((model_key + "\x00" + text).encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, dict]:
+        keys = list(dict.fromkeys(keys))
+        if not keys or self.max_entries <= 0:
+            return {}
+        found = {}
+        with self._lock:
+            conn = self._db()
+            for i in range(0, len(keys), _SQL_CHUNK):
+                part = keys[i:i + _SQL_CHUNK]
+                marks = ",".join("?" * len(part))
+                rows = conn.execute(f"SELECT k, v FROM review_scores WHERE k IN ({marks})", part).fetchall()
+                for k, v in rows:
+                    found[k] = json.loads(v)
+                if rows:
+                    hit_keys = [r[0] for r in rows]
+                    conn.execute(
+                        f"UPDATE review_scores SET last_used=? WHERE k IN ({','.join('?' * len(hit_keys))})",
+                        [time.time(), *hit_keys],
+                    )
+            self._bump(conn, hits=len(found), misses=len(keys) - len(found))
+            conn.commit()
+        return found
+
+    def put_many(self, items: Dict[str, dict]):
+        if not items or self.max_entries <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            conn.executemany(
+                "REPLACE INTO review_scores (k, v, last_used) VALUES (?, ?, ?)",
+                [(k, json.dumps(v), now) for k, v in items.items()],
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn):
+        (count,) = conn.execute("SELECT COUNT(*) FROM review_scores").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM review_scores WHERE k IN "
+                "(SELECT k FROM review_scores ORDER BY last_used ASC LIMIT ?)",
+                (excess,),
+            )
+
+    def _bump(self, conn, hits: int, misses: int):
+        for name, n in (("hits", hits), ("misses", misses)):
+            if n:
+                conn.execute(
+                    "INSERT INTO cache_stats (name, value) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                    (name, n),
+                )
+
+    def stats(self) -> dict:
+        with self._lock:
+            conn = self._db()
+            counters = dict(conn.execute("SELECT name, value FROM cache_stats").fetchall())
+            (entries,) = conn.execute("SELECT COUNT(*) FROM review_scores").fetchone()
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if (hits + misses) else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries,
+        }
+
+    def clear(self):
+        with self._lock:
+            conn = self._db()
+            conn.execute("DELETE FROM review_scores")
+            conn.execute("DELETE FROM cache_stats")
+            conn.commit()
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_result_cache(max_entries: int = 500_000) -> ResultCache:
+    """One cache handle per process (each shard worker opens its own connection)."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ResultCache(CACHE_PATH, max_entries=max_entries)
+    return _CACHE
@@ -1,15 +1,21 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Body
 from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from active_learning.active_learning import router as active_router
 
 from typing import List, Optional
 from itertools import zip_longest
 import csv, io, base64
-from app.analyze import analyze_reviews
+from app.analyze import analyze_review_rows, RESULT_CACHE_MAX_ENTRIES
+from app.result_cache import get_result_cache
+from app.analysis_store import (
+    AnalysisWriter, expand_analysis, load_review_rows, iter_report_chunks, delete_analysis_parts, is_split
+)
+from app.analysis_jobs import submit_analysis_job, get_analysis_job, JobQueueFull
+import tempfile
 from app.db import connect_db
 from datetime import datetime, timezone
-from app.preprocess import clean_text  # import the cleaning function
-from fastapi import Path
+from fastapi import Path, Query
 
 import csv, io, base64
 from bson import ObjectId
@@ -63,182 +69,164 @@ async def upload_reviews(file: UploadFile = File(None), reviews_json: Optional[L
 
     return {"count": len(reviews)}
 
+# ----------------- Streaming Upload Readers -----------------
+def _open_upload_text(binary):
+    """Incremental UTF-8 (BOM-aware) text view over a binary upload file; nothing is read up-front."""
+    binary.seek(0)
+    return io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+
+def _iter_txt_rows(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield line, None, None
+
+def _open_csv_reader(stream):
+    # auto-detect delimiter (comma, tab, semicolon, pipe) from the first 4 KB only
+    sample = stream.read(4096)
+    stream.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",\t;|")
+    except:
+        dialect = csv.excel  # default comma
+
+    reader = csv.DictReader(stream, dialect=dialect)
+
+    # normalize headers
+    fieldnames = [f.strip().lower() for f in (reader.fieldnames or [])]
+
+    # ensure required column exists
+    if "feedbackid" not in fieldnames:
+        raise HTTPException(status_code=400, detail="CSV must contain a 'FeedbackID' column.")
+    return reader
+
+def _iter_csv_rows(reader):
+    """Yield (review, feedback_id, timestamp) per CSV row that has review text."""
+    for row in reader:
+        # try multiple casing variants
+        review_text = (row.get("Review") or row.get("review") or row.get("review_text") or "").strip()
+        fid = (row.get("FeedbackID") or row.get("feedbackid") or row.get("feedback_id") or "").strip()
+        ts = (row.get("Timestamp") or row.get("timestamp") or row.get("Date") or row.get("date") or "").strip()
+
+        # fallback: if DictReader used different casing, try lookup by lowercased keys
+        if not review_text and row:
+            # find the first field that looks like review (case-insensitive)
+            for key in row.keys():
+                if key and key.strip().lower() in ("review", "review_text", "text"):
+                    review_text = (row.get(key) or "").strip()
+                    break
+            for key in row.keys():
+                if key and key.strip().lower() in ("feedbackid", "feedback_id"):
+                    fid = (row.get(key) or "").strip()
+                    break
+            for key in row.keys():
+                if key and key.strip().lower() in ("timestamp", "date", "time"):
+                    ts = (row.get(key) or "").strip()
+                    break
+
+        if review_text:
+            yield review_text, fid, (ts or None)
+
 # ----------------- Analyze Reviews -----------------
 @router.post("/analyze")
 async def analyze_reviews_endpoint(
     file: UploadFile = File(None),
     reviews_json: Optional[List[str]] = Body(None)
     ):
-    reviews, timestamps, feedback_ids = [], [], None
-
-
-    # Extract reviews
+    # Build a lazy row source: (review, feedback_id, timestamp)
     if reviews_json:
-        reviews = [r.strip() for r in reviews_json if r.strip()]
+        rows = ((r.strip(), None, None) for r in reviews_json if r.strip())
     elif file:
-        content = await file.read()
         filename = file.filename.lower()
-        text = content.decode("utf-8").lstrip("\ufeff")
-
         if filename.endswith(".txt"):
-            reviews = [line.strip() for line in text.splitlines() if line.strip()]
+            rows = _iter_txt_rows(_open_upload_text(file.file))
         elif filename.endswith(".csv"):
-            # auto-detect delimiter (comma, tab, semicolon, pipe)
-            sample = text[:4096]
-            try:
-                dialect = csv.Sniffer().sniff(sample, delimiters=",\t;|")
-            except:
-                dialect = csv.excel  # default comma
-
-            reader = csv.DictReader(io.StringIO(text), dialect=dialect)
-
-            # normalize headers
-            fieldnames = [f.strip().lower() for f in (reader.fieldnames or [])]
-
-            # ensure required column exists
-            if "feedbackid" not in fieldnames:
-                raise HTTPException(status_code=400, detail="CSV must contain a 'FeedbackID' column.")
-
-            
-
-            feedback_ids = []
-            # normalize header keys to lowercase for safe access
-            lower_fieldnames = [f.lower() for f in (reader.fieldnames or [])]
-
-            for row in reader:
-                # try multiple casing variants
-                review_text = (row.get("Review") or row.get("review") or row.get("review_text") or "").strip()
-                fid = (row.get("FeedbackID") or row.get("feedbackid") or row.get("feedback_id") or "").strip()
-                ts = (row.get("Timestamp") or row.get("timestamp") or row.get("Date") or row.get("date") or "").strip()
-
-                # fallback: if DictReader used different casing, try lookup by lowercased keys
-                if not review_text and row:
-                    # find the first field that looks like review (case-insensitive)
-                    for key in row.keys():
-                        if key and key.strip().lower() in ("review", "review_text", "text"):
-                            review_text = (row.get(key) or "").strip()
-                            break
-                    for key in row.keys():
-                        if key and key.strip().lower() in ("feedbackid", "feedback_id"):
-                            fid = (row.get(key) or "").strip()
-                            break
-                    for key in row.keys():
-                        if key and key.strip().lower() in ("timestamp", "date", "time"):
-                            ts = (row.get(key) or "").strip()
-                            break
-
-                if review_text:
-                    reviews.append(review_text)
-                    feedback_ids.append(fid)
-                    if ts:
-                        timestamps.append(ts)
-
-
+            rows = _iter_csv_rows(_open_csv_reader(_open_upload_text(file.file)))
         else:
             raise HTTPException(status_code=400, detail="Unsupported file type. Use .txt or .csv")
     else:
         raise HTTPException(status_code=400, detail="No input provided. Upload file or JSON array.")
-    
 
-    # ---------- Clean and preprocess all extracted reviews ----------
-    cleaned_reviews = [clean_text(r) for r in reviews if r.strip()]
+    # ---------- Per-review rows are written in batches while the analyzer streams ----------
+    writer = AnalysisWriter(CURRENT_MODEL)
 
-
-    # Analyze reviews
+    # Analyze reviews (off the event loop; the upload is parsed as it is scored)
     try:
-        result = analyze_reviews(
-            reviews,
+        result = await run_in_threadpool(
+            analyze_review_rows,
+            rows,
             model=CURRENT_MODEL,
-            timestamps=timestamps or None,
-            cleaned_reviews=cleaned_reviews,
-            feedback_ids=feedback_ids
-                                 )
+            row_sink=writer.add_rows,
+        )
     except ValueError as e:
+        await run_in_threadpool(writer.abort)
         raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        await run_in_threadpool(writer.abort)
+        raise
 
-    # Convert report to base64
-    report_csv_base64 = base64.b64encode(result["report_download"].encode("utf-8")).decode("utf-8")
-    result["report_download"] = report_csv_base64
-
-    # Save to MongoDB (upsert to keep only one record per submit)
-    db = connect_db()
-    doc = {
-        "model": CURRENT_MODEL,
-        "review_count": len(reviews),
-        "result": result,
-        "created_at": datetime.now(timezone.utc),
-    }
-
-    # Use a unique key to avoid duplicates (e.g., "Visual 1" always updates)
-    unique_name = f"Visual_{int(datetime.now(timezone.utc).timestamp())}"
-    res = db.analysis.update_one(
-    {"name": unique_name},  # keep unique name
-    {
-        "$set": {
-            "model": CURRENT_MODEL,
-            "review_count": len(reviews),
-            "result": result,  # report_download stays inside result only
-            "created_at": datetime.now(timezone.utc),
-        },
-        "$setOnInsert": {"name": unique_name}
-    },
-    upsert=True
-    )
-
-    # ---------- Store cleaned feedbacks in a separate collection ----------
-        
-    feed_name = unique_name.replace("Visual_", "Feed_")
-
-    # Build cleaned pairs with feedback_id fallback if missing
-    cleaned_pairs = []
-    for idx, txt in enumerate(cleaned_reviews):
-        if feedback_ids and idx < len(feedback_ids) and feedback_ids[idx]:
-            fid = feedback_ids[idx]
-        else:
-            fid = f"F{idx+1:03d}"  # fallback id if CSV didn't provide one
-        cleaned_pairs.append({"feedback_id": fid, "cleaned_text": txt})
-
-    clean_doc = {
-        "name": feed_name,
-        "original_count": len(reviews),
-        "cleaned_count": len(cleaned_pairs),
-        "cleaned_reviews": cleaned_pairs,
-        "created_at": datetime.now(timezone.utc),
-    }
-
-    db.cleaned_feedbacks.update_one(
-        {"name": feed_name},
-        {
-            "$setOnInsert": {"name": feed_name},
-            "$set": {
-                "original_count": len(reviews),
-                "cleaned_count": len(cleaned_pairs),
-                "cleaned_reviews": cleaned_pairs,
-                "created_at": datetime.now(timezone.utc),
-            }
-        },
-        upsert=True
-    )
+    return await run_in_threadpool(writer.save, result)
 
+# ----------------- Background Analysis Jobs -----------------
+@router.post("/analyze/jobs")
+async def submit_analysis_job_endpoint(
+    file: UploadFile = File(None),
+    reviews_json: Optional[List[str]] = Body(None)
+    ):
+    """Queue an analysis and return its job id at once; poll /analyze/jobs/{job_id} for progress."""
+    if reviews_json:
+        reviews = [r.strip() for r in reviews_json if r.strip()]
+        rows = ((r, None, None) for r in reviews)
+        submit_kwargs = {"total_rows": len(reviews)}
+    elif file:
+        filename = file.filename.lower()
+        if not filename.endswith((".txt", ".csv")):
+            raise HTTPException(status_code=400, detail="Unsupported file type. Use .txt or .csv")
 
-    # Get the document _id
-    if res.upserted_id:
-     _id = res.upserted_id
+        # the request's upload is closed when this handler returns; keep a private copy for the job
+        tmp = tempfile.TemporaryFile()
+        while True:
+            chunk = await file.read(1 << 20)
+            if not chunk:
+                break
+            tmp.write(chunk)
+        total_bytes = tmp.tell()
+        stream = _open_upload_text(tmp)
+        try:
+            if filename.endswith(".csv"):
+                rows = _iter_csv_rows(_open_csv_reader(stream))
+            else:
+                rows = _iter_txt_rows(stream)
+        except HTTPException:
+            stream.close()
+            raise
+        submit_kwargs = {"source": tmp, "total_bytes": total_bytes, "cleanup": stream.close}
     else:
-     _id = db.analysis.find_one({"name": unique_name})["_id"]
-    visual_id = str(_id)
-
-    response_doc = {
-    "visualId": visual_id,
-    "_id": visual_id,
-    "name": unique_name,
-    "model": doc["model"],
-    "review_count": doc["review_count"],
-    "result": doc["result"],
-    "created_at": doc["created_at"].isoformat()
-}
+        raise HTTPException(status_code=400, detail="No input provided. Upload file or JSON array.")
+
+    try:
+        job_id = submit_analysis_job(rows, CURRENT_MODEL, **submit_kwargs)
+    except JobQueueFull as e:
+        if "cleanup" in submit_kwargs:
+            submit_kwargs["cleanup"]()
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.get("/analyze/jobs/{job_id}")
+def analysis_job_status(job_id: str):
+    """Rows processed, throughput, progress/ETA and, once done, the stored Visual_* id and name."""
+    job = get_analysis_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
+
+# ----------------- Result Cache -----------------
+@router.get("/cache/stats")
+def result_cache_stats():
+    """Hit/miss counters and size of the per-review score cache."""
+    return get_result_cache(RESULT_CACHE_MAX_ENTRIES).stats()
 
-    return response_doc
 # ----------------- Download CSV Report -----------------
 @router.post("/report/download")
 async def download_report(report_base64: str = Body(..., embed=True)):
@@ -258,30 +246,114 @@ async def download_report(report_base64: str = Body(..., embed=True)):
 # ----------------- Visuals CRUD -----------------
 
 
+# summary fields returned by the listing; full detail stays on /visuals/{id}
+VISUAL_LIST_FIELDS = {
+    "name": 1,
+    "model": 1,
+    "review_count": 1,
+    "created_at": 1,
+    "result.sentiment_distribution": 1,
+    "result.impact_score": 1,
+}
+
+
+def _encode_visual_cursor(doc) -> str:
+    raw = f"{doc['created_at'].isoformat()}|{doc['_id']}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_visual_cursor(cursor: str):
+    try:
+        created_at, oid = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(created_at), ObjectId(oid)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/visuals")
-def get_all_visuals():
-    """Return all visuals sorted by created_at DESC."""
+def get_all_visuals(limit: int = Query(50, ge=1, le=200), cursor: Optional[str] = None):
+    """
+    Visual summaries, newest first, one page at a time (keyset on created_at/_id).
+    Pass the returned `next_cursor` back as `cursor` for the next page; it is null on the last page.
+    """
     db = connect_db()
-    visuals = list(db.analysis.find().sort("created_at", -1))
+    query = {}
+    if cursor:
+        created_at, oid = _decode_visual_cursor(cursor)
+        query = {"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": oid}},
+        ]}
+
+    # fetch one extra row to know whether another page exists
+    docs = list(
+        db.analysis.find(query, VISUAL_LIST_FIELDS)
+        .sort([("created_at", -1), ("_id", -1)])
+        .limit(limit + 1)
+    )
+    next_cursor = _encode_visual_cursor(docs[limit - 1]) if len(docs) > limit else None
+    visuals = docs[:limit]
     for v in visuals:
         v["_id"] = str(v["_id"])
-    return visuals
+    return {"visuals": visuals, "next_cursor": next_cursor}
+
+
+def _visual_projection(fields: Optional[str]):
+    """Mongo projection for `fields=name,result.top_issues,...`; None means the whole document."""
+    if not fields:
+        return None
+    wanted = {f.strip() for f in fields.split(",") if f.strip()}
+    # a parent path already covers its children (and Mongo rejects overlapping paths)
+    wanted = {f for f in wanted if not any(f.startswith(p + ".") for p in wanted)}
+    projection = {f: 1 for f in wanted}
+    projection["report_file_id"] = 1
+    return projection
 
 
 @router.get("/visuals/{id}")
-def get_visual_by_id(id: str = Path(...)):
-    """Return a single visual by ID."""
+def get_visual_by_id(id: str = Path(...), fields: Optional[str] = None):
+    """
+    Return a single visual by ID (per-review rows and report reassembled).
+    `fields` (comma separated, dotted paths allowed) limits the response, e.g.
+    `fields=name,result.top_issues` skips loading the per-review rows and report.
+    """
     db = connect_db()
+    projection = _visual_projection(fields)
     try:
-        doc = db.analysis.find_one({"_id": ObjectId(id)})
+        doc = db.analysis.find_one({"_id": ObjectId(id)}, projection)
         if not doc:
             raise HTTPException(status_code=404, detail="Visual not found")
+        doc = expand_analysis(db, doc, fields=list(projection) if projection else None)
         doc["_id"] = str(doc["_id"])
         return doc
+    except HTTPException:
+        raise
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid visual ID")
 
 
+@router.get("/visuals/{id}/reviews")
+def get_visual_reviews(id: str, skip: int = 0, limit: int = 100):
+    """Page through the per-review summary of a visual."""
+    db = connect_db()
+    try:
+        oid = ObjectId(id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid visual ID")
+    limit = max(1, min(limit, 1000))
+    skip = max(0, skip)
+
+    doc = db.analysis.find_one({"_id": oid}, {"review_count": 1, "report_file_id": 1,
+                                             "result.per_review_summary": 1})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Visual not found")
+    if is_split(doc):
+        reviews = load_review_rows(db, oid, skip=skip, limit=limit)
+    else:
+        reviews = doc.get("result", {}).get("per_review_summary", [])[skip:skip + limit]
+    return {"total": doc.get("review_count", 0), "skip": skip, "limit": limit, "reviews": reviews}
+
+
 @router.post("/visuals/{id}/rename")
 def rename_visual(id: str, new_name: str = Body(..., embed=True)):
     """Rename a visual document."""
@@ -303,28 +375,31 @@ def delete_visual(id: str):
     """Delete a visual document."""
     db = connect_db()
     try:
-        res = db.analysis.delete_one({"_id": ObjectId(id)})
-        if res.deleted_count == 0:
+        doc = db.analysis.find_one_and_delete({"_id": ObjectId(id)}, {"report_file_id": 1})
+        if not doc:
             raise HTTPException(status_code=404, detail="Visual not found")
+        delete_analysis_parts(db, doc)
         return {"message": "Visual deleted successfully"}
+    except HTTPException:
+        raise
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid visual ID")
 
 
 @router.get("/visuals/{id}/download")
 def download_visual_report(id: str):
-    """Return the stored base64 report for a visual."""
+    """Stream the stored CSV report for a visual."""
     db = connect_db()
     try:
-        doc = db.analysis.find_one({"_id": ObjectId(id)})
-        if not doc or "report_download" not in doc:
-            raise HTTPException(status_code=404, detail="Report not found")
-
-        csv_bytes = base64.b64decode(doc["report_download"])
-        return StreamingResponse(
-            io.BytesIO(csv_bytes),
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=visual_report.csv"}
-        )
+        doc = db.analysis.find_one({"_id": ObjectId(id)},
+                                   {"report_file_id": 1, "report_download": 1, "result.report_download": 1})
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid visual ID")
+    if not doc or not (is_split(doc) or doc.get("report_download") or doc.get("result", {}).get("report_download")):
+        raise HTTPException(status_code=404, detail="Report not found")
+
+    return StreamingResponse(
+        iter_report_chunks(db, doc),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=visual_report.csv"}
+    )
@@ -0,0 +1,145 @@
+# scripts/benchmark_inference_backends.py
+"""
+Accuracy parity + latency / throughput of the CPU inference backends against fp32 torch.
+
+    python -m app.scripts.benchmark_inference_backends                      # submodels/transformer
+    python -m app.scripts.benchmark_inference_backends --model distil --model roberta
+    python -m app.scripts.benchmark_inference_backends --model /path/to/checkpoint --backends int8,onnx
+    python -m app.scripts.benchmark_inference_backends --corpus reviews.txt  # one review per line
+
+Every backend scores the same fixed corpus. Reported per backend:
+  - label agreement with fp32 and max |prob diff|
+  - single-review latency (p50 / p95) and batched throughput (reviews/s)
+Exits with status 1 when a backend's label agreement drops below --min-agreement.
+"""
+import argparse
+import copy
+import os
+import sys
+import time
+
+import numpy as np
+
+from app.inference_backend import BACKENDS, apply_backend
+
+CORPUS = [
+    "The product quality is great and delivery was fast!",
+    "Terrible customer support, the agent never replied.",
+    "App crashes on startup; very slow and laggy UI :(",
+    "Price is ok, value for money. Would buy again.",
+    "Out of stock again... works with my phone though",
+    "Refund took 3 weeks, never ordering from here again",
+    "Absolutely love it. Battery lasts two days and the screen is gorgeous.",
+    "It's fine I guess. Nothing special, nothing terrible.",
+    "Packaging was damaged but the item inside was intact.",
+    "Worst purchase of the year, broke after one use.",
+    "Customer service replaced it within a day, very impressed.",
+    "The size chart is wrong, had to return it twice.",
+    "Good sound, weak bass, comfortable for long sessions.",
+    "Delivery guy left it in the rain. Box soaked, charger dead.",
+    "Five stars! Exactly as described and arrived early.",
+    "Not worth the price when cheaper brands do the same thing.",
+    "The update fixed the login bug but now notifications are delayed by hours and the sync "
+    "between my phone and laptop randomly stops, which makes the whole subscription pointless.",
+    "ok",
+]
+
+_MODELS = {
+    "transformer": lambda: __import__("active_learning.model_manager", fromlist=["_TRANS_ROOT"])._TRANS_ROOT,
+    "distil": lambda: __import__("app.analyze", fromlist=["DISTIL_MODEL_NAME"]).DISTIL_MODEL_NAME,
+    "roberta": lambda: __import__("app.analyze", fromlist=["ROBERTA_MODEL_NAME"]).ROBERTA_MODEL_NAME,
+}
+
+
+def _score(model, tokenizer, texts, batch_size):
+    import torch
+
+    out = []
+    for start in range(0, len(texts), batch_size):
+        enc = tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                        max_length=256, return_tensors="pt")
+        with torch.no_grad():
+            out.append(torch.softmax(model(**enc).logits, dim=-1).numpy())
+    return np.concatenate(out)
+
+
+def _bench(model, tokenizer, texts, batch_size, repeats):
+    _score(model, tokenizer, texts[:batch_size], batch_size)  # warm-up (ORT graph init, quantized kernels)
+
+    single = []
+    for _ in range(repeats):
+        for t in texts:
+            t0 = time.perf_counter()
+            _score(model, tokenizer, [t], 1)
+            single.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        _score(model, tokenizer, texts, batch_size)
+    throughput = repeats * len(texts) / (time.perf_counter() - t0)
+    return float(np.percentile(single, 50)), float(np.percentile(single, 95)), throughput
+
+
+def _run_model(source, backends, texts, args) -> int:
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    print(f"\n== {source}")
+    tokenizer = AutoTokenizer.from_pretrained(source)
+    fp32 = AutoModelForSequenceClassification.from_pretrained(source).eval()
+    reference = _score(fp32, tokenizer, texts, args.batch_size)
+    ref_labels = reference.argmax(axis=1)
+
+    failures = 0
+    print(f"{'backend':<10} {'agree':>7} {'max|dp|':>9} {'p50 ms':>8} {'p95 ms':>8} {'rev/s':>8}")
+    for backend in ["torch"] + [b for b in backends if b != "torch"]:
+        model, used = apply_backend(copy.deepcopy(fp32), tokenizer, backend, source)
+        if used != backend:
+            print(f"{backend:<10} skipped (backend unavailable)")
+            continue
+        probs = _score(model, tokenizer, texts, args.batch_size)
+        agree = float((probs.argmax(axis=1) == ref_labels).mean())
+        max_diff = float(np.abs(probs - reference).max())
+        p50, p95, tput = _bench(model, tokenizer, texts, args.batch_size, args.repeats)
+        ok = agree >= args.min_agreement
+        failures += not ok
+        print(f"{backend:<10} {agree:>7.2%} {max_diff:>9.4f} {p50:>8.2f} {p95:>8.2f} {tput:>8.1f}"
+              f"{'' if ok else '  <- below --min-agreement'}")
+    return failures
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", action="append",
+                        help="transformer | distil | roberta | checkpoint path / hub name (repeatable)")
+    parser.add_argument("--backends", default=",".join(b for b in BACKENDS if b != "torch"))
+    parser.add_argument("--corpus", help="text file, one review per line (default: built-in corpus)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--min-agreement", type=float, default=0.98)
+    args = parser.parse_args(argv)
+
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = list(CORPUS)
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+
+    failures = 0
+    for name in args.model or ["transformer"]:
+        source = _MODELS[name]() if name in _MODELS else name
+        if not os.path.isdir(source) and name == "transformer":
+            print(f"⚠️ {source} not found")
+            failures += 1
+            continue
+        failures += _run_model(source, backends, texts, args)
+
+    if failures:
+        print(f"\n❌ {failures} backend(s) below {args.min_agreement:.0%} label agreement")
+        return 1
+    print(f"\n✅ All backends within {args.min_agreement:.0%} label agreement of fp32")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,117 @@
+# scripts/check_compact_vectorizer.py
+"""
+Round-trip check of the compact TF-IDF vectorizer format against vectorizer.joblib.
+
+    python -m app.scripts.check_compact_vectorizer            # every submodels/tlrl/v*/vectorizer.joblib
+    python -m app.scripts.check_compact_vectorizer --write    # also backfill vectorizer_compact/ for them
+    python -m app.scripts.check_compact_vectorizer --synthetic  # fit throwaway vectorizers (no artifacts needed)
+
+For each vectorizer the compact form is saved, loaded back (mmap) and compared with
+sklearn's transform() on a fixed corpus plus the vocabulary itself; load time and
+vocabulary memory are reported. Exits with status 1 on any mismatch.
+"""
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from active_learning.model_manager import SUBMODELS_ROOT, list_versions
+from active_learning.compact_vectorizer import CompactTfidfVectorizer, COMPACT_DIRNAME
+
+CORPUS = [
+    "The product quality is great and delivery was fast!",
+    "Terrible customer support, the agent never replied.",
+    "App crashes on startup; very slow and laggy UI :(",
+    "Price is ok, value for money. Would buy again.",
+    "Out of stock again... works with my phone though",
+    "Refund took 3 weeks — never ordering from here again",
+    "Ünïcödé téxt, emojis 🎉 and MIXED case Words",
+    "",
+    "a " * 50,
+]
+
+_SYNTHETIC = [
+    {},
+    {"ngram_range": (1, 2), "sublinear_tf": True},
+    {"stop_words": "english", "norm": "l1", "min_df": 2},
+    {"binary": True, "use_idf": False},
+    {"analyzer": "char_wb", "ngram_range": (2, 4)},
+]
+
+
+def _vocab_bytes(vec) -> int:
+    """Approximate heap held by the pickled vocabulary dict once loaded."""
+    vocab = vec.vocabulary_
+    return sys.getsizeof(vocab) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in vocab.items())
+
+
+def _check(name, vec, write_to=None) -> bool:
+    tmp = tempfile.mkdtemp()
+    try:
+        CompactTfidfVectorizer.from_sklearn(vec).save(tmp)
+
+        t0 = time.perf_counter()
+        pickle.loads(pickle.dumps(vec.vocabulary_))
+        dict_ms = (time.perf_counter() - t0) * 1000
+        t0 = time.perf_counter()
+        compact = CompactTfidfVectorizer.load(tmp)
+        compact_ms = (time.perf_counter() - t0) * 1000
+
+        docs = CORPUS + [" ".join(list(vec.vocabulary_)[i:i + 25]) for i in range(0, min(len(vec.vocabulary_), 5000), 25)]
+        expected = vec.transform(docs)
+        got = compact.transform(docs)
+        same_pattern = (expected.indptr == got.indptr).all() and (expected.indices == got.indices).all()
+        max_diff = float(np.abs(expected.data - got.data).max()) if expected.nnz else 0.0
+        ok = bool(same_pattern and expected.shape == got.shape and max_diff <= 1e-12)
+
+        compact_bytes = compact.terms.nbytes + compact.columns.nbytes
+        print(f"{'OK  ' if ok else 'FAIL'} {name:<28} terms={len(compact):<7} max|diff|={max_diff:.1e} "
+              f"vocab load {dict_ms:.1f}ms -> {compact_ms:.1f}ms, "
+              f"vocab memory {_vocab_bytes(vec) / 1024:.0f}KiB -> {compact_bytes / 1024:.0f}KiB")
+
+        if ok and write_to:
+            dest = os.path.join(write_to, COMPACT_DIRNAME)
+            shutil.rmtree(dest, ignore_errors=True)
+            shutil.copytree(tmp, dest)
+        return ok
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main(argv):
+    failures = checked = 0
+    if "--synthetic" in argv:
+        train = CORPUS * 3 + [f"review {i} about delivery speed and support quality {i % 7}" for i in range(200)]
+        for params in _SYNTHETIC:
+            vec = TfidfVectorizer(**params).fit(train)
+            failures += not _check(f"synthetic {params}"[:28], vec)
+            checked += 1
+    else:
+        for version in list_versions():
+            vpath = os.path.join(SUBMODELS_ROOT, version)
+            try:
+                vec = joblib.load(os.path.join(vpath, "vectorizer.joblib"))
+            except Exception as e:
+                print(f"SKIP {version:<28} vectorizer.joblib not loadable ({e.__class__.__name__})")
+                continue
+            failures += not _check(version, vec, write_to=vpath if "--write" in argv else None)
+            checked += 1
+
+    if not checked:
+        print("⚠️ No vectorizers checked")
+        return 1
+    if failures:
+        print(f"❌ {failures} of {checked} vectorizers differ from sklearn")
+        return 1
+    print(f"✅ {checked} compact vectorizers match sklearn")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,77 @@
+# scripts/check_import_time.py
+"""
+Startup-time budget for the API process, measured with `python -X importtime -c "import main"`.
+
+    python -m app.scripts.check_import_time                  # default budget
+    python -m app.scripts.check_import_time --budget-ms 1500 --runs 5
+
+Fails (exit status 1) when
+  - the cumulative import time of `main` (best of --runs fresh interpreters) exceeds the budget, or
+  - any deferred heavy package (torch, transformers, sklearn, ...) is imported by `import main`.
+Prints the slowest imports so a regression points at its cause.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_BUDGET_MS = 2000
+
+# must only be imported on first use (model loading, retraining, exports)
+DEFERRED = ("torch", "transformers", "safetensors", "sklearn", "scipy", "pandas", "nltk", "onnxruntime", "pyarrow")
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def _measure():
+    """One fresh interpreter: {module: (self_us, cumulative_us, depth)}."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                          cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        print(proc.stderr[-2000:])
+        raise SystemExit("❌ `import main` failed")
+    modules = {}
+    for line in proc.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            modules[m.group(4)] = (int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2)
+    return modules
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    runs = [_measure() for _ in range(max(1, args.runs))]
+    best = min(runs, key=lambda mods: mods["main"][1])
+    total_ms = best["main"][1] / 1000
+
+    print(f"`import main`: {total_ms:.0f}ms (best of {len(runs)}; budget {args.budget_ms:.0f}ms)")
+    print("slowest imports (cumulative):")
+    shallow = [(name, cum) for name, (_, cum, depth) in best.items() if depth <= 2 and name != "main"]
+    for name, cum in sorted(shallow, key=lambda x: -x[1])[:args.top]:
+        print(f"  {cum / 1000:8.1f}ms  {name}")
+
+    failures = 0
+    heavy = sorted({name.split(".")[0] for name in best} & set(DEFERRED))
+    if heavy:
+        print(f"❌ deferred packages imported at startup: {', '.join(heavy)}")
+        failures += 1
+    if total_ms > args.budget_ms:
+        print(f"❌ import time {total_ms:.0f}ms exceeds the {args.budget_ms:.0f}ms budget")
+        failures += 1
+    if failures:
+        return 1
+    print("✅ startup import within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
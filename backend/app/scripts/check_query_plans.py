@@ -0,0 +1,149 @@
+# scripts/check_query_plans.py
+"""
+Verify that every hot API query is served by an index from app.db.INDEXES.
+
+    python -m app.scripts.check_query_plans                        # against MONGODB_URI (uses explain())
+    python -m app.scripts.check_query_plans --mongodb-uri URI      # against URI (uses explain())
+    python -m app.scripts.check_query_plans --mongomock            # in-memory, coarse static lint
+
+Indexes are bootstrapped first (ensure_indexes), then each query below is checked;
+against a real mongod the script exits with status 1 if any of them would fall back to
+a collection scan.
+
+--mongomock has no query planner: it only looks at whether some index's first key is
+filtered on or leads the sort (and whether a partial index's filter is repeated in the
+query). Sort direction, the order of the remaining keys and how the planner would rank
+the candidates are not checked, so its "OK" is a hint, not a verdict; it only fails
+when no index could possibly apply.
+Plain listings (e.g. `db.datasets.find()` with no filter or sort) are left out on purpose.
+"""
+import os
+import sys
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+from app.db import connect_db, ensure_indexes  # noqa: E402
+
+_NOW = datetime.now(timezone.utc)
+
+# (description, collection, filter, sort)
+HOT_QUERIES = [
+    ("visuals listing, first page", "analysis", {}, [("created_at", -1), ("_id", -1)]),
+    ("visuals listing, next page", "analysis",
+     {"$or": [{"created_at": {"$lt": _NOW}}, {"created_at": _NOW, "_id": {"$lt": ObjectId()}}]},
+     [("created_at", -1), ("_id", -1)]),
+    ("analysis by name", "analysis", {"name": "Visual_0"}, None),
+    ("per-review rows of a visual", "analysis_reviews", {"analysis_id": ObjectId()}, [("id", 1)]),
+    ("cleaned feedback upsert", "cleaned_feedbacks", {"name": "Feed_0"}, None),
+    ("uncertain samples", "feedbacks", {"confidence": {"$lt": 0.5}}, [("saved_at", -1)]),
+    ("prediction history", "feedbacks", {}, [("saved_at", -1)]),
+    ("corrected feedback for retraining", "feedbacks",
+     {"saved_at": {"$lte": _NOW}, "corrected": {"$ne": None}}, [("saved_at", -1)]),
+    ("corrected feedback since watermark", "feedbacks",
+     {"saved_at": {"$gt": _NOW, "$lte": _NOW}, "corrected": {"$ne": None}}, [("saved_at", -1)]),
+    ("latest metrics", "metrics_history", {}, [("created_at", -1)]),
+    ("latest model / model history", "models", {}, [("created_at", -1)]),
+    ("model by version", "models", {"version": "v1"}, None),
+    ("retrain job status", "retrain_jobs", {"job_id": "job_0"}, None),
+    ("retrain scheduler claim", "retrain_jobs",
+     {"$or": [{"status": "queued"}, {"status": "running", "lease_until": {"$lt": _NOW}}], "attempts": {"$lt": 3}},
+     [("created_at", 1)]),
+    ("retrain queue depth", "retrain_jobs", {"status": "queued"}, None),
+    ("analysis job status", "analysis_jobs", {"job_id": "analysis_0"}, None),
+    ("analysis jobs pending", "analysis_jobs",
+     {"status": {"$in": ["queued", "running"]}, "lease_until": {"$gte": _NOW}}, None),
+    ("admin login by username", "admins", {"username": "admin"}, None),
+    ("admin login by id", "admins", {"admin_id": "A1"}, None),
+    ("user growth counts", "users", {"createdAt": {"$lte": _NOW.isoformat()}}, None),
+    ("model growth", "model_growth", {}, [("version", 1)]),
+    ("user growth", "user_growth", {}, [("date", 1)]),
+    ("model history", "model_history", {}, [("createdAt", -1)]),
+    ("admin logs", "logs", {}, [("timestamp", -1)]),
+]
+
+
+# ----------------- explain() (real mongod) -----------------
+def _stages(plan):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for v in plan.values():
+            yield from _stages(v)
+    elif isinstance(plan, list):
+        for v in plan:
+            yield from _stages(v)
+
+
+def _explain_stages(db, coll, flt, sort):
+    cursor = db[coll].find(flt)
+    if sort:
+        cursor = cursor.sort(sort)
+    plan = cursor.limit(50).explain()
+    return set(_stages(plan.get("queryPlanner", {}).get("winningPlan", {})))
+
+
+# ----------------- static coverage (mongomock has no planner) -----------------
+def _partial_matches(flt, partial):
+    return all(flt.get(k) == v for k, v in partial.items())
+
+
+def _served(indexes, flt, sort):
+    if "$or" in flt:
+        return all(_served(indexes, branch, sort) for branch in flt["$or"])
+    filter_fields = {k for k in flt if not k.startswith("$")}
+    lead_sort = sort[0][0] if sort else None
+    for info in indexes.values():
+        partial = info.get("partialFilterExpression")
+        if partial and not _partial_matches(flt, partial):
+            continue
+        first = info["key"][0][0]
+        if first in filter_fields or first == lead_sort:
+            return True
+    return False
+
+
+def _static_stages(db, coll, flt, sort):
+    # "?": a candidate index exists, whether the planner would use it is not known here
+    return {"IXSCAN?"} if _served(db[coll].index_information(), flt, sort) else {"COLLSCAN"}
+
+
+def main(argv):
+    static = "--mongomock" in argv
+    if static:
+        import mongomock
+        db = mongomock.MongoClient()["Infosys"]
+        check = _static_stages
+        print("⚠️ --mongomock: coarse static lint (index prefix only, no planner); "
+              "run with --mongodb-uri for the real verdict")
+    else:
+        if "--mongodb-uri" in argv:
+            import app.db
+            app.db.MONGO_URI = argv[argv.index("--mongodb-uri") + 1]
+        db = connect_db()
+        check = _explain_stages
+
+    ensure_indexes(db)
+
+    failures = 0
+    for desc, coll, flt, sort in HOT_QUERIES:
+        stages = check(db, coll, flt, sort)
+        ok = "COLLSCAN" not in stages
+        failures += not ok
+        label = ("OK? " if static else "OK  ") if ok else "FAIL"
+        print(f"{label} {coll:<18} {desc:<36} {','.join(sorted(stages))}")
+
+    if failures:
+        print(f"❌ {failures} hot quer{'y falls' if failures == 1 else 'ies fall'} back to a collection scan")
+        return 1
+    if static:
+        print("✅ Every hot query has a candidate index (static lint; not verified by explain())")
+        return 0
+    print("✅ All hot queries are index-backed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
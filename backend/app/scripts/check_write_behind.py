@@ -0,0 +1,86 @@
+# scripts/check_write_behind.py
+"""
+Check that one doc which can never be written does not hold up the write-behind buffer.
+
+    python -m app.scripts.check_write_behind
+
+Runs against an in-memory mongomock database. Three scenarios queue good docs
+around a bad one and close the buffer. In each scenario every good doc must be
+written, the bad doc dead-lettered, and nothing left unwritten:
+  - a doc the client cannot encode (InvalidDocument)
+  - a doc the server rejects (a document validation write error)
+  - a transient outage first (retried), then the same validation error
+Exits with status 1 on any failure.
+"""
+import os
+import sys
+
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+import mongomock  # noqa: E402
+from pymongo.errors import AutoReconnect, BulkWriteError  # noqa: E402
+
+import active_learning.write_behind as wb  # noqa: E402
+
+_VALIDATION_FAILED = 121
+_GOOD = 300
+
+
+class _Collection:
+    """mongomock collection that rejects docs marked `invalid` and can fail `outages` times first."""
+
+    def __init__(self, coll, outages=0):
+        self._coll, self.outages = coll, outages
+
+    def insert_many(self, docs, ordered=False):
+        if self.outages:
+            self.outages -= 1
+            raise AutoReconnect("connection reset")
+        errors = []
+        for i, doc in enumerate(docs):
+            if doc.get("invalid"):
+                errors.append({"index": i, "code": _VALIDATION_FAILED, "errmsg": "Document failed validation"})
+                continue
+            try:
+                self._coll.insert_one(doc)
+            except mongomock.DuplicateKeyError:
+                errors.append({"index": i, "code": wb._DUPLICATE_KEY, "errmsg": "duplicate key"})
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "writeConcernErrors": [], "nInserted": len(docs) - len(errors)})
+
+
+def _run(name, bad_doc, wrap=None) -> bool:
+    db = mongomock.MongoClient()["Infosys"]
+    target = wrap(db.feedbacks) if wrap else db.feedbacks
+    wb.get_db = lambda: {"feedbacks": target}
+
+    buf = wb.WriteBehindBuffer("feedbacks", batch=50, interval_ms=20, max_pending=100)
+    for i in range(_GOOD):
+        buf.add({"i": i})
+        if i == 10:
+            buf.add(bad_doc)
+    unwritten = buf.close(timeout=20.0)
+    stats = buf.stats()
+
+    written = db.feedbacks.count_documents({"i": {"$exists": True}})
+    ok = written == _GOOD and stats["dead_lettered"] == 1 and not unwritten and len(buf.dead_letters()) == 1
+    print(f"{'OK  ' if ok else 'FAIL'} {name:<28} written={written}/{_GOOD} dead_lettered={stats['dead_lettered']} "
+          f"retries={stats['retries']} unwritten={len(unwritten)}")
+    return ok
+
+
+def main() -> int:
+    results = [
+        _run("unencodable doc", {"bad": {1, 2}}),
+        _run("validation error", {"invalid": True}, wrap=_Collection),
+        _run("outage, then validation", {"invalid": True}, wrap=lambda c: _Collection(c, outages=2)),
+    ]
+    if not all(results):
+        print("❌ a doc that cannot be written held up the write-behind buffer")
+        return 1
+    print("✅ Bad docs are dead-lettered and the docs behind them are written")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
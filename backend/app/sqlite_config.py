@@ -1,5 +1,5 @@
 # app/sqlite_config.py
-import sqlite3, json, os
+import sqlite3, json, os, threading
 from typing import Dict, Any
 
 from pathlib import Path
@@ -8,6 +8,22 @@ BASE_DIR = Path(__file__).resolve().parents[2]    # ← VERY IMPORTANT
 DB_PATH = BASE_DIR / "data" / "config.db"
 DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
+# integer settings read from the `settings` table (k -> int(v))
+INT_SETTINGS = ("TOP_N_ISSUES", "TF_BATCH_SIZE", "ANALYZE_WORKERS", "SHARD_MIN_REVIEWS", "STREAM_CHUNK_SIZE",
+                "RESULT_CACHE_MAX_ENTRIES", "ANALYSIS_JOB_WORKERS", "ANALYSIS_JOB_MAX_PENDING",
+                "PREDICT_MAX_BATCH", "PREDICT_MAX_WAIT_MS", "FEEDBACK_WRITE_BATCH", "FEEDBACK_WRITE_INTERVAL_MS",
+                "FEEDBACK_WRITE_MAX_PENDING", "MODEL_CACHE_SIZE", "RETRAIN_WORKERS", "RETRAIN_LEASE_SECONDS",
+                "FEEDBACK_WATERMARK_LAG_SECONDS", "RETRAIN_SEARCH", "RETRAIN_SEARCH_BUDGET_SECONDS",
+                "RETRAIN_SEARCH_WORKERS", "FEEDBACK_EXPORT_BATCH", "COMPOUND_RESERVOIR_SIZE")
+# float settings (k -> float(v)): ensemble blend weights and the pos/neg threshold,
+# pull of an incremental retrain towards its base version's weights
+FLOAT_SETTINGS = ("ENSEMBLE_W_VADER", "ENSEMBLE_W_DISTIL", "ENSEMBLE_W_ROBERTA", "ENSEMBLE_POS_THRESH",
+                  "RETRAIN_INCREMENTAL_ANCHOR")
+# string settings read as-is (inference backend per model: torch | int8 | onnx | onnx-int8;
+# WARMUP_MODELS: comma-separated models loaded at startup; RETRAIN_MODE: full | incremental)
+STR_SETTINGS = ("INFERENCE_BACKEND_TRANSFORMER", "INFERENCE_BACKEND_DISTIL", "INFERENCE_BACKEND_ROBERTA",
+                "WARMUP_MODELS", "RETRAIN_MODE")
+
 
 
 def _conn():
@@ -25,10 +41,46 @@ def init_db(path: str = DB_PATH):
     conn.commit()
     conn.close()
 
+def _read_aspect_keywords(cur) -> Dict[str, list]:
+    cur.execute("SELECT aspect, keywords FROM aspect_keywords")
+    ak = {}
+    for aspect, keywords in cur.fetchall():
+        ak[aspect] = json.loads(keywords)
+    return ak
+
+def load_aspect_keywords() -> Dict[str, list]:
+    """Current aspect -> keywords mapping (cheap; used to detect admin edits)."""
+    conn = _conn()
+    try:
+        return _read_aspect_keywords(conn.cursor())
+    finally:
+        conn.close()
+
+def load_float_settings(keys) -> Dict[str, float]:
+    """Current values of some FLOAT_SETTINGS (cheap; for settings that apply without a restart)."""
+    keys = tuple(keys)
+    conn = _conn()
+    try:
+        cur = conn.cursor()
+        cur.execute(f"SELECT k, v FROM settings WHERE k IN ({','.join('?' * len(keys))})", keys)
+        return {k: float(v) for k, v in cur.fetchall()}
+    finally:
+        conn.close()
+
 def load_all() -> Dict[str, Any]:
     """
     Returns dict with keys:
      - TOP_N_ISSUES (int)
+     - TF_BATCH_SIZE, ANALYZE_WORKERS, SHARD_MIN_REVIEWS, STREAM_CHUNK_SIZE,
+       RESULT_CACHE_MAX_ENTRIES, ANALYSIS_JOB_WORKERS, ANALYSIS_JOB_MAX_PENDING,
+       PREDICT_MAX_BATCH, PREDICT_MAX_WAIT_MS, FEEDBACK_WRITE_BATCH, FEEDBACK_WRITE_INTERVAL_MS,
+       FEEDBACK_WRITE_MAX_PENDING, MODEL_CACHE_SIZE, RETRAIN_WORKERS, RETRAIN_LEASE_SECONDS,
+       FEEDBACK_WATERMARK_LAG_SECONDS, RETRAIN_SEARCH (0/1), RETRAIN_SEARCH_BUDGET_SECONDS,
+       RETRAIN_SEARCH_WORKERS, FEEDBACK_EXPORT_BATCH, COMPOUND_RESERVOIR_SIZE (int, optional)
+     - ENSEMBLE_W_VADER, ENSEMBLE_W_DISTIL, ENSEMBLE_W_ROBERTA, ENSEMBLE_POS_THRESH,
+       RETRAIN_INCREMENTAL_ANCHOR (float, optional)
+     - INFERENCE_BACKEND_TRANSFORMER, INFERENCE_BACKEND_DISTIL, INFERENCE_BACKEND_ROBERTA,
+       WARMUP_MODELS, RETRAIN_MODE (str, optional)
      - ISSUE_CLUSTERS (dict)
      - ASPECT_KEYWORDS (dict)
      - SUGGESTION_MAP (dict)
@@ -40,10 +92,21 @@ def load_all() -> Dict[str, Any]:
 
     out = {}
     # settings
-    cur.execute("SELECT v FROM settings WHERE k='TOP_N_ISSUES'")
-    r = cur.fetchone()
-    if r:
-        out["TOP_N_ISSUES"] = int(r[0])
+    for key in INT_SETTINGS:
+        cur.execute("SELECT v FROM settings WHERE k=?", (key,))
+        r = cur.fetchone()
+        if r:
+            out[key] = int(r[0])
+    for key in FLOAT_SETTINGS:
+        cur.execute("SELECT v FROM settings WHERE k=?", (key,))
+        r = cur.fetchone()
+        if r:
+            out[key] = float(r[0])
+    for key in STR_SETTINGS:
+        cur.execute("SELECT v FROM settings WHERE k=?", (key,))
+        r = cur.fetchone()
+        if r:
+            out[key] = r[0]
     # issue clusters
     cur.execute("SELECT cluster, keywords FROM issue_clusters")
     ic = {}
@@ -52,10 +115,7 @@ def load_all() -> Dict[str, Any]:
     if ic:
         out["ISSUE_CLUSTERS"] = ic
     # aspects
-    cur.execute("SELECT aspect, keywords FROM aspect_keywords")
-    ak = {}
-    for aspect, keywords in cur.fetchall():
-        ak[aspect] = json.loads(keywords)
+    ak = _read_aspect_keywords(cur)
     if ak:
         out["ASPECT_KEYWORDS"] = ak
     # suggestion_map
@@ -76,6 +136,22 @@ def load_all() -> Dict[str, Any]:
 
 
 
+_SETTINGS = None
+_SETTINGS_LOCK = threading.Lock()
+
+def load_settings() -> Dict[str, Any]:
+    """
+    load_all() read once per process (tables created on first call) and shared by the
+    import-time constants of every module, instead of one connection per module.
+    Admin endpoints keep calling load_all() for fresh values.
+    """
+    global _SETTINGS
+    if _SETTINGS is None:
+        with _SETTINGS_LOCK:
+            if _SETTINGS is None:
+                init_db()
+                _SETTINGS = load_all()
+    return _SETTINGS
 
 
 # ---- ADMIN CRUD HELPERS (ADD THESE) ----
@@ -0,0 +1,143 @@
+# app/warmup.py
+"""
+Startup warm-up of every model the API serves, so the first request after a deploy
+does not pay for loading them.
+
+    distil / roberta   ensemble used by /analyze (app.analyze.load_tf_model)
+    transformer        submodels/transformer used by /feedback/active/predict
+    tfidf              active TF-IDF version from the model registry
+
+start_warmup() loads them in parallel on a background thread and runs one dummy batch
+through each. readiness() stays "not ready" until every task has finished; a model
+that cannot be loaded counts as finished but is listed under "unavailable" (the
+endpoints already fall back / report it per request).
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# try to load config from sqlite; fallback to defaults below
+try:
+    from app.sqlite_config import load_settings
+    _cfg = load_settings()
+except Exception:
+    _cfg = {}
+
+# comma-separated subset of distil,roberta,transformer,tfidf ("" disables warm-up)
+WARMUP_MODELS = _cfg.get("WARMUP_MODELS", "distil,roberta,transformer,tfidf")
+
+_WARMUP_TEXTS = ["Great product, fast delivery.", "The app keeps crashing and support never replied."]
+
+
+class ModelUnavailable(Exception):
+    pass
+
+
+def _warm_ensemble(which):
+    from app.analyze import load_tf_model, _tf_importable, _tf_probs_batch
+    if not _tf_importable():
+        raise ModelUnavailable("transformers/torch not installed")
+    tokenizer, model, backend = load_tf_model(which)
+    if model is None:
+        raise ModelUnavailable(f"{which} model could not be loaded")
+    _tf_probs_batch(tokenizer, model, _WARMUP_TEXTS)
+    return backend
+
+
+def _warm_transformer():
+    from active_learning.model_manager import predict_texts_transformer
+    import active_learning.model_manager as mm
+    try:
+        predict_texts_transformer(_WARMUP_TEXTS)
+    except (OSError, FileNotFoundError) as e:
+        raise ModelUnavailable(str(e))
+    return mm._TRANS_BACKEND
+
+
+def _warm_tfidf():
+    from active_learning.model_manager import get_registry, predict_texts
+    try:
+        bundle = get_registry().active()
+    except (OSError, FileNotFoundError) as e:
+        raise ModelUnavailable(str(e))
+    predict_texts(_WARMUP_TEXTS)
+    return bundle.version
+
+
+_TASKS = {
+    "distil": lambda: _warm_ensemble("distil"),
+    "roberta": lambda: _warm_ensemble("roberta"),
+    "transformer": _warm_transformer,
+    "tfidf": _warm_tfidf,
+}
+
+_STATUS = {}  # model -> {"state": pending|loading|ready|unavailable|failed, "seconds", "detail"}
+_STATUS_LOCK = threading.Lock()
+_STARTED = False
+_DONE = threading.Event()
+
+
+def _set(name, **fields):
+    with _STATUS_LOCK:
+        _STATUS[name].update(fields)
+
+
+def _run_task(name):
+    _set(name, state="loading")
+    started = time.perf_counter()
+    try:
+        detail = _TASKS[name]()
+        state = "ready"
+    except ModelUnavailable as e:
+        detail, state = str(e), "unavailable"
+    except Exception as e:
+        detail, state = f"{e.__class__.__name__}: {e}", "failed"
+    seconds = round(time.perf_counter() - started, 2)
+    _set(name, state=state, seconds=seconds, detail=detail)
+    print(f"[WARMUP] {name}: {state} in {seconds}s" + (f" ({detail})" if state != "ready" else ""))
+
+
+def _run_all(names):
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, len(names)), thread_name_prefix="warmup") as pool:
+            list(pool.map(_run_task, names))
+    finally:
+        _DONE.set()
+
+
+def start_warmup(models=None) -> threading.Thread:
+    """Warm the configured models in the background (once per process)."""
+    global _STARTED
+    if models is None:
+        models = [m.strip() for m in WARMUP_MODELS.split(",") if m.strip()]
+    names = [m for m in models if m in _TASKS]
+    for m in models:
+        if m not in _TASKS:
+            print(f"⚠️ WARMUP_MODELS: unknown model {m!r} ignored")
+
+    with _STATUS_LOCK:
+        if _STARTED:
+            return None
+        _STARTED = True
+        for name in names:
+            _STATUS[name] = {"state": "pending", "seconds": None, "detail": None}
+
+    t = threading.Thread(target=_run_all, args=(names,), daemon=True, name="model-warmup")
+    t.start()
+    return t
+
+
+def wait_until_ready(timeout: float = None) -> bool:
+    return _DONE.wait(timeout)
+
+
+def readiness() -> dict:
+    with _STATUS_LOCK:
+        models = {name: dict(st) for name, st in _STATUS.items()}
+        started = _STARTED
+    finished = ("ready", "unavailable", "failed")
+    return {
+        "ready": started and _DONE.is_set() and all(st["state"] in finished for st in models.values()),
+        "models": models,
+        "unavailable": sorted(n for n, st in models.items() if st["state"] in ("unavailable", "failed")),
+    }
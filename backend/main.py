@@ -1,7 +1,14 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from app.routes import router
 
 from app.admin_routes import router as admin_router
+from app.analyze import shutdown_shard_pool
+from app.analysis_jobs import shutdown_analysis_jobs
+from app.db import ensure_indexes
+from app.warmup import start_warmup, readiness
+from active_learning.write_behind import shutdown_feedback_buffer
+from active_learning.retrain_worker import start_retrain_scheduler, shutdown_retrain_scheduler
 
 app = FastAPI(title="Customer Feedback Analysis API", version="0.1")
 app.include_router(router)
@@ -11,3 +18,36 @@ app.include_router(admin_router)
 @app.get("/")
 def root():
     return {"message": "Backend is running. Visit /docs for API docs"}
+
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 503 until every configured model is loaded and warmed."""
+    status = readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.on_event("startup")
+def _ensure_indexes():
+    ensure_indexes()
+
+
+@app.on_event("startup")
+def _start_retrain_scheduler():
+    # picks up jobs queued (or orphaned) before this process started
+    start_retrain_scheduler()
+
+
+@app.on_event("startup")
+def _warm_models():
+    # loads in the background; /ready reports when it is done
+    start_warmup()
+
+
+@app.on_event("shutdown")
+def _shutdown_background_work():
+    shutdown_retrain_scheduler()
+    shutdown_analysis_jobs()
+    shutdown_shard_pool()
+    # drain buffered prediction/feedback logs before exit
+    shutdown_feedback_buffer()
@@ -1,15 +1,21 @@
 import { NextResponse } from "next/server";
 import axios from "axios";
 
-export async function GET() {
+export async function GET(request) {
   try {
-    const response = await axios.get(`${process.env.NEXT_PUBLIC_API_URL}/feedback/visuals`);
-    const visuals = response.data.sort(
-      (a, b) => new Date(b.created_at) - new Date(a.created_at)
-    );
-    return NextResponse.json({ visuals });
+    // one page of summaries, newest first; pass next_cursor back as ?cursor= for the next one
+    const { searchParams } = new URL(request.url);
+    const limit = searchParams.get("limit");
+    const cursor = searchParams.get("cursor");
+    const response = await axios.get(`${process.env.NEXT_PUBLIC_API_URL}/feedback/visuals`, {
+      params: { ...(limit ? { limit } : {}), ...(cursor ? { cursor } : {}) },
+    });
+    return NextResponse.json({
+      visuals: response.data.visuals || [],
+      next_cursor: response.data.next_cursor || null,
+    });
   } catch (error) {
     console.error("Error fetching visuals:", error);
-    return NextResponse.json({ visuals: [], error: "Failed to fetch visuals" }, { status: 500 });
+    return NextResponse.json({ visuals: [], next_cursor: null, error: "Failed to fetch visuals" }, { status: 500 });
   }
 }
@@ -6,7 +6,7 @@ import { motion, AnimatePresence } from "framer-motion"
 import RenameModal from "./RenameModal"
 import { useEffect } from "react"
 
-export default function VisualSidebar({ visuals, selectedVisual, onSelectVisual, onRefresh }) {
+export default function VisualSidebar({ visuals, selectedVisual, onSelectVisual, onRefresh, hasMore, loadingMore, onLoadMore }) {
     const router = useRouter()
     const [renameModal, setRenameModal] = useState(null)
 
@@ -107,7 +107,6 @@ export default function VisualSidebar({ visuals, selectedVisual, onSelectVisual,
                                     whileHover={{ scale: 1.02 }}
                                     onClick={() => {
                                         onSelectVisual(visual)
-                                        localStorage.setItem("currentVisual", JSON.stringify(visual))
                                         setActiveId(visual._id || visual.id);
                                     }}
                                     className={`p-3 rounded-xl cursor-pointer border transition-all duration-500 relative overflow-hidden 
@@ -202,6 +201,17 @@ export default function VisualSidebar({ visuals, selectedVisual, onSelectVisual,
                         })
                     )}
                 </AnimatePresence>
+
+                {hasMore && (
+                    <button
+                        onClick={onLoadMore}
+                        disabled={loadingMore}
+                        className="w-full py-2 text-sm text-purple-200 border border-purple-500/30 rounded-lg
+                                   hover:bg-white/10 transition-colors disabled:opacity-50"
+                    >
+                        {loadingMore ? "Loading..." : "Load more"}
+                    </button>
+                )}
             </div>
 
             {/* --- Rename Modal --- */}
@@ -6,6 +6,7 @@ import UploadNavbar from "@/app/upload/components/UploadNavbar"
 import VisualSidebar from "./components/VisualSidebar"
 import VisualDisplay from "./components/VisualDisplay"
 
+const PAGE_SIZE = 50
 
 
 export default function VisualsPage() {
@@ -14,13 +15,20 @@ export default function VisualsPage() {
     const [visuals, setVisuals] = useState([])
     const [selectedVisual, setSelectedVisual] = useState(null)
     const [loading, setLoading] = useState(true)
+    const [nextCursor, setNextCursor] = useState(null)
+    const [loadingMore, setLoadingMore] = useState(false)
 
     // Load currentVisual from localStorage on first render
     useEffect(() => {
         if (typeof window !== "undefined") {
             const stored = localStorage.getItem("currentVisual")
             if (stored) {
-                setSelectedVisual(JSON.parse(stored))
+                const visual = JSON.parse(stored)
+                setSelectedVisual(visual)
+                // a fresh upload only carries the summary; fetch the rows and report with the full visual
+                if (!visual.result?.per_review_summary) {
+                    handleSelectVisual(visual)
+                }
             }
         }
     }, [])
@@ -35,21 +43,28 @@ export default function VisualsPage() {
         }
     }, [router])
 
+    const fetchPage = async (cursor) => {
+        const params = new URLSearchParams({ limit: String(PAGE_SIZE) })
+        if (cursor) params.set("cursor", cursor)
+        const response = await fetch(`/api/visuals/getAll?${params}`, {
+            headers: {
+                Authorization: `Bearer ${localStorage.getItem("authToken")}`,
+            },
+        })
+        return response.json()
+    }
+
+    // first page only; older visuals are loaded on demand from the sidebar
     const fetchVisuals = async () => {
         try {
-            const response = await fetch("/api/visuals/getAll", {
-                headers: {
-                    Authorization: `Bearer ${localStorage.getItem("authToken")}`,
-                },
-            })
-            const data = await response.json()
+            const data = await fetchPage(null)
             setVisuals(data.visuals || [])
+            setNextCursor(data.next_cursor || null)
 
             // Only auto-select first visual if nothing is stored
             const stored = localStorage.getItem("currentVisual");
             if (!stored && data.visuals?.length > 0) {
-                setSelectedVisual(data.visuals[0]);
-                localStorage.setItem("currentVisual", JSON.stringify(data.visuals[0]));
+                await handleSelectVisual(data.visuals[0]);
             }
         } catch (err) {
             console.error("Failed to fetch visuals:", err)
@@ -58,9 +73,42 @@ export default function VisualsPage() {
         }
     }
 
-    const handleSelectVisual = (visual) => {
+    const loadMoreVisuals = async () => {
+        if (!nextCursor || loadingMore) return
+        setLoadingMore(true)
+        try {
+            const data = await fetchPage(nextCursor)
+            setVisuals((prev) => [...prev, ...(data.visuals || [])])
+            setNextCursor(data.next_cursor || null)
+        } catch (err) {
+            console.error("Failed to load more visuals:", err)
+        } finally {
+            setLoadingMore(false)
+        }
+    }
+
+    // the listing only carries summaries; per-review rows and the report come with the full visual
+    const fetchFullVisual = async (visual) => {
+        const id = visual._id || visual.id
+        try {
+            const res = await fetch(`/api/visuals/getOne/${id}`, {
+                headers: {
+                    Authorization: `Bearer ${localStorage.getItem("authToken")}`,
+                },
+            })
+            const full = await res.json()
+            return full && full.result ? full : visual
+        } catch (err) {
+            console.error("Failed to fetch visual:", err)
+            return visual
+        }
+    }
+
+    const handleSelectVisual = async (visual) => {
         setSelectedVisual(visual)
-        localStorage.setItem("currentVisual", JSON.stringify(visual))
+        const full = await fetchFullVisual(visual)
+        setSelectedVisual(full)
+        localStorage.setItem("currentVisual", JSON.stringify(full))
     }
 
     if (!isAuthenticated || loading) {
@@ -81,6 +129,9 @@ export default function VisualsPage() {
                     selectedVisual={selectedVisual}
                     onSelectVisual={handleSelectVisual}
                     onRefresh={fetchVisuals}
+                    hasMore={Boolean(nextCursor)}
+                    loadingMore={loadingMore}
+                    onLoadMore={loadMoreVisuals}
                 />
 
                 <div className="flex-1 overflow-auto">